@@ -0,0 +1,94 @@
+import mimetypes
+import posixpath
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from backend.auth.dependencies import get_current_admin
+from backend.database import get_db
+from backend.jobs.models import Job
+from backend.profiling import PROFILE_DIR
+from backend.storage.backends import get_storage, job_key
+from backend.users.models import User
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _get_job(db: Session, job_id: str) -> Job:
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# -------------------------------
+# JOB PROFILING
+# -------------------------------
+@router.post("/jobs/{job_id}/profile")
+def enable_job_profiling(
+    job_id: str,
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Runs a queued job (any user's) under the profiler.
+    """
+    job = _get_job(db, job_id)
+
+    if job.status != "queued":
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+
+    job.profile = True
+    db.commit()
+
+    return {"job_id": str(job.id), "profile": True}
+
+
+@router.get("/jobs/{job_id}/profile")
+def list_job_profile(
+    job_id: str,
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    """
+    Profile artifacts of a finished profiled job.
+    """
+    job = _get_job(db, job_id)
+
+    prefix = f"{PROFILE_DIR}/"
+    files = sorted(
+        rel_path[len(prefix):]
+        for rel_path in get_storage().list(job.output_dir)
+        if rel_path.startswith(prefix)
+    )
+
+    return {"job_id": str(job.id), "profile": job.profile, "files": files}
+
+
+@router.get("/jobs/{job_id}/profile/{name}")
+def get_job_profile_file(
+    job_id: str,
+    name: str,
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db),
+):
+    job = _get_job(db, job_id)
+
+    if name != posixpath.basename(name) or name.startswith("."):
+        raise HTTPException(status_code=403, detail="Invalid file name")
+
+    storage = get_storage()
+    key = job_key(job.output_dir, f"{PROFILE_DIR}/{name}")
+    if not storage.exists(key):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # Inline, so profile.svg opens in the browser
+    return StreamingResponse(
+        storage.iter_bytes(key),
+        media_type=mimetypes.guess_type(name)[0] or "text/plain",
+        headers={
+            "Content-Length": str(storage.size(key)),
+            "Content-Security-Policy": "default-src 'none'",
+        },
+    )
@@ -4,7 +4,7 @@ import jwt
 
 from backend.config import SECRET_KEY
 from backend.users.models import User
-from backend.database import get_db
+from backend.database import get_read_db, read_or_primary
 
 security = HTTPBearer()
 ALGORITHM = "HS256"
@@ -12,14 +12,15 @@ ALGORITHM = "HS256"
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db=Depends(get_db),
+    db=Depends(get_read_db),
 ) -> User:
     token = credentials.credentials
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
-        if not user_id:
+        # Magic-link tokens are single-use login links, not bearer tokens
+        if not user_id or payload.get("typ") == "magic_link":
             raise HTTPException(status_code=401, detail="Invalid token")
     except jwt.PyJWTError:
         raise HTTPException(
@@ -27,8 +28,19 @@ def get_current_user(
             detail="Invalid or expired token",
         )
 
-    user = db.query(User).filter_by(id=user_id).first()
+    # Read-only lookup on every request → replica (primary for new users)
+    user = read_or_primary(
+        db,
+        lambda session: session.query(User).filter_by(id=user_id).first(),
+        required=True,
+    )
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
     return user
+
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user
@@ -0,0 +1,215 @@
+"""
+Magic-link issuing and redemption.
+
+MAGIC_LINK_MODE = "table": each link is a magic_link_tokens row.
+
+MAGIC_LINK_MODE = "signed": each link is a short-lived signed token
+(sub, nonce, exp). Nothing is written when a link is issued. Redeeming
+it inserts the nonce into used_magic_link_nonces with a single
+INSERT ... ON CONFLICT DO NOTHING, which enforces single use. Nonces are
+purged once their link has expired.
+"""
+import logging
+import secrets
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend.auth.models import MagicLinkToken, UsedMagicLinkNonce
+from backend.config import (
+    AUTH_PURGE_INTERVAL_SECONDS,
+    MAGIC_LINK_MODE,
+    MAGIC_LINK_TTL_MINUTES,
+    SECRET_KEY,
+)
+from backend.database import SessionLocal
+from backend.users.models import User
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+TOKEN_TYPE = "magic_link"
+
+PURGE_BATCH_SIZE = 1000
+
+
+class InvalidMagicLink(ValueError):
+    pass
+
+
+def upsert_user(db: Session, email: str) -> uuid.UUID:
+    """
+    Returns the user's id, creating the user if needed. Does not commit.
+
+    An existing user's row is never written (an ON CONFLICT DO UPDATE
+    would leave a dead tuple, WAL and a row lock on every login); its id
+    is read back with a plain SELECT.
+    """
+    stmt = (
+        insert(User)
+        .values(id=uuid.uuid4(), email=email)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id)
+    )
+    user_id = db.execute(stmt).scalar_one_or_none()
+    if user_id is not None:
+        return user_id
+
+    # DO NOTHING waits out a concurrent insert, so the row is visible here
+    return db.execute(select(User.id).where(User.email == email)).scalar_one()
+
+
+# -------------------------------
+# ISSUE
+# -------------------------------
+def issue_magic_link(db: Session, email: str) -> str:
+    """
+    Returns the token to put in the login link.
+    """
+    user_id = upsert_user(db, email)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=MAGIC_LINK_TTL_MINUTES)
+
+    if MAGIC_LINK_MODE == "signed":
+        db.commit()
+        return jwt.encode(
+            {
+                "sub": str(user_id),
+                "typ": TOKEN_TYPE,
+                "nonce": secrets.token_hex(16),
+                "exp": expires_at,
+            },
+            SECRET_KEY,
+            algorithm=ALGORITHM,
+        )
+
+    token = MagicLinkToken(id=uuid.uuid4(), user_id=user_id, expires_at=expires_at)
+    db.add(token)
+    db.commit()  # user upsert + token in one transaction
+    return str(token.id)
+
+
+# -------------------------------
+# REDEEM
+# -------------------------------
+def _redeem_signed(db: Session, token: str) -> str:
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise InvalidMagicLink("Token expired")
+    except jwt.PyJWTError:
+        raise InvalidMagicLink("Invalid or used token")
+
+    if claims.get("typ") != TOKEN_TYPE or not claims.get("nonce") or not claims.get("sub"):
+        raise InvalidMagicLink("Invalid or used token")
+
+    stmt = (
+        insert(UsedMagicLinkNonce)
+        .values(
+            nonce=claims["nonce"],
+            expires_at=datetime.fromtimestamp(claims["exp"], tz=timezone.utc),
+        )
+        .on_conflict_do_nothing(index_elements=[UsedMagicLinkNonce.nonce])
+        .returning(UsedMagicLinkNonce.nonce)
+    )
+    first_use = db.execute(stmt).first() is not None
+    db.commit()
+
+    if not first_use:
+        raise InvalidMagicLink("Invalid or used token")
+    return claims["sub"]
+
+
+def _redeem_table(db: Session, token: str) -> str:
+    try:
+        token_id = uuid.UUID(token)
+    except ValueError:
+        raise InvalidMagicLink("Invalid or used token")
+
+    token_record = (
+        db.query(MagicLinkToken)
+        .filter_by(id=token_id, used=False)
+        .with_for_update()
+        .first()
+    )
+
+    if not token_record:
+        db.rollback()
+        raise InvalidMagicLink("Invalid or used token")
+
+    if token_record.expires_at < datetime.now(timezone.utc):
+        db.rollback()
+        raise InvalidMagicLink("Token expired")
+
+    token_record.used = True
+    db.commit()
+    return str(token_record.user_id)
+
+
+def redeem_magic_link(db: Session, token: str) -> str:
+    """
+    Validates and consumes a magic link token. Returns the user id.
+    Raises InvalidMagicLink.
+    """
+    # Signed tokens are JWTs ("a.b.c"); table tokens are UUIDs.
+    # Links issued before a mode switch keep working until they expire.
+    if token.count(".") == 2:
+        return _redeem_signed(db, token)
+    return _redeem_table(db, token)
+
+
+# -------------------------------
+# PURGE
+# -------------------------------
+def _purge_batch(db: Session, model, key, condition, batch_size: int) -> int:
+    ids = select(key).where(condition).limit(batch_size).scalar_subquery()
+    result = db.execute(delete(model).where(key.in_(ids)))
+    db.commit()
+    return result.rowcount or 0
+
+
+def purge_expired_auth_rows(db: Session, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """
+    Deletes expired magic-link tokens and nonces in small batches (short
+    transactions, no long table locks). Returns the number of rows deleted.
+    """
+    now = datetime.now(timezone.utc)
+    deleted = 0
+
+    for model, key in (
+        (MagicLinkToken, MagicLinkToken.id),
+        (UsedMagicLinkNonce, UsedMagicLinkNonce.nonce),
+    ):
+        while True:
+            count = _purge_batch(db, model, key, model.expires_at < now, batch_size)
+            deleted += count
+            if count < batch_size:
+                break
+
+    return deleted
+
+
+def start_auth_purge() -> threading.Thread:
+    """
+    Starts the expired token/nonce purge loop as a daemon thread.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(AUTH_PURGE_INTERVAL_SECONDS):
+            db = SessionLocal()
+            try:
+                purge_expired_auth_rows(db)
+            except Exception:
+                logger.exception("Auth purge pass failed")
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=loop, name="auth-purge", daemon=True)
+    thread.stop = stop
+    thread.start()
+    return thread
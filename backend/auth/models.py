@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, DateTime, Boolean, ForeignKey, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 
@@ -14,9 +14,22 @@ class MagicLinkToken(Base):
 
     used = Column(Boolean, default=False)
 
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
 
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now()
     )
+
+
+class UsedMagicLinkNonce(Base):
+    """
+    Nonces of signed magic links that were already redeemed.
+    A row only matters until its link would have expired anyway; the
+    purge drops it after that, so the set never holds more than one
+    TTL window of logins.
+    """
+    __tablename__ = "used_magic_link_nonces"
+
+    nonce = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -4,6 +4,13 @@ SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 
 VIDEO_JOB_COST = 10  # v1 flat pricing
 
+# Magic links
+# "table"  → one magic_link_tokens row per link
+# "signed" → stateless signed token; single use via a TTL'd nonce set
+MAGIC_LINK_MODE = os.getenv("MAGIC_LINK_MODE", "table")
+MAGIC_LINK_TTL_MINUTES = int(os.getenv("MAGIC_LINK_TTL_MINUTES", "15"))
+AUTH_PURGE_INTERVAL_SECONDS = int(os.getenv("AUTH_PURGE_INTERVAL_SECONDS", "600"))
+
 ENABLE_MOCK_PAYMENTS = True
 
 
@@ -12,3 +19,158 @@ CREDIT_PACKS = {
     "pro": {"usd": 25, "credits": 300},
     "power": {"usd": 50, "credits": 700},
 }
+
+# Payment webhooks: verified, stored once per provider event id,
+# then applied to balances in batches by a background worker
+LEMONSQUEEZY_WEBHOOK_SECRET = os.getenv("LEMONSQUEEZY_WEBHOOK_SECRET", "")
+PAYMENT_APPLY_BATCH_SIZE = int(os.getenv("PAYMENT_APPLY_BATCH_SIZE", "200"))
+PAYMENT_APPLY_INTERVAL_SECONDS = float(os.getenv("PAYMENT_APPLY_INTERVAL_SECONDS", "1"))
+
+
+# -------------------------------
+# UPLOADS / BLOB STORE
+# -------------------------------
+# Content-addressed blob area. Point this at a shared mount
+# (NFS/EFS/etc.) so workers on every node can read uploads.
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# content-type -> required leading bytes
+UPLOAD_ALLOWED_TYPES = {
+    "application/pdf": b"%PDF-",
+}
+
+
+# -------------------------------
+# JOB CONFIG SIZE
+# -------------------------------
+# Text inputs above this go to the blob store; config keeps the digest
+JOB_INLINE_TEXT_MAX_BYTES = int(os.getenv("JOB_INLINE_TEXT_MAX_BYTES", str(4 * 1024)))
+# Hard cap on the stored job config (JSON-encoded)
+JOB_CONFIG_MAX_BYTES = int(os.getenv("JOB_CONFIG_MAX_BYTES", str(16 * 1024)))
+
+
+# -------------------------------
+# JOB DEADLINES / CANCELLATION
+# -------------------------------
+# Wall-clock budget per job; a job config may ask for less (deadline_seconds)
+JOB_DEADLINE_SECONDS = int(os.getenv("JOB_DEADLINE_SECONDS", "1800"))
+JOB_MAX_DEADLINE_SECONDS = int(os.getenv("JOB_MAX_DEADLINE_SECONDS", "3600"))
+# How often a running job re-reads its cancel flag from the database
+JOB_CANCEL_POLL_SECONDS = float(os.getenv("JOB_CANCEL_POLL_SECONDS", "2"))
+
+
+# -------------------------------
+# BATCH (BOOK → CHAPTERS)
+# -------------------------------
+BATCH_MAX_CHAPTERS = int(os.getenv("BATCH_MAX_CHAPTERS", "50"))
+# Shorter sections (front matter, part dividers) are merged into the next
+BATCH_MIN_CHAPTER_CHARS = int(os.getenv("BATCH_MIN_CHAPTER_CHARS", "1500"))
+
+
+# -------------------------------
+# OUTPUT STORAGE
+# -------------------------------
+# "local" → files under OUTPUT_STORAGE_ROOT (job keys are "outputs/<uuid>/...")
+# "s3"    → any S3-compatible store (AWS S3, MinIO, ...)
+OUTPUT_STORAGE_BACKEND = os.getenv("OUTPUT_STORAGE_BACKEND", "local")
+OUTPUT_STORAGE_ROOT = os.getenv("OUTPUT_STORAGE_ROOT", ".")
+
+S3_BUCKET = os.getenv("S3_BUCKET", "perpixa-outputs")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_MULTIPART_CHUNK_BYTES = int(os.getenv("S3_MULTIPART_CHUNK_BYTES", str(16 * 1024 * 1024)))
+
+# Retention
+PURGE_INTERMEDIATES = os.getenv("PURGE_INTERMEDIATES", "1") == "1"
+OUTPUT_RETENTION_DAYS = int(os.getenv("OUTPUT_RETENTION_DAYS", "30"))
+STORAGE_GC_INTERVAL_SECONDS = int(os.getenv("STORAGE_GC_INTERVAL_SECONDS", "3600"))
+
+# Per-host TTS chunk cache (see voiceover); evicted by the storage GC,
+# least recently used first
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "cache/tts")
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "1024"))
+TTS_CACHE_MAX_AGE_DAYS = int(os.getenv("TTS_CACHE_MAX_AGE_DAYS", "7"))
+
+
+# -------------------------------
+# IMAGE GENERATION BACKENDS
+# -------------------------------
+# Comma-separated "<name>=<HF model id>", in preference order.
+# The first is the primary; the rest serve as hedges and failover.
+IMAGE_BACKENDS = [
+    dict(zip(("name", "model_id"), item.strip().split("=", 1)))
+    for item in os.getenv(
+        "IMAGE_BACKENDS",
+        "huggingface=stabilityai/stable-diffusion-xl-base-1.0",
+    ).split(",")
+    if item.strip()
+]
+
+# Hedge delay = this percentile of recent latencies, clamped to the bounds
+IMAGE_HEDGE_PERCENTILE = float(os.getenv("IMAGE_HEDGE_PERCENTILE", "0.9"))
+IMAGE_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("IMAGE_HEDGE_MIN_DELAY_SECONDS", "10"))
+IMAGE_HEDGE_MAX_DELAY_SECONDS = float(os.getenv("IMAGE_HEDGE_MAX_DELAY_SECONDS", "60"))
+# Hedges in flight per process (losers included, until they return);
+# past this a slow request is simply waited for
+IMAGE_MAX_HEDGES_IN_FLIGHT = int(os.getenv("IMAGE_MAX_HEDGES_IN_FLIGHT", "4"))
+
+
+# -------------------------------
+# TRACING
+# -------------------------------
+# "" (off) | "file" (JSON lines) | "otlp" (OpenTelemetry collector, OTLP/HTTP JSON)
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "perpixa-platform")
+# Spans waiting for export beyond this are dropped (never blocks callers)
+TRACING_QUEUE_SIZE = int(os.getenv("TRACING_QUEUE_SIZE", "10000"))
+TRACING_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACING_EXPORT_INTERVAL_SECONDS", "2"))
+
+
+# -------------------------------
+# PROFILING (admin-requested, per job)
+# -------------------------------
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.01"))
+PROFILE_MAX_STACK_DEPTH = int(os.getenv("PROFILE_MAX_STACK_DEPTH", "64"))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "25"))
+
+
+# -------------------------------
+# JOB WORKERS
+# -------------------------------
+# "inline": run jobs in the API process (BackgroundTasks)
+# "workers": leave them queued for `python -m backend.workers`
+JOB_DISPATCH = os.getenv("JOB_DISPATCH", "inline")
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+# Recycle a worker after this many jobs, or once its RSS passes the limit
+WORKER_MAX_JOBS = int(os.getenv("WORKER_MAX_JOBS", "50"))
+WORKER_MAX_RSS_MB = int(os.getenv("WORKER_MAX_RSS_MB", "2048"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1"))
+# Graceful stop waits this long for running jobs before killing workers
+WORKER_SHUTDOWN_TIMEOUT_SECONDS = int(os.getenv("WORKER_SHUTDOWN_TIMEOUT_SECONDS", "600"))
+
+
+# -------------------------------
+# RATE LIMITING
+# -------------------------------
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# Limits are "<requests>/<seconds>" (sliding window)
+RATE_LIMIT_LOGIN = os.getenv("RATE_LIMIT_LOGIN", "5/60")  # per IP
+RATE_LIMIT_LOGIN_EMAIL = os.getenv("RATE_LIMIT_LOGIN_EMAIL", "5/900")  # per address
+RATE_LIMIT_AUTH_CALLBACK = os.getenv("RATE_LIMIT_AUTH_CALLBACK", "20/60")  # per IP
+RATE_LIMIT_JOB_SUBMIT = os.getenv("RATE_LIMIT_JOB_SUBMIT", "10/60")  # per user
+RATE_LIMIT_UPLOAD = os.getenv("RATE_LIMIT_UPLOAD", "20/60")  # per user
+RATE_LIMIT_JOB_READ = os.getenv("RATE_LIMIT_JOB_READ", "120/60")  # per user (polling)
+# Output files: HLS players fetch a segment every few seconds per stream
+RATE_LIMIT_JOB_FILES = os.getenv("RATE_LIMIT_JOB_FILES", "1200/60")  # per user
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "300/60")  # per user, else per IP
+# Take the client IP from X-Forwarded-For (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "0") == "1"
+# Share counts across API replicas through Postgres (synced in the
+# background; a burst spread over N replicas can get up to N x a limit
+# through within one sync interval)
+RATE_LIMIT_SYNC = os.getenv("RATE_LIMIT_SYNC", "0") == "1"
+RATE_LIMIT_SYNC_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_SYNC_INTERVAL_SECONDS", "1"))
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 
@@ -9,7 +9,7 @@ from backend.database import Base
 class CreditBalance(Base):
     __tablename__ = "credit_balances"
 
-    user_id = Column(String, primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
     balance = Column(Integer, nullable=False, default=0)
 
     updated_at = Column(
@@ -20,11 +20,14 @@ class CreditBalance(Base):
 
 class CreditTransaction(Base):
     __tablename__ = "credit_transactions"
+    __table_args__ = (
+        Index("ix_credit_transactions_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
-    user_id = Column(String, nullable=False)
-    job_id = Column(UUID(as_uuid=True), nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    job_id = Column(UUID(as_uuid=True), nullable=True, index=True)
 
     amount = Column(Integer, nullable=False)
     type = Column(String, nullable=False)  # purchase | debit | refund
@@ -1,10 +1,13 @@
+import uuid
+
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from backend.credits.models import CreditBalance, CreditTransaction
+from backend.tracing import add_event
 
 
-def get_or_create_balance(db: Session, user_id: str) -> CreditBalance:
+def get_or_create_balance(db: Session, user_id: uuid.UUID) -> CreditBalance:
     balance = db.query(CreditBalance).filter_by(user_id=user_id).first()
     if balance:
         return balance
@@ -19,7 +22,7 @@ def get_or_create_balance(db: Session, user_id: str) -> CreditBalance:
 def debit_credits(
     db: Session,
     *,
-    user_id: str,
+    user_id: uuid.UUID,
     job_id,
     amount: int,
     reason: str
@@ -44,12 +47,13 @@ def debit_credits(
 
     db.add(txn)
     db.commit()
+    add_event("credits.debit", amount=amount, reason=reason)
 
 
 def refund_credits(
     db: Session,
     *,
-    user_id: str,
+    user_id: uuid.UUID,
     job_id,
     amount: int,
     reason: str
@@ -70,3 +74,4 @@ def refund_credits(
 
     db.add(txn)
     db.commit()
+    add_event("credits.refund", amount=amount, reason=reason)
@@ -0,0 +1,220 @@
+"""
+Per-provider circuit breakers.
+
+A breaker watches a sliding window of recent calls to one upstream
+provider. It opens when the error rate or the slow-call rate crosses its
+threshold, after which calls fail immediately with ProviderUnavailable
+instead of waiting on timeouts and retries. After open_seconds it lets a
+single probe through (half-open); a successful probe closes it again.
+
+Breaker state is per process.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from backend.engines.errors import ProviderUnavailable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_provider_fault(status_code: int) -> bool:
+    """
+    Upstream health failures (vs. bad requests) for breaker accounting.
+    """
+    return status_code == 429 or status_code >= 500
+
+
+class _CallOutcome:
+    """
+    Handed to the guarded block so it can flag a failed response
+    (e.g. HTTP 503) that did not raise.
+    """
+
+    def __init__(self):
+        self.ok = True
+
+    def failure(self):
+        self.ok = False
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_seconds: float = 60,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 60,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._calls = deque()  # (finished_at, ok, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    # -------------------------------
+    # STATE
+    # -------------------------------
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance(time.monotonic())
+            return self._state
+
+    def _advance(self, now: float):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._calls.clear()
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    # -------------------------------
+    # CALL ACCOUNTING
+    # -------------------------------
+    def before_call(self):
+        """
+        Admits a call or raises ProviderUnavailable.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+
+            if self._state == CLOSED:
+                return
+
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+
+        raise ProviderUnavailable(f"{self.name} unavailable (circuit open)")
+
+    def record(self, ok: bool, latency: float):
+        with self._lock:
+            now = time.monotonic()
+
+            if self._state == HALF_OPEN:
+                if ok and latency < self.slow_call_seconds:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            if self._state == OPEN:
+                # Straggler from before the breaker opened
+                return
+
+            self._calls.append((now, ok, latency >= self.slow_call_seconds))
+            self._trim(now)
+
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+
+            failures = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            slow = sum(1 for _, _, call_slow in self._calls if call_slow)
+
+            if failures / total >= self.error_rate or slow / total >= self.slow_call_rate:
+                self._open(now)
+
+    def release(self):
+        """
+        Ends an admitted call without recording an outcome
+        (e.g. the caller abandoned it).
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    @contextmanager
+    def guard(self, ignore: tuple = ()):
+        """
+        Wraps one provider call:
+
+            with breaker.guard() as call:
+                response = requests.post(...)
+                if response.status_code >= 500:
+                    call.failure()
+
+        Exceptions raised in the block count as failures, except those
+        in ignore, which say nothing about the provider's health.
+        """
+        self.before_call()
+        outcome = _CallOutcome()
+        started = time.monotonic()
+        try:
+            yield outcome
+        except ignore:
+            self.release()
+            raise
+        except BaseException:
+            self.record(False, time.monotonic() - started)
+            raise
+        self.record(outcome.ok, time.monotonic() - started)
+
+
+# -------------------------------
+# REGISTRY
+# -------------------------------
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **settings) -> CircuitBreaker:
+    """
+    Returns the process-wide breaker for a provider.
+    Settings only apply when the breaker is first created.
+    """
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **settings)
+                _breakers[name] = breaker
+    return breaker
+
+
+def _is_open(name: str) -> bool:
+    return name in _breakers and _breakers[name].state == OPEN
+
+
+def open_circuits(names) -> list:
+    """
+    Returns the providers among names whose breakers are currently open.
+
+    An entry may be a list of interchangeable providers (e.g. image
+    backends with failover); it is reported only when all are open.
+    Half-open breakers are not reported, so a job can act as the probe.
+    """
+    unavailable = []
+    for name in names:
+        if isinstance(name, (list, tuple)):
+            if name and all(_is_open(n) for n in name):
+                unavailable.append("|".join(name))
+        elif _is_open(name):
+            unavailable.append(name)
+    return unavailable
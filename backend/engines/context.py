@@ -0,0 +1,184 @@
+"""
+Per-job execution context: cancellation and deadline.
+
+The executor creates one JobContext per run and passes it to run_job.
+Engines pass it down to their stages and provider calls and:
+
+- call context.check() between units of work (images, reels, encode
+  segments); it raises JobCancelled or DeadlineExceeded,
+- bound blocking calls with context.timeout(default),
+- register context.on_stop(callback) to abort in-flight requests,
+- report context.report_progress(fraction) so a cancelled job is only
+  charged for the work it actually did,
+- report context.report_reel(index, status, ...) as each reel starts,
+  completes or fails, so finished reels survive a failed one and only
+  the failed ones are refunded.
+
+A cancel request or the deadline timer fires every on_stop callback at
+once, from whichever thread triggered it.
+"""
+import threading
+import time
+
+from backend.engines.errors import DeadlineExceeded, JobCancelled
+
+
+class JobContext:
+    def __init__(self, job_id: str | None = None, *, deadline_seconds: float | None = None):
+        self.job_id = job_id
+        self.deadline_seconds = deadline_seconds
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.progress = 0.0
+        self.reason = None  # "cancelled" | "deadline"
+        self.reels = {}  # index -> {"status", "attempts", "error_type", ...}
+        self._reel_listeners = []
+
+        self._stopped = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+        self._timer = None
+        if deadline_seconds:
+            self._timer = threading.Timer(deadline_seconds, self._stop, args=("deadline",))
+            self._timer.daemon = True
+            self._timer.start()
+
+    # -------------------------------
+    # SIGNALS
+    # -------------------------------
+    def _stop(self, reason: str):
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            self.reason = reason
+            self._stopped.set()
+            callbacks = list(self._callbacks)
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def cancel(self):
+        self._stop("cancelled")
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def on_stop(self, callback):
+        """
+        Runs callback when the job is cancelled or times out (at once if
+        it already has). Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._stopped.is_set():
+                self._callbacks.append(callback)
+
+                def unregister():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return unregister
+
+        callback()
+        return lambda: None
+
+    # -------------------------------
+    # CHECKS
+    # -------------------------------
+    def remaining(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def check(self):
+        if self._stopped.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline):
+            if self.reason == "cancelled":
+                raise JobCancelled("Job cancelled")
+            raise DeadlineExceeded(f"Job exceeded its {self.deadline_seconds:.0f}s deadline")
+
+    def timeout(self, default: float) -> float:
+        """
+        A request timeout that never outlives the job's deadline.
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(min(default, remaining), 0.1)
+
+    def wait(self, seconds: float) -> bool:
+        """
+        Sleeps up to seconds; returns True early if the job was stopped.
+        """
+        return self._stopped.wait(seconds)
+
+    def report_progress(self, fraction: float):
+        self.progress = min(max(fraction, self.progress), 1.0)
+
+    # -------------------------------
+    # REELS (partial success)
+    # -------------------------------
+    def on_reel(self, listener):
+        """
+        Calls listener(index, reel) after every report_reel (the executor
+        persists per-reel results this way).
+        """
+        self._reel_listeners.append(listener)
+
+    def report_reel(self, index: int, status: str, **details):
+        """
+        status: "running" | "completed" | "failed" | "skipped" (nothing to
+        deliver, not charged). details (attempts, error_type,
+        error_message, video) are merged into the reel's record.
+        """
+        with self._lock:
+            reel = self.reels.setdefault(index, {"status": status, "attempts": 0})
+            reel["status"] = status
+            reel.update(details)
+            reel = dict(reel)
+
+        for listener in self._reel_listeners:
+            listener(index, reel)
+
+    def reels_with_status(self, status: str) -> dict:
+        with self._lock:
+            return {index: dict(reel) for index, reel in self.reels.items() if reel["status"] == status}
+
+
+# -------------------------------
+# RUNNING JOBS (this process)
+# -------------------------------
+_running = {}
+_running_lock = threading.Lock()
+
+
+def register_context(context: JobContext):
+    with _running_lock:
+        _running[context.job_id] = context
+
+
+def unregister_context(context: JobContext):
+    with _running_lock:
+        if _running.get(context.job_id) is context:
+            del _running[context.job_id]
+
+
+def cancel_running_job(job_id: str) -> bool:
+    """
+    Cancels a job running in this process right away.
+    Jobs on other workers see their cancel flag on the next poll.
+    """
+    with _running_lock:
+        context = _running.get(job_id)
+    if context is None:
+        return False
+    context.cancel()
+    return True
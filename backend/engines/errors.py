@@ -0,0 +1,57 @@
+# =========================================================
+# FAILURE CLASSIFICATION
+# =========================================================
+# Shared by every engine and by the executor.
+# Kept free of heavy imports so the API process can import it.
+
+
+class EngineError(Exception):
+    """Base class for engine failures."""
+
+
+class SystemFailure(EngineError):
+    """
+    Indicates a system-side failure.
+    Eligible for credit refund.
+    """
+    pass
+
+
+class UserContentError(EngineError):
+    """
+    Indicates user input / content issue.
+    NOT eligible for refund.
+    """
+    pass
+
+
+class ProviderUnavailable(SystemFailure):
+    """
+    Raised without calling a provider whose circuit breaker is open.
+    Eligible for credit refund.
+    """
+    pass
+
+
+class JobInterrupted(EngineError):
+    """
+    The job was stopped from outside (cancel request or deadline).
+    Engines must let it propagate unchanged.
+    """
+    pass
+
+
+class JobCancelled(JobInterrupted):
+    """
+    Cancelled by the user.
+    Only the unused share of the cost is refunded.
+    """
+    pass
+
+
+class DeadlineExceeded(JobInterrupted, SystemFailure):
+    """
+    The job ran past its deadline budget.
+    Eligible for credit refund.
+    """
+    pass
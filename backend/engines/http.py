@@ -0,0 +1,88 @@
+"""
+Abortable HTTP sessions for provider calls.
+
+requests cannot cancel a call from another thread, and Session.close()
+only closes idle pooled connections. AbortableSession keeps track of the
+connections its requests open; abort() shuts their sockets down, so a
+request still waiting for response headers (or streaming the body)
+fails at once instead of running into its timeout.
+
+Use one session per request and call abort() from a cancel callback
+(context.on_stop, or the hedge's cancel event).
+"""
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class _AbortableAdapter(HTTPAdapter):
+    def __init__(self):
+        super().__init__()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.aborted = False
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        pool = super().get_connection_with_tls_context(request, verify, proxies=proxies, cert=cert)
+        if getattr(pool.ConnectionCls, "_tracked_by", None) is not self:
+            pool.ConnectionCls = self._tracking(pool.ConnectionCls)
+        return pool
+
+    def _tracking(self, base):
+        adapter = self
+
+        class TrackedConnection(base):
+            _tracked_by = adapter
+
+            def connect(self):
+                super().connect()
+                adapter._opened(self)
+
+        return TrackedConnection
+
+    def _opened(self, connection):
+        with self._lock:
+            self._connections.append(connection)
+            aborted = self.aborted
+        if aborted:
+            _shutdown(connection)
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            connections = list(self._connections)
+        for connection in connections:
+            _shutdown(connection)
+
+
+def _shutdown(connection):
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return
+    try:
+        # Wakes a thread blocked in recv(); close() alone would not
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class AbortableSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        self._adapter = _AbortableAdapter()
+        self.mount("https://", self._adapter)
+        self.mount("http://", self._adapter)
+
+    @property
+    def aborted(self) -> bool:
+        return self._adapter.aborted
+
+    def abort(self):
+        """
+        Tears down every connection of this session, from any thread.
+        The request using it raises a requests ConnectionError.
+        """
+        self._adapter.abort()
+        self.close()
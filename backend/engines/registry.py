@@ -0,0 +1,179 @@
+"""
+Engine registry.
+
+Engines are described by lightweight spec dicts and their implementation
+modules are imported lazily, on first execution. The API process only
+ever touches specs, so media libraries (numpy, Pillow, imageio-ffmpeg,
+pypdf, OpenAI client) are never loaded for /health, /auth or job polling.
+
+Built-in engines are listed in BUILTIN_ENGINES. External engines (e.g. CAD,
+image) register through the "perpixa.engines" entry point group; each
+entry point must resolve to a spec dict and live in a module that is
+cheap to import:
+
+    [project.entry-points."perpixa.engines"]
+    cad = "perpixa_cad.spec:ENGINE_SPEC"
+
+Spec keys:
+- entrypoint:    "package.module:function" implementing the run_job contract;
+                 if it takes a `context` argument it gets the job's
+                 JobContext (cancellation + deadline, see engines.context)
+- warmup:        "package.module:function" (optional), called once by the
+                 worker supervisor before it forks (clients, binaries,
+                 heavy imports), so workers start warm
+- cost:          credits debited per job
+- providers:     circuit breaker names the engine depends on (optional);
+                 a nested list means any one of them is enough
+- config_schema: {"input_types": {<input_type>: {
+                     "required": [<keys>],         # all must be set
+                     "required_one_of": [<keys>],  # at least one must be set
+                 }}}
+"""
+import importlib
+import threading
+from importlib.metadata import entry_points
+
+from backend.config import IMAGE_BACKENDS, VIDEO_JOB_COST
+
+ENTRY_POINT_GROUP = "perpixa.engines"
+
+DEFAULT_ENGINE = "video"
+
+
+BUILTIN_ENGINES = {
+    "video": {
+        "entrypoint": "backend.engines.video_engine.generate:run_job",
+        "warmup": "backend.engines.video_engine.generate:warm",
+        "cost": VIDEO_JOB_COST,
+        "providers": [
+            "openai_chat",
+            "openai_tts",
+            [backend["name"] for backend in IMAGE_BACKENDS],  # any one will do
+        ],
+        "config_schema": {
+            "input_types": {
+                "pdf": {"required_one_of": ["upload_id", "pdf_path"]},
+                "text": {"required_one_of": ["text", "text_blob"]},
+                "prompt": {"required": ["prompt"]},
+            },
+        },
+    },
+}
+
+
+_lock = threading.Lock()
+_specs = None
+_loaded = {}
+
+
+# -------------------------------
+# SPEC DISCOVERY
+# -------------------------------
+def _discover() -> dict:
+    specs = {name: dict(spec) for name, spec in BUILTIN_ENGINES.items()}
+
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        if ep.name in specs:
+            # Built-ins always win over plugins with the same name
+            continue
+        specs[ep.name] = dict(ep.load())
+
+    return specs
+
+
+def list_engines() -> dict:
+    """
+    Returns all registered engine specs by name.
+    Entry points are scanned once per process.
+    """
+    global _specs
+    if _specs is None:
+        with _lock:
+            if _specs is None:
+                _specs = _discover()
+    return _specs
+
+
+def get_engine_spec(name: str) -> dict:
+    spec = list_engines().get(name)
+    if spec is None:
+        raise ValueError(f"Unknown engine: {name}")
+    return spec
+
+
+def get_engine_cost(name: str) -> int:
+    return int(get_engine_spec(name)["cost"])
+
+
+# -------------------------------
+# CONFIG VALIDATION
+# -------------------------------
+def validate_engine_config(name: str, config: dict):
+    """
+    Checks a job config against the engine's config schema.
+    Raises ValueError with a user-facing message.
+    """
+    schema = get_engine_spec(name).get("config_schema") or {}
+    input_types = schema.get("input_types")
+    if input_types is None:
+        return
+
+    input_type = config.get("input_type")
+    if input_type not in input_types:
+        raise ValueError(
+            f"Unsupported input_type for engine '{name}': {input_type}"
+        )
+
+    rules = input_types[input_type]
+
+    missing = [
+        key
+        for key in rules.get("required", [])
+        if config.get(key) in (None, "")
+    ]
+    if missing:
+        raise ValueError(
+            f"Missing required config for input_type '{input_type}': "
+            + ", ".join(missing)
+        )
+
+    one_of = rules.get("required_one_of")
+    if one_of and all(config.get(key) in (None, "") for key in one_of):
+        raise ValueError(
+            f"input_type '{input_type}' requires one of: " + ", ".join(one_of)
+        )
+
+
+# -------------------------------
+# LAZY ENGINE LOADING
+# -------------------------------
+def load_engine(name: str):
+    """
+    Imports and returns the engine's run_job callable.
+    This is the only place engine implementation modules are imported.
+    """
+    run_job = _loaded.get(name)
+    if run_job is not None:
+        return run_job
+
+    module_path, _, attr = get_engine_spec(name)["entrypoint"].partition(":")
+    run_job = getattr(importlib.import_module(module_path), attr or "run_job")
+
+    _loaded[name] = run_job
+    return run_job
+
+
+def warm_engines() -> list:
+    """
+    Imports every engine and runs its warmup hook.
+    Returns the names of the engines warmed.
+    """
+    warmed = []
+    for name, spec in list_engines().items():
+        load_engine(name)
+
+        if spec.get("warmup"):
+            module_path, _, attr = spec["warmup"].partition(":")
+            getattr(importlib.import_module(module_path), attr)()
+        warmed.append(name)
+    return warmed
@@ -0,0 +1,215 @@
+"""
+Caption burn-in.
+
+Each caption is rendered once into an RGBA overlay using a glyph atlas.
+The atlas rasterizes each character of a font once per process and lays
+captions out by copying the cached glyph masks. Overlays are
+alpha-composited onto the pre-scaled stills with NumPy, inside the same
+frame pass that feeds the encoder. There is no second encode.
+"""
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+CAPTION_FONT_PATH = os.getenv("CAPTION_FONT_PATH", "DejaVuSans-Bold.ttf")
+
+# Relative to frame size
+CAPTION_FONT_SCALE = 0.045      # font px / frame height
+CAPTION_MAX_WIDTH = 0.86        # wrap width / frame width
+CAPTION_BOTTOM_MARGIN = 0.12    # gap below captions / frame height
+CAPTION_STROKE_SCALE = 0.12     # outline radius / font px
+CAPTION_MAX_LINES = 3
+
+
+# -------------------------------
+# FONT + GLYPH ATLAS
+# -------------------------------
+@lru_cache(maxsize=8)
+def load_font(size: int):
+    try:
+        return ImageFont.truetype(CAPTION_FONT_PATH, size)
+    except OSError:
+        # Pillow's bundled scalable font (needs FreeType)
+        return ImageFont.load_default(size=size)
+
+
+class GlyphAtlas:
+    """
+    Per-font cache of rasterized glyph masks and advances.
+    """
+
+    def __init__(self, size: int):
+        self.font = load_font(size)
+        ascent, descent = self.font.getmetrics()
+        self.ascent = ascent
+        self.line_height = int((ascent + descent) * 1.15)
+        self._glyphs = {}
+        self._lock = threading.Lock()
+
+    def glyph(self, ch: str):
+        """
+        Returns (mask, x_offset, y_offset, advance) for a character.
+        """
+        glyph = self._glyphs.get(ch)
+        if glyph is not None:
+            return glyph
+
+        left, top, right, bottom = self.font.getbbox(ch)
+        width, height = max(right - left, 0), max(bottom - top, 0)
+
+        if width and height:
+            image = Image.new("L", (width, height), 0)
+            ImageDraw.Draw(image).text((-left, -top), ch, font=self.font, fill=255)
+            mask = np.asarray(image, dtype=np.uint8)
+        else:
+            mask = np.zeros((0, 0), dtype=np.uint8)
+
+        glyph = (mask, left, top, self.font.getlength(ch))
+        with self._lock:
+            self._glyphs[ch] = glyph
+        return glyph
+
+    def text_width(self, text: str) -> float:
+        return sum(self.glyph(ch)[3] for ch in text)
+
+
+_atlases = {}
+_atlases_lock = threading.Lock()
+
+
+def get_atlas(size: int) -> GlyphAtlas:
+    atlas = _atlases.get(size)
+    if atlas is None:
+        with _atlases_lock:
+            atlas = _atlases.get(size)
+            if atlas is None:
+                atlas = GlyphAtlas(size)
+                _atlases[size] = atlas
+    return atlas
+
+
+# -------------------------------
+# LAYOUT + RENDER
+# -------------------------------
+def wrap_text(atlas: GlyphAtlas, text: str, max_width: float) -> list:
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and atlas.text_width(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines[:CAPTION_MAX_LINES]
+
+
+def _dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Max filter over a (2r+1)^2 square, for the caption outline.
+    Separable: one pass along each axis.
+    """
+    out = mask
+    for axis in (0, 1):
+        padded = np.pad(out, [(radius, radius) if a == axis else (0, 0) for a in (0, 1)])
+        length = out.shape[axis]
+        result = out.copy()
+        for offset in range(2 * radius + 1):
+            window = padded[offset: offset + length] if axis == 0 else padded[:, offset: offset + length]
+            np.maximum(result, window, out=result)
+        out = result
+    return out
+
+
+def render_caption(text: str, frame_size: tuple) -> dict | None:
+    """
+    Renders a caption to an RGBA overlay strip.
+
+    Returns {"y": top row in the frame, "rgba": H x W x 4 uint8}.
+    """
+    frame_width, frame_height = frame_size
+    atlas = get_atlas(max(12, int(frame_height * CAPTION_FONT_SCALE)))
+
+    lines = wrap_text(atlas, " ".join(text.split()), frame_width * CAPTION_MAX_WIDTH)
+    if not lines:
+        return None
+
+    stroke = max(1, int(atlas.line_height * CAPTION_STROKE_SCALE))
+    strip_height = atlas.line_height * len(lines) + 2 * stroke
+    mask = np.zeros((strip_height, frame_width), dtype=np.uint8)
+
+    for row, line in enumerate(lines):
+        x = (frame_width - atlas.text_width(line)) / 2
+        baseline_top = stroke + row * atlas.line_height
+
+        for ch in line:
+            glyph_mask, left, top, advance = atlas.glyph(ch)
+            gx, gy = int(round(x + left)), baseline_top + top
+            gh, gw = glyph_mask.shape
+
+            # Clip to the strip
+            x0, y0 = max(gx, 0), max(gy, 0)
+            x1, y1 = min(gx + gw, frame_width), min(gy + gh, strip_height)
+            if x1 > x0 and y1 > y0:
+                np.maximum(
+                    mask[y0:y1, x0:x1],
+                    glyph_mask[y0 - gy: y1 - gy, x0 - gx: x1 - gx],
+                    out=mask[y0:y1, x0:x1],
+                )
+            x += advance
+
+    outline = _dilate(mask, stroke)
+
+    # White text over a black outline
+    text_alpha = mask.astype(np.float32) / 255
+    alpha = np.maximum(text_alpha, outline.astype(np.float32) / 255)
+    color = np.divide(text_alpha, alpha, out=np.zeros_like(alpha), where=alpha > 0)
+
+    rgba = np.empty((strip_height, frame_width, 4), dtype=np.uint8)
+    rgba[..., :3] = (color * 255 + 0.5).astype(np.uint8)[..., None]
+    rgba[..., 3] = (alpha * 255 + 0.5).astype(np.uint8)
+
+    y = frame_height - int(frame_height * CAPTION_BOTTOM_MARGIN) - strip_height
+    return {"y": max(0, y), "rgba": rgba}
+
+
+def composite(still: np.ndarray, overlay: dict | None) -> np.ndarray:
+    """
+    Alpha-composites an overlay strip onto a copy of the still.
+    """
+    if overlay is None:
+        return still
+
+    frame = still.copy()
+    rgba = overlay["rgba"]
+    y = overlay["y"]
+    region = frame[y: y + rgba.shape[0]]
+    rgba = rgba[: region.shape[0]]
+
+    alpha = rgba[..., 3:4].astype(np.uint16)
+    blended = (
+        rgba[..., :3].astype(np.uint16) * alpha
+        + region.astype(np.uint16) * (255 - alpha)
+        + 127
+    ) // 255
+    region[...] = blended.astype(np.uint8)
+    return frame
+
+
+def caption_texts(captions) -> list:
+    """
+    Normalizes the LLM's on_screen_captions (strings or objects).
+    """
+    texts = []
+    for caption in captions or []:
+        if isinstance(caption, dict):
+            caption = caption.get("text") or caption.get("caption") or ""
+        caption = str(caption).strip()
+        if caption:
+            texts.append(caption)
+    return texts
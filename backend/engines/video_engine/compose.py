@@ -0,0 +1,130 @@
+"""
+Reel frame composition.
+
+A reel is a sequence of still images with captions over them, so every
+frame inside a (still, caption) segment is identical. Each segment is
+composited once and the same buffer is handed to the encoder for every
+frame in it. Nothing is recomputed per frame.
+
+Stills are normalized once, when the image arrives from the backend:
+decoded, cover-scaled to the render size and stored as a raw frame that
+assembly memory-maps (or as lossless WebP, see STILL_FORMAT).
+"""
+import os
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from backend.engines.video_engine.captions import composite
+from backend.tracing import traced
+
+# How generated images are kept until assembly, already at the render size:
+# "raw"  → RGB24 frame buffer, memory-mapped by assembly (no decode at all)
+# "webp" → lossless WebP (smaller on disk; one decode, no resize)
+STILL_FORMAT = os.getenv("VIDEO_STILL_FORMAT", "raw")
+STILL_SUFFIXES = {"raw": ".rgb", "webp": ".webp"}
+
+
+def cover_frame(image: Image.Image, frame_size: tuple) -> np.ndarray:
+    """
+    Cover-scales a decoded image to the render size.
+    Returns a contiguous H x W x 3 uint8 frame.
+    """
+    width, height = frame_size
+    image = image.convert("RGB")
+    if image.size != (width, height):
+        scale = max(width / image.width, height / image.height)
+        size = (max(width, round(image.width * scale)), max(height, round(image.height * scale)))
+        if size != image.size:
+            image = image.resize(size, Image.LANCZOS)
+
+        left = (image.width - width) // 2
+        top = (image.height - height) // 2
+        image = image.crop((left, top, left + width, top + height))
+
+    return np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+
+
+@traced("image.normalize")
+def normalize_still(content: bytes, output_path: Path, frame_size: tuple) -> Path:
+    """
+    Decodes a generated image once, as it arrives, and stores it at the
+    render size in STILL_FORMAT (suffix replaced), atomically.
+    Returns the path written.
+    """
+    with Image.open(BytesIO(content)) as image:
+        frame = cover_frame(image, frame_size)
+
+    path = output_path.with_suffix(STILL_SUFFIXES[STILL_FORMAT])
+    partial_path = path.with_name(f".{path.name}")
+    if STILL_FORMAT == "raw":
+        frame.tofile(partial_path)
+    else:
+        Image.fromarray(frame).save(partial_path, "WEBP", lossless=True)
+    os.replace(partial_path, path)
+    return path
+
+
+def load_still(image_path: Path, frame_size: tuple) -> np.ndarray:
+    """
+    A still as an H x W x 3 uint8 frame. Raw frames are memory-mapped
+    (read-only; the encoder writes straight from the mapping); anything
+    else is decoded and cover-scaled.
+    """
+    width, height = frame_size
+    if image_path.suffix == STILL_SUFFIXES["raw"]:
+        if image_path.stat().st_size != width * height * 3:
+            raise ValueError(f"{image_path.name} is not a {width}x{height} RGB24 frame")
+        return np.memmap(image_path, dtype=np.uint8, mode="r", shape=(height, width, 3))
+
+    with Image.open(image_path) as image:
+        return cover_frame(image, frame_size)
+
+
+def _edges(durations: list, fps: int) -> list:
+    """
+    Frame index where each segment ends.
+    """
+    return [int(round(t * fps)) for t in np.cumsum(durations)]
+
+
+def iter_reel_frames(
+    stills: list,
+    still_durations: list,
+    overlays: list,
+    overlay_durations: list,
+    fps: int,
+):
+    """
+    Yields one RGB frame per video frame.
+
+    stills[i] is on screen for still_durations[i] seconds; overlays[j]
+    (or None) for overlay_durations[j]. A frame buffer is reused for
+    every frame of its segment.
+    """
+    still_edges = _edges(still_durations, fps)
+    overlay_edges = _edges(overlay_durations, fps) if overlays else []
+    total_frames = still_edges[-1]
+
+    still_index = 0
+    overlay_index = 0
+    frame_index = 0
+
+    while frame_index < total_frames:
+        while still_edges[still_index] <= frame_index:
+            still_index += 1
+        while overlay_index < len(overlay_edges) and overlay_edges[overlay_index] <= frame_index:
+            overlay_index += 1
+
+        overlay = overlays[overlay_index] if overlay_index < len(overlays) else None
+
+        segment_end = still_edges[still_index]
+        if overlay_index < len(overlay_edges):
+            segment_end = min(segment_end, overlay_edges[overlay_index])
+
+        frame = composite(stills[still_index], overlay)
+        for _ in range(segment_end - frame_index):
+            yield frame
+        frame_index = segment_end
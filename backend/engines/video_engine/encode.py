@@ -0,0 +1,250 @@
+"""
+Single-pass multi-rendition encoding.
+
+Frames are composited once and piped as raw RGB into ONE ffmpeg process.
+Its filter graph splits the stream, scales each branch to a rendition
+size, and encodes each branch once. Each encoded rendition is tee'd to
+a faststart MP4 and, when the profile asks for it, an HLS variant.
+Nothing is decoded twice and there is no downstream re-encode.
+
+Every output is written under a hidden name and renamed when ffmpeg
+succeeds, so a half-written rendition is never listed or served.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import imageio_ffmpeg
+
+from backend.engines.context import JobContext
+from backend.tracing import traced
+
+FPS = 30
+
+# Fixed GOP so every rendition has aligned keyframes (HLS switching)
+GOP_SECONDS = 2
+HLS_SEGMENT_SECONDS = 4
+
+RENDITIONS = {
+    "1080p": {
+        "width": 1080,
+        "height": 1920,
+        "video_bitrate": "6M",
+        "audio_bitrate": "160k",
+        "filename": "final_video.mp4",
+    },
+    "720p": {
+        "width": 720,
+        "height": 1280,
+        "video_bitrate": "3M",
+        "audio_bitrate": "128k",
+        "filename": "video_720p.mp4",
+    },
+    "preview": {
+        "width": 360,
+        "height": 640,
+        "video_bitrate": "400k",
+        "audio_bitrate": "64k",
+        "filename": "video_preview.mp4",
+    },
+}
+
+# A profile picks the renditions to produce; the first is the primary
+OUTPUT_PROFILES = {
+    "default": {"renditions": ["1080p", "720p", "preview"], "hls": True},
+    "mp4_only": {"renditions": ["1080p", "720p", "preview"], "hls": False},
+    "single": {"renditions": ["1080p"], "hls": False},
+}
+
+DEFAULT_OUTPUT_PROFILE = os.getenv("VIDEO_OUTPUT_PROFILE", "default")
+
+
+def get_output_profile(name: str | None) -> dict:
+    profile = OUTPUT_PROFILES.get(name or DEFAULT_OUTPUT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown output profile: {name}")
+    return profile
+
+
+def master_frame_size(profile: dict) -> tuple:
+    """
+    Composite size for a profile: its largest rendition.
+    Smaller renditions are scaled down from it inside ffmpeg.
+    """
+    spec = max(
+        (RENDITIONS[name] for name in profile["renditions"]),
+        key=lambda r: r["width"] * r["height"],
+    )
+    return spec["width"], spec["height"]
+
+
+def _bitrate_bps(bitrate: str) -> int:
+    units = {"k": 1_000, "M": 1_000_000}
+    if bitrate[-1] in units:
+        return int(float(bitrate[:-1]) * units[bitrate[-1]])
+    return int(bitrate)
+
+
+def _build_command(
+    ffmpeg: str,
+    *,
+    frame_size: tuple,
+    audio_path: Path,
+    renditions: list,
+    hls_dir: Path | None,
+    partial_paths: dict,
+) -> list:
+    width, height = frame_size
+
+    cmd = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "-s", f"{width}x{height}", "-r", str(FPS),
+        "-i", "pipe:0",
+        "-i", str(audio_path),
+    ]
+
+    # One decode → split → scale/crop per rendition (cover, no bars)
+    labels = [f"v{i}" for i in range(len(renditions))]
+    graph = [f"[0:v]split={len(renditions)}" + "".join(f"[{label}]" for label in labels)]
+    for i, (name, spec) in enumerate(renditions):
+        w, h = spec["width"], spec["height"]
+        graph.append(
+            f"[v{i}]scale={w}:{h}:force_original_aspect_ratio=increase,"
+            f"crop={w}:{h},setsar=1,format=yuv420p[o{i}]"
+        )
+    cmd += ["-filter_complex", ";".join(graph)]
+
+    gop = FPS * GOP_SECONDS
+    for i, (name, spec) in enumerate(renditions):
+        bitrate = _bitrate_bps(spec["video_bitrate"])
+        cmd += [
+            "-map", f"[o{i}]", "-map", "1:a",
+            "-c:v", "libx264", "-preset", "veryfast",
+            "-b:v", spec["video_bitrate"],
+            "-maxrate", str(int(bitrate * 1.2)),
+            "-bufsize", str(bitrate * 2),
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-c:a", "aac", "-b:a", spec["audio_bitrate"],
+            "-shortest",
+            # tee can't ask the encoders for it per container: MP4 needs
+            # SPS/PPS and the AAC config in the header, and the HLS
+            # (mpegts) muxer re-inserts them in-band on its own
+            "-flags", "+global_header",
+        ]
+
+        # One encode, tee'd to every container that needs it
+        targets = [f"[f=mp4:movflags=+faststart]{partial_paths[name]}"]
+        if hls_dir is not None:
+            targets.append(
+                f"[f=hls:hls_time={HLS_SEGMENT_SECONDS}:hls_playlist_type=vod:"
+                f"hls_segment_filename={hls_dir / f'{name}_%03d.ts'}]"
+                f"{hls_dir / f'{name}.m3u8'}"
+            )
+        cmd += ["-f", "tee", "|".join(targets)]
+
+    return cmd
+
+
+def _write_master_playlist(hls_dir: Path, renditions: list):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for name, spec in renditions:
+        bandwidth = _bitrate_bps(spec["video_bitrate"]) + _bitrate_bps(spec["audio_bitrate"])
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},"
+            f"RESOLUTION={spec['width']}x{spec['height']}"
+        )
+        lines.append(f"{name}.m3u8")
+    (hls_dir / "master.m3u8").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@traced("video.encode")
+def encode_renditions(
+    frames,
+    *,
+    frame_size: tuple,
+    audio_path: Path,
+    output_dir: Path,
+    profile: dict,
+    context: JobContext | None = None,
+) -> dict:
+    """
+    Encodes an RGB24 frame iterator into every rendition of a profile
+    in a single pass. The job context is checked once per second of
+    video; a stopped job kills ffmpeg instead of finishing the encode.
+
+    Returns the rendition manifest:
+        {"renditions": [{"name", "path", "width", "height", ...}],
+         "hls": "hls/master.m3u8" | None}
+    with paths relative to output_dir.
+    """
+    renditions = [(name, RENDITIONS[name]) for name in profile["renditions"]]
+
+    partial_paths = {
+        name: output_dir / f".{spec['filename']}"
+        for name, spec in renditions
+    }
+
+    hls_dir = None
+    final_hls_dir = output_dir / "hls"
+    if profile.get("hls"):
+        hls_dir = output_dir / ".hls"
+        shutil.rmtree(hls_dir, ignore_errors=True)
+        hls_dir.mkdir(parents=True)
+
+    cmd = _build_command(
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        frame_size=frame_size,
+        audio_path=audio_path,
+        renditions=renditions,
+        hls_dir=hls_dir,
+        partial_paths=partial_paths,
+    )
+
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for index, frame in enumerate(frames):
+                if context is not None and index % FPS == 0:
+                    context.check()
+                proc.stdin.write(memoryview(frame))
+        except BrokenPipeError:
+            pass
+        except BaseException:
+            # Abandoned (cancel, deadline, frame error) → no partial finish
+            proc.kill()
+            raise
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = proc.wait()
+
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8", "replace").strip()
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {message[-2000:]}")
+
+    manifest = {"renditions": [], "hls": None}
+
+    for name, spec in renditions:
+        final_path = output_dir / spec["filename"]
+        os.replace(partial_paths[name], final_path)
+        manifest["renditions"].append({
+            "name": name,
+            "path": spec["filename"],
+            "width": spec["width"],
+            "height": spec["height"],
+            "video_bitrate": spec["video_bitrate"],
+        })
+
+    if hls_dir is not None:
+        _write_master_playlist(hls_dir, renditions)
+        shutil.rmtree(final_hls_dir, ignore_errors=True)
+        os.replace(hls_dir, final_hls_dir)
+        manifest["hls"] = "hls/master.m3u8"
+
+    return manifest
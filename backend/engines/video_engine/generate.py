@@ -1,30 +1,74 @@
-import requests
-import numpy as np
-import time
-import base64
 import os
 import hashlib
 import json
+import queue
+import shutil
+import threading
 from pathlib import Path
+import imageio_ffmpeg
 from pypdf import PdfReader
-from moviepy.editor import (
-    ImageClip,
-    AudioFileClip,
-    concatenate_videoclips,
-    CompositeVideoClip
-)
-from PIL import Image, ImageDraw, ImageFont
 from openai import OpenAI
 
-# Pillow compatibility
-if not hasattr(Image, "ANTIALIAS"):
-    Image.ANTIALIAS = Image.Resampling.LANCZOS
-
+from backend.engines.errors import EngineError, SystemFailure, UserContentError  # noqa: F401
+from backend.engines.errors import JobInterrupted, ProviderUnavailable
+from backend.engines.context import JobContext
+from backend.engines.video_engine.jsonstream import JsonArrayStream
+from backend.engines.video_engine.image_backends import generate_image_bytes, get_backends
+from backend.engines.video_engine.captions import caption_texts, render_caption
+from backend.engines.video_engine.compose import STILL_SUFFIXES, iter_reel_frames, load_still, normalize_still
+from backend.engines.video_engine.encode import (
+    FPS,
+    encode_renditions,
+    get_output_profile,
+    master_frame_size,
+)
+from backend.engines.video_engine.previews import generate_previews
+from backend.engines.video_engine.voiceover import (
+    audio_duration,
+    generate_voiceover,
+    image_durations,
+    load_timings,
+)
+from backend.engines.circuit import get_breaker
+from backend.storage.blobs import blob_path
+from backend.storage.backends import is_scratch_storage, publish_job_file
+from backend.config import PURGE_INTERMEDIATES
+from backend.profiling import profiled_stage, stage
+from backend.tracing import bind_context, current_span, iter_in_span, span, start_span, traced
 
 # -------------------------------
 # CLIENTS
 # -------------------------------
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_client = None
+
+
+def get_client() -> OpenAI:
+    """
+    Returns the shared OpenAI client, created on first use.
+    """
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+
+def warm():
+    """
+    Worker warmup (see backend/workers): pays every first-job cost once,
+    before the supervisor forks.
+    """
+    get_client()
+    get_backends()
+    imageio_ffmpeg.get_ffmpeg_exe()  # cached after the first lookup
+
+
+# -------------------------------
+# CIRCUIT BREAKERS (per provider)
+# -------------------------------
+# Names must match the "providers" of the video engine spec.
+# Image backends and TTS have their own breakers (see image_backends,
+# voiceover).
+chat_breaker = get_breaker("openai_chat", slow_call_seconds=90)
 
 
 # -------------------------------
@@ -34,13 +78,17 @@ def prompt_hash(prompt: str) -> str:
     return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
 
 
+def extract_pdf_text(file_path: Path) -> str:
+    reader = PdfReader(file_path)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() or ""
+    return text
+
+
 def extract_text_from_file(file_path: Path) -> str:
     if file_path.suffix.lower() == ".pdf":
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
+        return extract_pdf_text(file_path)
 
     elif file_path.suffix.lower() == ".txt":
         return file_path.read_text(encoding="utf-8")
@@ -49,10 +97,105 @@ def extract_text_from_file(file_path: Path) -> str:
         raise ValueError("Unsupported file type")
 
 
+# -------------------------------
+# STREAMED LLM OUTPUT
+# -------------------------------
+# Stream chat completions and hand each JSON object downstream as soon
+# as it closes. Off → one blocking request, same parsing and repair.
+LLM_STREAMING = os.getenv("VIDEO_LLM_STREAMING", "1") == "1"
+
+
+def stream_chat_completion(prompt: str, temperature: float, context: JobContext | None = None):
+    """
+    Yields the completion's text as it is generated.
+    """
+    context = context or JobContext()
+
+    # Not the current span: a generator may be resumed on another thread
+    call = start_span("provider.openai_chat", **{"llm.model": "gpt-4.1-mini", "llm.streaming": LLM_STREAMING})
+    try:
+        with chat_breaker.guard(ignore=(JobInterrupted,)):
+            response = get_client().chat.completions.create(
+                model="gpt-4.1-mini",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=LLM_STREAMING,
+                timeout=context.timeout(120)
+            )
+
+        if not LLM_STREAMING:
+            yield response.choices[0].message.content or ""
+            return
+
+        # Cancel/deadline closes the stream mid-generation
+        unregister = context.on_stop(response.close)
+        try:
+            first = True
+            for chunk in response:
+                context.check()
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first:
+                        call.add_event("first_token")
+                        first = False
+                    yield delta
+        finally:
+            unregister()
+            response.close()
+
+    except Exception as e:
+        call.record_exception(e)
+        raise
+    finally:
+        call.end()
+
+
+def stream_json_objects(
+    prompt: str,
+    temperature: float,
+    max_attempts: int = 2,
+    context: JobContext | None = None
+):
+    """
+    Yields each object of the JSON array in the completion as it closes.
+
+    Truncated or malformed output is repaired in place; the prompt is
+    only re-requested when nothing at all could be salvaged.
+    """
+    for attempt in range(1, max_attempts + 1):
+        if attempt > 1:
+            current_span().add_event("llm.reprompt", attempt=attempt)
+
+        parser = JsonArrayStream()
+        count = 0
+
+        try:
+            for delta in stream_chat_completion(prompt, temperature, context):
+                for obj in parser.feed(delta):
+                    count += 1
+                    yield obj
+        except (ProviderUnavailable, JobInterrupted):
+            raise
+        except Exception:
+            # Stream broke off → salvage what arrived below,
+            # unless it was closed because the job was stopped
+            if context is not None:
+                context.check()
+
+        for obj in parser.finish():
+            count += 1
+            yield obj
+
+        if count:
+            return
+
+
 # -------------------------------
 # AI ANALYSIS
 # -------------------------------
-def analyze_chapter_with_ai(chapter_text: str) -> dict:
+def analyze_chapter_with_ai(chapter_text: str, context: JobContext | None = None) -> dict:
     prompt = f"""
 You are an expert teacher.
 
@@ -68,12 +211,19 @@ CHAPTER TEXT:
 {chapter_text}
 """
 
+    context = context or JobContext()
+
     try:
-        response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.4
-        )
+        with span("provider.openai_chat", **{"llm.model": "gpt-4.1-mini", "llm.streaming": False}), \
+                chat_breaker.guard(ignore=(JobInterrupted,)):
+            response = get_client().chat.completions.create(
+            model="gpt-4.1-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.4,
+            timeout=context.timeout(120)
+            )
+    except EngineError:
+        raise
     except Exception as e:
         raise SystemFailure(f"LLM analysis failed: {e}") from e
     
@@ -85,7 +235,10 @@ CHAPTER TEXT:
         return {"raw_output": content}
 
 
-def generate_reel_scripts(chapter_analysis: dict) -> list:
+def iter_reel_scripts(chapter_analysis: dict, context: JobContext | None = None):
+    """
+    Yields each reel script as soon as the LLM closes its JSON object.
+    """
     prompt = f"""
 You are an expert educational content creator.
 
@@ -111,35 +264,16 @@ SOURCE MATERIAL:
 {json.dumps(chapter_analysis, indent=2)}
 """
 
-    for _ in range(2):
-        response = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
-
-        text = response.choices[0].message.content.strip()
-
-        if text.startswith("```"):
-            text = text.split("```")[1].strip()
-
-        if text.lower().startswith("json"):
-            text = text[4:].strip()
-
-        try:
-            reels = json.loads(text)
-            if isinstance(reels, list) and reels:
-                return reels
-        except json.JSONDecodeError:
-            continue
-
-    raise SystemFailure("Failed to generate reel scripts")
+    yield from stream_json_objects(prompt, temperature=0.3, context=context)
 
 
 # -------------------------------
 # IMAGE PROMPTS & GENERATION
 # -------------------------------
-def generate_image_prompts(reel_title: str, spoken_narration: str) -> dict:
+def iter_image_prompts(reel_title: str, spoken_narration: str, context: JobContext | None = None):
+    """
+    Yields each image prompt as soon as the LLM closes its JSON object.
+    """
     prompt = f"""
 You are a visual director for educational short videos.
 
@@ -168,191 +302,166 @@ NARRATION:
 {spoken_narration}
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.4
-    )
-
-    text = response.choices[0].message.content.strip()
-
-    if text.startswith("```"):
-        text = text.split("```")[1].strip()
-
-    if text.lower().startswith("json"):
-        text = text[4:].strip()
-
-    parsed = json.loads(text)
-    if "images" not in parsed:
-        raise SystemFailure("Invalid image prompt output")
-
-    return parsed
-
-
-def generate_image(prompt: str, output_path: Path, max_retries: int = 3):
-    hf_token = os.getenv("HUGGINGFACE_TOKEN")
-    if not hf_token:
-        # 🚨 System misconfiguration → refundable
-        raise SystemFailure("HUGGINGFACE_TOKEN not set")
+    yield from stream_json_objects(prompt, temperature=0.4, context=context)
 
-    model_id = "stabilityai/stable-diffusion-xl-base-1.0"
-    url = f"https://router.huggingface.co/hf-inference/models/{model_id}"
 
-    headers = {
-        "Authorization": f"Bearer {hf_token}",
-        "Accept": "image/png",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "height": 1536,
-            "width": 1024,
-            "guidance_scale": 7.5,
-            "num_inference_steps": 30
-        }
-    }
+def generate_image(
+    prompt: str,
+    output_path: Path,
+    context: JobContext | None = None,
+    frame_size: tuple | None = None
+) -> Path:
+    """
+    Generates one image via the configured backends (hedged, with
+    failover) and writes it atomically. With frame_size, it is stored
+    normalized for assembly instead (see compose.normalize_still).
+    Returns the path written.
+    """
+    content = generate_image_bytes(prompt, context=context)
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
+    if frame_size is not None:
+        return normalize_still(content, output_path, frame_size)
 
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = requests.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=120
-            )
-        except Exception as e:
-            # 🚨 Network / request failure → refundable
-            raise SystemFailure(f"SDXL request failed: {e}") from e
-
-        if response.status_code == 200:
-            output_path.write_bytes(response.content)
-            return
-
-        # Retry-safe HF failures
-        if response.status_code in (429, 503):
-            time.sleep(5 * attempt)
-            continue
-
-        # 🚨 Hard HF failure → refundable
-        raise SystemFailure(
-            f"SDXL failed: {response.status_code} {response.text}"
-        )
-
-    # 🚨 All retries exhausted → refundable
-    raise SystemFailure("SDXL unavailable after retries")
+    partial_path = output_path.with_name(f".{output_path.name}")
+    partial_path.write_bytes(content)
+    os.replace(partial_path, output_path)
+    return output_path
 
 
 
 # -------------------------------
 # VOICEOVER
 # -------------------------------
-def generate_voiceover(text: str, output_path: Path):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        # 🚨 System misconfiguration → refundable
-        raise SystemFailure("OPENAI_API_KEY not set")
-
-    try:
-        response = requests.post(
-            "https://api.openai.com/v1/audio/speech",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-4o-mini-tts",
-                "voice": "alloy",
-                "input": text,
-                "format": "mp3"
-            },
-            timeout=120
-        )
-    except Exception as e:
-        # 🚨 Network / request failure → refundable
-        raise SystemFailure(f"TTS request failed: {e}") from e
-
-    if response.status_code != 200:
-        # 🚨 OpenAI TTS failure → refundable
-        raise SystemFailure(
-            f"TTS failed: {response.status_code} {response.text}"
-        )
-
-    output_path.write_bytes(response.content)
+# Chunked parallel synthesis → see voiceover.generate_voiceover
 
 
 
 # -------------------------------
 # VIDEO ASSEMBLY
 # -------------------------------
+# Burn on_screen_captions into the video (same encode pass)
+BURN_CAPTIONS = os.getenv("VIDEO_BURN_CAPTIONS", "1") == "1"
+
+
 def assemble_video(
     images_dir: Path,
     audio_path: Path,
-    output_path: Path
-):
-    image_files = sorted(images_dir.glob("image_*.png"))
+    reel_dir: Path,
+    profile: dict,
+    captions: list | None = None,
+    context: JobContext | None = None
+) -> dict:
+    """
+    Composites the reel once and encodes every rendition of the output
+    profile from that single pass. Returns the rendition manifest.
+    """
+    image_files = sorted(
+        path for path in images_dir.glob("image_*")
+        if path.suffix in (".png", *STILL_SUFFIXES.values())
+    )
     if not image_files:
         raise RuntimeError("No images found")
 
-    audio = AudioFileClip(str(audio_path))
-    duration = audio.duration
-    duration_per_image = duration / len(image_files)
-
-    clips = [
-        ImageClip(str(img))
-        .set_duration(duration_per_image)
-        .resize(height=1536)
-        .set_position("center")
-        for img in image_files
-    ]
-
-    video = concatenate_videoclips(clips, method="compose").set_audio(audio)
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    video.write_videofile(
-        str(output_path),
-        fps=30,
-        codec="libx264",
-        audio_codec="aac",
-        verbose=False,
-        logger=None
+    duration = audio_duration(audio_path)
+    timings = load_timings(audio_path)
+
+    # Cut images on sentence boundaries from the TTS chunk timings
+    durations = image_durations(timings, len(image_files), duration)
+
+    # Stills were normalized to the composite size as they arrived:
+    # raw frames are mapped, not decoded (the encoder reads the mapping)
+    frame_size = master_frame_size(profile)
+    stills = [load_still(img, frame_size) for img in image_files]
+
+    # Each caption rendered once, timed to the narration the same way
+    texts = caption_texts(captions) if BURN_CAPTIONS else []
+    overlays = [render_caption(text, frame_size) for text in texts]
+    overlay_durations = image_durations(timings, len(overlays), duration) if overlays else []
+
+    reel_dir.mkdir(parents=True, exist_ok=True)
+    manifest = encode_renditions(
+        iter_reel_frames(stills, durations, overlays, overlay_durations, FPS),
+        frame_size=frame_size,
+        audio_path=audio_path,
+        output_dir=reel_dir,
+        profile=profile,
+        context=context,
     )
 
+    # Poster/thumbnails/sprite from the stills already decoded above
+    manifest["previews"] = generate_previews(stills, durations, reel_dir)
+    manifest["captions"] = len(overlays)
+    return manifest
+
 
 # =========================================================
 # INTERNAL PIPELINE STAGES (STEP 3)
 # =========================================================
 
-def stage_analyze_input(input_type: str, config: dict, output_dir: Path) -> dict:
+@traced("stage_analyze_input")
+@profiled_stage("stage_analyze_input")
+def stage_analyze_input(
+    input_type: str,
+    config: dict,
+    output_dir: Path,
+    context: JobContext | None = None
+) -> dict:
+    context = context or JobContext()
+
     if input_type == "pdf":
-        pdf_path = Path(config["pdf_path"])
-        source_text = extract_text_from_file(pdf_path)
+        if config.get("pdf_blob"):
+            # Uploaded via /uploads → content-addressed blob store
+            pdf_path = blob_path(config["pdf_blob"])
+            if not pdf_path.exists():
+                raise SystemFailure("Uploaded PDF is not available on this worker")
+            source_text = extract_pdf_text(pdf_path)
+        else:
+            pdf_path = Path(config["pdf_path"])
+            source_text = extract_text_from_file(pdf_path)
 
     elif input_type == "text":
-        source_text = config.get("text", "").strip()
+        if config.get("text_blob"):
+            # Chapter of a book batch: extracted once, shared via the blob store
+            text_path = blob_path(config["text_blob"])
+            if not text_path.exists():
+                raise SystemFailure("Chapter text is not available on this worker")
+            source_text = text_path.read_text(encoding="utf-8").strip()
+        else:
+            source_text = config.get("text", "").strip()
         if not source_text:
             raise UserContentError("Empty text input")
 
+        if config.get("chapter_title") or config.get("book_title"):
+            heading = " / ".join(
+                part for part in (config.get("book_title"), config.get("chapter_title")) if part
+            )
+            source_text = f"[{heading}]\n\n{source_text}"
+
     elif input_type == "prompt":
         prompt = config.get("prompt", "").strip()
         if not prompt:
             raise UserContentError("Empty prompt input")
 
-        analysis = analyze_chapter_with_ai(prompt)
+        analysis = analyze_chapter_with_ai(prompt, context)
         source_text = analysis.get("raw_output", prompt)
 
     else:
         raise UserContentError("Unsupported input_type")
 
-    analysis = analyze_chapter_with_ai(source_text)
-    reels = generate_reel_scripts(analysis)
+    context.check()
+    analysis = analyze_chapter_with_ai(source_text, context)
+    context.report_progress(ANALYSIS_PROGRESS)
 
     (output_dir / "source_text.txt").write_text(source_text, encoding="utf-8")
     (output_dir / "analysis.json").write_text(json.dumps(analysis, indent=2), encoding="utf-8")
-    (output_dir / "reels.json").write_text(json.dumps(reels, indent=2), encoding="utf-8")
+
+    # Streamed: reels flow downstream as the LLM produces them. That
+    # happens after this stage returns, so it is traced as its own stage
+    reels = iter_in_span(
+        "stage_stream_reel_scripts",
+        record_reels(iter_reel_scripts(analysis, context), output_dir),
+    )
 
     return {
         "source_text": source_text,
@@ -361,125 +470,461 @@ def stage_analyze_input(input_type: str, config: dict, output_dir: Path) -> dict
     }
 
 
+def record_reels(reels, output_dir: Path):
+    """
+    Passes reel scripts through as they arrive, then writes reels.json.
+    Profiled as the stage_stream_reel_scripts stage, from the first
+    script the pipeline asks for until the last.
+    """
+    collected = []
+    with stage("stage_stream_reel_scripts"):
+        for reel in reels:
+            collected.append(reel)
+            yield reel
+
+        if not collected:
+            raise SystemFailure("Failed to generate reel scripts")
+
+        (output_dir / "reels.json").write_text(json.dumps(collected, indent=2), encoding="utf-8")
+        publish_job_file(output_dir, output_dir / "reels.json")
+
+
 # =========================================================
-# FAILURE CLASSIFICATION (STEP 5)
+# JOB PATH HELPERS (STEP 4)
 # =========================================================
 
-class EngineError(Exception):
-    """Base class for engine failures."""
+def get_reel_dir(output_dir: Path, reel_index: int) -> Path:
+    """
+    Returns the directory for a specific reel.
+    Enforces consistent job-safe structure.
+    """
+    return output_dir / f"reel_{reel_index:02d}"
+
+
+def get_images_dir(reel_dir: Path) -> Path:
+    """
+    Returns the images directory for a reel.
+    """
+    return reel_dir / "images"
+
+
+
+
+def generate_reel_assets(
+    idx: int,
+    reel: dict,
+    output_dir: Path,
+    context: JobContext | None = None,
+    frame_size: tuple | None = None
+) -> dict | None:
+    """
+    Generates voiceover + images for a single reel. With frame_size,
+    images are stored normalized to it for assembly.
+    Returns None when the reel has no narration.
+    """
+    with span("reel.generate_assets", **{"reel.index": idx}), stage("reel.generate_assets"):
+        return _generate_reel_assets(idx, reel, output_dir, context, frame_size)
+
+
+def _generate_reel_assets(
+    idx: int,
+    reel: dict,
+    output_dir: Path,
+    context: JobContext | None,
+    frame_size: tuple | None
+) -> dict | None:
+    reel_dir = get_reel_dir(output_dir, idx)
+    images_dir = get_images_dir(reel_dir)
+
+    reel_dir.mkdir(parents=True, exist_ok=True)
+    # A retry re-plans the images: drop the last attempt's
+    # (the voiceover comes back from its cache)
+    shutil.rmtree(images_dir, ignore_errors=True)
+    images_dir.mkdir(parents=True, exist_ok=True)
+
+    narration = reel.get("spoken_narration", "").strip()
+    if not narration:
+        return None
+
+    # Image planning streams in the background while TTS runs
+    image_prompts = iter_in_background(
+        iter_image_prompts(
+            reel_title=reel.get("reel_title", f"Reel {idx}"),
+            spoken_narration=narration,
+            context=context
+        )
+    )
+
+    try:
+        audio_path = reel_dir / "voiceover.wav"
+        generate_voiceover(narration, audio_path, context=context)
+
+        images = []
+        for position, image in enumerate(image_prompts, start=1):
+            images.append(image)
+
+            image_id = image.get("image_id") or position
+            prompt = image.get("prompt")
+            if not prompt:
+                continue
+
+            if context is not None:
+                context.check()
+
+            image_path = images_dir / f"image_{image_id:02d}.png"
+            generate_image(prompt, image_path, context, frame_size)
+    finally:
+        image_prompts.close()
+
+    if not images:
+        raise SystemFailure("Invalid image prompt output")
+
+    (reel_dir / "image_prompts.json").write_text(
+        json.dumps({"images": images}, indent=2),
+        encoding="utf-8"
+    )
+
+    return {
+        "reel_index": idx,
+        "output_dir": output_dir,
+        "reel_dir": reel_dir,
+        "images_dir": images_dir,
+        "audio_path": audio_path,
+        "captions": reel.get("on_screen_captions")
+    }
 
 
-class SystemFailure(EngineError):
+def iter_reel_assets(
+    reels,
+    output_dir: Path,
+    context: JobContext | None = None,
+    frame_size: tuple | None = None
+):
     """
-    Indicates a system-side failure.
-    Eligible for credit refund.
+    Yields each reel's assets as soon as that reel is complete, or a
+    ReelFailure for a reel whose assets could not be generated.
     """
-    pass
+    context = context or JobContext()
+
+    for idx, reel in enumerate(reels, start=1):
+        context.check()
+        try:
+            asset = run_reel_step(
+                idx,
+                lambda: generate_reel_assets(idx, reel, output_dir, context, frame_size),
+                context,
+            )
+        except JobInterrupted:
+            raise
+        except EngineError as e:
+            yield ReelFailure(idx, e)
+            continue
+
+        if asset is None:
+            context.report_reel(idx, "skipped")
+            continue
+        yield asset
 
 
-class UserContentError(EngineError):
+def assemble_reel(asset: dict, profile: dict, context: JobContext | None = None) -> Path | None:
     """
-    Indicates user input / content issue.
-    NOT eligible for refund.
+    Assembles and publishes every rendition for one reel.
+    Returns the primary video path, or None if nothing was written.
     """
-    pass
+    reel_dir = asset["reel_dir"]
+
+    with span("reel.assemble", **{"reel.index": asset["reel_index"]}), stage("reel.assemble"):
+        return _assemble_reel(asset, reel_dir, profile, context)
+
+
+def _assemble_reel(asset: dict, reel_dir: Path, profile: dict, context: JobContext | None) -> Path | None:
+    manifest = assemble_video(
+        images_dir=asset["images_dir"],
+        audio_path=asset["audio_path"],
+        reel_dir=reel_dir,
+        profile=profile,
+        captions=asset.get("captions"),
+        context=context
+    )
+
+    (reel_dir / "manifest.json").write_text(
+        json.dumps(manifest, indent=2),
+        encoding="utf-8"
+    )
+
+    # Segments and variant playlists first, master playlist last
+    published = [reel_dir / r["path"] for r in manifest["renditions"]]
+    published += sorted((reel_dir / "previews").iterdir())
+    if manifest["hls"]:
+        hls_files = sorted((reel_dir / "hls").iterdir(), key=lambda p: p.name == "master.m3u8")
+        published = hls_files + published
+    published.append(reel_dir / "manifest.json")
+
+    for path in published:
+        publish_job_file(asset["output_dir"], path)
+
+    primary_path = reel_dir / manifest["renditions"][0]["path"]
+    if primary_path.exists():
+        return primary_path
+    return None
+
+
+def finish_reel(asset, profile: dict, context: JobContext) -> str | None:
+    """
+    Assembles one reel's assets (retrying like generation) and records
+    the reel's result. Returns the primary video path, or None if the
+    reel failed or produced nothing.
+    """
+    idx = asset.reel_index if isinstance(asset, ReelFailure) else asset["reel_index"]
+
+    try:
+        if isinstance(asset, ReelFailure):
+            raise asset.error
+        final_video_path = run_reel_step(idx, lambda: assemble_reel(asset, profile, context), context)
+    except JobInterrupted:
+        raise
+    except EngineError as e:
+        error_type = "user" if isinstance(e, UserContentError) else "system"
+        context.report_reel(idx, "failed", error_type=error_type, error_message=str(e))
+        return None
+
+    if final_video_path is None:
+        context.report_reel(idx, "skipped")
+        return None
 
+    video = final_video_path.relative_to(asset["output_dir"]).as_posix()
+    context.report_reel(idx, "completed", video=video, error_type=None, error_message=None)
+    return str(final_video_path)
 
 
+def check_reel_results(context: JobContext):
+    """
+    Raises when reels failed and none completed, so the job fails as a
+    whole (refunded in full for system failures). Otherwise the job
+    completes with whatever reels it has.
+    """
+    failed = context.reels_with_status("failed")
+    if not failed or context.reels_with_status("completed"):
+        return
 
+    messages = "; ".join(f"reel {idx}: {reel['error_message']}" for idx, reel in sorted(failed.items()))
+    if any(reel["error_type"] == "system" for reel in failed.values()):
+        raise SystemFailure(f"All reels failed ({messages})")
+    raise UserContentError(f"All reels failed ({messages})")
 
 
 # =========================================================
-# JOB PATH HELPERS (STEP 4)
+# PER-REEL RESULTS (partial success)
 # =========================================================
+# Each reel succeeds or fails on its own. A failed step (assets,
+# assembly) is retried; a reel that still fails is recorded and skipped,
+# and the job completes with the other reels. The executor refunds the
+# failed reels' share (see backend/jobs/executor.py).
 
-def get_reel_dir(output_dir: Path, reel_index: int) -> Path:
+# Tries per reel step before the reel is given up on
+REEL_MAX_ATTEMPTS = int(os.getenv("VIDEO_REEL_MAX_ATTEMPTS", "2"))
+REEL_RETRY_DELAY_SECONDS = float(os.getenv("VIDEO_REEL_RETRY_DELAY_SECONDS", "5"))
+
+
+class ReelFailure:
     """
-    Returns the directory for a specific reel.
-    Enforces consistent job-safe structure.
+    Takes the place of a reel's assets when they could not be generated.
     """
-    return output_dir / f"reel_{reel_index:02d}"
 
+    def __init__(self, reel_index: int, error: EngineError):
+        self.reel_index = reel_index
+        self.error = error
 
-def get_images_dir(reel_dir: Path) -> Path:
+
+def run_reel_step(idx: int, step, context: JobContext):
     """
-    Returns the images directory for a reel.
+    Runs step() for reel idx, retrying system failures up to
+    REEL_MAX_ATTEMPTS times. Interruptions, content errors and open
+    circuits are raised at once: retrying can't help them.
     """
-    return reel_dir / "images"
+    for attempt in range(1, REEL_MAX_ATTEMPTS + 1):
+        # The reel's attempts: 1 plus every retry of any of its steps
+        attempts = context.reels.get(idx, {}).get("attempts", 0)
+        attempts = max(attempts, 1) if attempt == 1 else attempts + 1
+        context.report_reel(idx, "running", attempts=attempts)
+        try:
+            return step()
+        except (JobInterrupted, UserContentError, ProviderUnavailable):
+            raise
+        except Exception as e:
+            error = e if isinstance(e, SystemFailure) else SystemFailure(f"Unhandled engine error: {e}")
+            if attempt == REEL_MAX_ATTEMPTS:
+                raise error from e
 
+            current_span().add_event("reel.retry", **{"reel.index": idx, "attempt": attempt, "error": str(e)})
+            if context.wait(REEL_RETRY_DELAY_SECONDS):
+                context.check()
 
 
+# =========================================================
+# STREAMING PIPELINE (generation → assembly overlap)
+# =========================================================
 
-def stage_generate_assets(reels: list, output_dir: Path) -> list:
-    assets = []
+# Max finished reels waiting for the encoder.
+# Keeps generation at most this many reels ahead of assembly.
+PIPELINE_QUEUE_SIZE = int(os.getenv("VIDEO_PIPELINE_QUEUE_SIZE", "1"))
 
-    for idx, reel in enumerate(reels, start=1):
-        
-        reel_dir = get_reel_dir(output_dir, idx)
-        images_dir = get_images_dir(reel_dir)
+_DONE = object()
 
-        reel_dir.mkdir(parents=True, exist_ok=True)
-        images_dir.mkdir(parents=True, exist_ok=True)
+# Share of a job's work done once the input is analyzed
+# (the rest is split evenly across reels)
+ANALYSIS_PROGRESS = 0.1
 
-        narration = reel.get("spoken_narration", "").strip()
-        if not narration:
-            continue
 
-        audio_path = reel_dir / "voiceover.mp3"
-        generate_voiceover(narration, audio_path)
+def _collect(iterable, into: list):
+    for item in iterable:
+        into.append(item)
+        yield item
 
-        image_plan = generate_image_prompts(
-            reel_title=reel.get("reel_title", f"Reel {idx}"),
-            spoken_narration=narration
-        )
 
-        (reel_dir / "image_prompts.json").write_text(
-            json.dumps(image_plan, indent=2),
-            encoding="utf-8"
-        )
+def iter_in_background(iterable, maxsize: int = 0):
+    """
+    Drains iterable on a helper thread and yields its items.
 
-        for image in image_plan.get("images", []):
-            image_id = image.get("image_id")
-            prompt = image.get("prompt")
-            if not prompt:
+    The source (an LLM stream, asset generation) keeps making progress
+    while the caller works on earlier items. maxsize bounds how far ahead
+    it may get (0 = unbounded). Exceptions are re-raised in the caller;
+    closing the generator stops the helper at its next handoff.
+    """
+    handoff = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Bounded put that gives up if the consumer has stopped
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.5)
+                return True
+            except queue.Full:
                 continue
+        return False
 
-            image_path = images_dir / f"image_{image_id:02d}.png"
-            generate_image(prompt, image_path)
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:  # handed to the consumer to re-raise
+            put(e)
+            return
+        put(_DONE)
+
+    producer = threading.Thread(
+        target=bind_context(produce),
+        name="video-pipeline-producer",
+        daemon=True,
+    )
+    producer.start()
 
-        assets.append({
-            "reel_index": idx,
-            "reel_dir": reel_dir,
-            "images_dir": images_dir,
-            "audio_path": audio_path
-        })
+    try:
+        while True:
+            item = handoff.get()
 
-    return assets
+            if item is _DONE:
+                return
 
+            if isinstance(item, BaseException):
+                raise item
 
-def stage_assemble_videos(assets: list, output_dir: Path) -> list:
-    final_videos = []
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+@traced("stage_pipeline_reels")
+@profiled_stage("stage_pipeline_reels")
+def stage_pipeline_reels(
+    reels,
+    output_dir: Path,
+    profile: dict,
+    context: JobContext | None = None
+) -> list:
+    """
+    Runs asset generation and video assembly as a producer/consumer
+    pipeline. A producer thread generates reel N+1 (network-bound)
+    while this thread encodes reel N (CPU-bound). Images are decoded and
+    scaled to the render size on the producer side, as they arrive.
+
+    Each final video is written atomically, so it becomes listable and
+    downloadable as soon as its reel is assembled. A reel that fails
+    doesn't stop the others (see PER-REEL RESULTS).
+    """
+    context = context or JobContext()
 
-    for asset in assets:
-        reel_dir = asset["reel_dir"]
-        images_dir = asset["images_dir"]
-        audio_path = asset["audio_path"]
+    # Reel scripts keep streaming from the LLM while reel 1 is produced
+    scripts = []
+    reels = iter_in_background(_collect(reels, scripts))
 
-        final_video_path = reel_dir / "final_video.mp4"
+    assets = iter_in_background(
+        iter_reel_assets(reels, output_dir, context, master_frame_size(profile)),
+        maxsize=max(PIPELINE_QUEUE_SIZE, 1),
+    )
 
-        assemble_video(
-            images_dir=images_dir,
-            audio_path=audio_path,
-            output_path=final_video_path
-        )
+    final_videos = []
+    try:
+        for asset in assets:
+            final_video_path = finish_reel(asset, profile, context)
+            if final_video_path:
+                final_videos.append(final_video_path)
+
+            # Progress is the share of the job the user pays for: every
+            # finished reel but those that failed on our side or had
+            # nothing to deliver (skipped)
+            finished = len(context.reels) - len(context.reels_with_status("running"))
+            refundable = len(context.reels_with_status("skipped")) + sum(
+                1 for reel in context.reels_with_status("failed").values()
+                if reel["error_type"] == "system"
+            )
 
-        if final_video_path.exists():
-            final_videos.append(str(final_video_path))
+            # Scripts are usually all in long before the first encode;
+            # if not, this overstates progress (never over-refunds)
+            context.report_progress(
+                ANALYSIS_PROGRESS
+                + (1 - ANALYSIS_PROGRESS) * (finished - refundable) / max(len(scripts), finished)
+            )
+    finally:
+        assets.close()
+        reels.close()
 
+    check_reel_results(context)
     return final_videos
 
 
 
+# =========================================================
+# RETENTION
+# =========================================================
+
+# Scratch files only needed while the job runs.
+# Never published to output storage.
+INTERMEDIATE_PATTERNS = (
+    "source_text.txt",
+    "analysis.json",
+    "reel_*/images",
+    "reel_*/voiceover.*",
+    "reel_*/voiceover_timing.json",
+    "reel_*/image_prompts.json",
+)
+
+
+def purge_intermediates(output_dir: Path):
+    """
+    Deletes intermediate files from the job's scratch dir.
+    """
+    for pattern in INTERMEDIATE_PATTERNS:
+        for path in output_dir.glob(pattern):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+
 # =========================================================
 # ENGINE ENTRY POINT (Perpixa Contract)
 # =========================================================
@@ -488,7 +933,8 @@ def run_job(
     job_id: str,
     user_id: str,
     config: dict,
-    output_dir: str | Path
+    output_dir: str | Path,
+    context: JobContext | None = None
 ) -> dict:
     """
     Executes ONE complete video generation job.
@@ -497,8 +943,10 @@ def run_job(
     - One job = one output directory
     - No global state
     - All outputs MUST stay inside output_dir
-    - Raise exceptions on system failure
+    - Raise SystemFailure on system failure, UserContentError on bad input
+    - Stop promptly when context is cancelled or past its deadline
     """
+    context = context or JobContext(job_id)
 
     # -------------------------------
     # 0. PREPARE JOB DIRECTORY
@@ -513,6 +961,11 @@ def run_job(
     if not input_type:
         raise UserContentError("input_type is required in config")
 
+    try:
+        profile = get_output_profile(config.get("output_profile"))
+    except ValueError as e:
+        raise UserContentError(str(e)) from e
+
     # -------------------------------
     # 2. PIPELINE EXECUTION (STEP 5)
     # -------------------------------
@@ -520,46 +973,54 @@ def run_job(
         pipeline = stage_analyze_input(
             input_type=input_type,
             config=config,
-            output_dir=output_dir
+            output_dir=output_dir,
+            context=context
         )
 
-        assets = stage_generate_assets(
+        videos = stage_pipeline_reels(
             reels=pipeline["reels"],
-            output_dir=output_dir
+            output_dir=output_dir,
+            profile=profile,
+            context=context
         )
 
-        videos = stage_assemble_videos(
-            assets=assets,
-            output_dir=output_dir
-        )
+    except JobInterrupted:
+        # Cancelled / out of time → the executor settles credits
+        raise
 
     except SystemFailure:
         # System failure → bubble up (refund eligible)
         raise
 
-    except UserContentError as e:
-        # User/content error → no refund
-        return {
-            "job_id": job_id,
-            "user_id": user_id,
-            "status": "failed",
-            "reason": "user_content_error",
-            "message": str(e),
-            "output_dir": str(output_dir)
-        }
+    except UserContentError:
+        # User/content error → the executor fails the job (no refund)
+        raise
 
     except Exception as e:
         # Unknown error → treat as system failure (refund eligible)
         raise SystemFailure(f"Unhandled engine error: {e}") from e
 
+    finally:
+        # Finals are published; a scratch dir that isn't the
+        # storage location itself is no longer needed.
+        if not is_scratch_storage(output_dir):
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    # -------------------------------
+    # 3. RETENTION
+    # -------------------------------
+    if PURGE_INTERMEDIATES:
+        purge_intermediates(output_dir)
+
     # -------------------------------
-    # 3. RETURN METADATA (SUCCESS)
+    # 4. RETURN METADATA (SUCCESS)
     # -------------------------------
     return {
         "job_id": job_id,
         "user_id": user_id,
         "status": "completed",
         "reels_created": len(videos),
+        "reels_failed": sorted(context.reels_with_status("failed")),
         "videos": videos,
         "output_dir": str(output_dir)
     }
@@ -0,0 +1,413 @@
+"""
+Image generation backends with hedged requests.
+
+Each configured backend (IMAGE_BACKENDS) wraps one text-to-image model
+endpoint and has its own circuit breaker and latency history.
+
+generate_image_bytes() sends the prompt to the first available backend.
+If no result has arrived after the p90 of that backend's recent
+latencies, it fires a hedge at the next backend and keeps the first
+success. With a single backend there is nothing to hedge against, and
+at most IMAGE_MAX_HEDGES_IN_FLIGHT hedges run per process. Hard failures
+move straight on to the next backend.
+
+Losing requests are aborted: each runs on its own AbortableSession,
+whose sockets are shut down as soon as the race is decided or the job
+is cancelled or hits its deadline, even while still waiting for
+response headers.
+
+Every request for a prompt uses the same seed, so hedges, retries and
+failover return the same picture.
+"""
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from backend.config import (
+    IMAGE_BACKENDS,
+    IMAGE_HEDGE_MAX_DELAY_SECONDS,
+    IMAGE_HEDGE_MIN_DELAY_SECONDS,
+    IMAGE_HEDGE_PERCENTILE,
+    IMAGE_MAX_HEDGES_IN_FLIGHT,
+)
+from backend.engines.circuit import get_breaker, is_provider_fault
+from backend.engines.context import JobContext
+from backend.engines.errors import ProviderUnavailable, SystemFailure
+from backend.engines.http import AbortableSession
+from backend.tracing import add_event, bind_context, span, traced
+
+# How often a waiting generate_image_bytes() re-checks the job
+WAIT_SLICE_SECONDS = 0.5
+
+
+class RequestCancelled(Exception):
+    """The request lost a hedge race (or its job stopped) and was aborted."""
+
+
+class CancelEvent(threading.Event):
+    """
+    threading.Event that also runs callbacks when set, so in-flight
+    requests can be torn down rather than just flagged.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    def on_set(self, callback):
+        """
+        Runs callback when the event is set (at once if it already is).
+        Returns a function that unregisters it.
+        """
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+
+                def unregister():
+                    with self._callbacks_lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return unregister
+
+        callback()
+        return lambda: None
+
+    def set(self):
+        with self._callbacks_lock:
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+def prompt_seed(prompt: str) -> int:
+    """
+    Deterministic 32-bit seed per prompt.
+    """
+    return int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+
+
+# -------------------------------
+# LATENCY TRACKING
+# -------------------------------
+class LatencyTracker:
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if len(samples) < 5:
+            # Not enough history yet → hedge late rather than double load
+            return IMAGE_HEDGE_MAX_DELAY_SECONDS
+
+        index = min(int(len(samples) * IMAGE_HEDGE_PERCENTILE), len(samples) - 1)
+        return min(
+            max(samples[index], IMAGE_HEDGE_MIN_DELAY_SECONDS),
+            IMAGE_HEDGE_MAX_DELAY_SECONDS,
+        )
+
+
+# -------------------------------
+# BACKENDS
+# -------------------------------
+class ImageBackend(ABC):
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = get_breaker(name, slow_call_seconds=90)
+        self.latency = LatencyTracker()
+
+    @abstractmethod
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        cancel: CancelEvent,
+        timeout: float = 120,
+    ) -> bytes:
+        """
+        Returns PNG bytes.
+        Raises SystemFailure, or RequestCancelled once cancel is set;
+        setting it aborts the request in flight.
+        timeout bounds each HTTP request.
+        """
+
+
+class HFInferenceBackend(ImageBackend):
+    def __init__(
+        self,
+        name: str,
+        model_id: str,
+        *,
+        width: int = 1024,
+        height: int = 1536,
+        max_retries: int = 3,
+    ):
+        super().__init__(name)
+        self.model_id = model_id
+        self.url = f"https://router.huggingface.co/hf-inference/models/{model_id}"
+        self.width = width
+        self.height = height
+        self.max_retries = max_retries
+
+    def generate(
+        self,
+        prompt: str,
+        seed: int,
+        cancel: CancelEvent,
+        timeout: float = 120,
+    ) -> bytes:
+        with span(
+            "provider.image",
+            **{"image.backend": self.name, "image.model": self.model_id},
+        ) as call:
+            return self._generate(prompt, seed, cancel, timeout, call)
+
+    def _generate(self, prompt: str, seed: int, cancel: CancelEvent, timeout: float, call) -> bytes:
+        hf_token = os.getenv("HUGGINGFACE_TOKEN")
+        if not hf_token:
+            # 🚨 System misconfiguration → refundable
+            raise SystemFailure("HUGGINGFACE_TOKEN not set")
+
+        headers = {
+            "Authorization": f"Bearer {hf_token}",
+            "Accept": "image/png",
+            "Content-Type": "application/json"
+        }
+
+        payload = {
+            "inputs": prompt,
+            "parameters": {
+                "height": self.height,
+                "width": self.width,
+                "guidance_scale": 7.5,
+                "num_inference_steps": 30,
+                "seed": seed
+            }
+        }
+
+        for attempt in range(1, self.max_retries + 1):
+            if cancel.is_set():
+                raise RequestCancelled()
+
+            started = time.monotonic()
+            call.add_event("attempt", attempt=attempt)
+
+            # One session per attempt: a cancel shuts its socket down
+            session = AbortableSession()
+            unregister = cancel.on_set(session.abort)
+
+            # Fails fast with ProviderUnavailable while the circuit is open
+            try:
+                with self.breaker.guard(ignore=(RequestCancelled,)) as breaker_call:
+                    try:
+                        response = session.post(
+                            self.url,
+                            headers=headers,
+                            json=payload,
+                            timeout=timeout,
+                            stream=True
+                        )
+                    except Exception as e:
+                        if cancel.is_set():
+                            raise RequestCancelled() from e
+                        # 🚨 Network / request failure → refundable
+                        raise SystemFailure(f"{self.name} request failed: {e}") from e
+
+                    with response:
+                        if response.status_code == 200:
+                            content = self._read(response, cancel)
+                            self.latency.record(time.monotonic() - started)
+                            return content
+
+                        if is_provider_fault(response.status_code):
+                            breaker_call.failure()
+
+                        status_code = response.status_code
+                        body = response.text
+            finally:
+                unregister()
+                session.close()
+
+            call.add_event("attempt_failed", attempt=attempt, status_code=status_code)
+
+            # Retry-safe HF failures (interruptible by cancel)
+            if status_code in (429, 503):
+                if cancel.wait(5 * attempt):
+                    raise RequestCancelled()
+                continue
+
+            # 🚨 Hard HF failure → refundable
+            raise SystemFailure(f"{self.name} failed: {status_code} {body}")
+
+        # 🚨 All retries exhausted → refundable
+        raise SystemFailure(f"{self.name} unavailable after retries")
+
+    def _read(self, response, cancel: CancelEvent) -> bytes:
+        chunks = []
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                if cancel.is_set():
+                    raise RequestCancelled()
+                chunks.append(chunk)
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            if cancel.is_set():
+                raise RequestCancelled() from e
+            # 🚨 Broken download → refundable
+            raise SystemFailure(f"{self.name} download failed: {e}") from e
+        return b"".join(chunks)
+
+
+def build_backends() -> list:
+    return [
+        HFInferenceBackend(backend["name"], backend["model_id"])
+        for backend in IMAGE_BACKENDS
+    ]
+
+
+_backends = None
+_backends_lock = threading.Lock()
+
+# Shared pool for primary + hedge requests across concurrent reels/jobs
+_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="image-request")
+
+# Released when a hedge's request returns (abandoned losers included),
+# so stuck losers can't take over the pool
+_hedge_slots = threading.BoundedSemaphore(IMAGE_MAX_HEDGES_IN_FLIGHT)
+
+
+def get_backends() -> list:
+    global _backends
+    if _backends is None:
+        with _backends_lock:
+            if _backends is None:
+                _backends = build_backends()
+    return _backends
+
+
+# -------------------------------
+# HEDGED GENERATION
+# -------------------------------
+def _wait_any(futures: list, timeout: float | None, context: JobContext) -> set:
+    """
+    wait(FIRST_COMPLETED) in short slices, checking the job in between,
+    so a cancel or deadline is noticed while a request is still running.
+    Returns the done futures (empty once timeout has passed).
+    """
+    started = time.monotonic()
+    while True:
+        context.check()
+        slice_seconds = WAIT_SLICE_SECONDS
+        if timeout is not None:
+            left = timeout - (time.monotonic() - started)
+            if left <= 0:
+                return set()
+            slice_seconds = min(slice_seconds, left)
+
+        done, _ = wait(futures, timeout=slice_seconds, return_when=FIRST_COMPLETED)
+        if done:
+            return done
+
+
+@traced("image.generate")
+def generate_image_bytes(prompt: str, context: JobContext | None = None) -> bytes:
+    """
+    Generates one image with hedging and failover across backends.
+    Cancelling the job (or hitting its deadline) aborts every request
+    in flight.
+    """
+    context = context or JobContext()
+    seed = prompt_seed(prompt)
+    backends = get_backends()
+
+    # Hedges and failover only ever go to a different backend
+    order = list(backends)
+    cancel = CancelEvent()
+
+    running = {}
+    errors = []
+    hedge_skipped = False
+
+    def launch(backend):
+        future = _pool.submit(bind_context(backend.generate), prompt, seed, cancel, context.timeout(120))
+        running[future] = backend
+        return future
+
+    unregister = context.on_stop(cancel.set)
+    launch(order[0])
+    next_index = 1
+
+    try:
+        while running:
+            primary = next(iter(running.values()))
+            can_hedge = next_index < len(order) and not hedge_skipped
+            timeout = primary.latency.hedge_delay() if can_hedge else None
+
+            done = _wait_any(list(running), timeout, context)
+
+            if not done:
+                if not _hedge_slots.acquire(blocking=False):
+                    # Hedging everywhere already: wait for this one
+                    add_event("image.hedge_skipped", backend=order[next_index].name)
+                    hedge_skipped = True
+                    continue
+
+                # Slow → hedge on the next backend, keep the original running
+                add_event("image.hedge", backend=order[next_index].name, after_seconds=timeout)
+                try:
+                    hedge = launch(order[next_index])
+                except BaseException:
+                    _hedge_slots.release()
+                    raise
+                hedge.add_done_callback(lambda _: _hedge_slots.release())
+                next_index += 1
+                continue
+
+            for future in done:
+                running.pop(future)
+                try:
+                    return future.result()
+                except (SystemFailure, RequestCancelled) as e:
+                    errors.append(e)
+
+            # Hard failure → fail over immediately
+            if not running and next_index < len(order):
+                context.check()
+                add_event("image.failover", backend=order[next_index].name)
+                launch(order[next_index])
+                next_index += 1
+
+    finally:
+        # Abort the loser(s)
+        unregister()
+        cancel.set()
+
+    # Requests abandoned because the job was stopped
+    context.check()
+
+    if errors and all(isinstance(e, ProviderUnavailable) for e in errors):
+        raise errors[-1]
+
+    failures = [e for e in errors if isinstance(e, SystemFailure)]
+    if failures:
+        raise failures[-1]
+
+    raise SystemFailure("Image generation failed on all backends")
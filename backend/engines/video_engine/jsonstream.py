@@ -0,0 +1,136 @@
+"""
+Incremental JSON array parsing for streamed LLM output.
+
+JsonArrayStream is fed text deltas as they arrive and returns each object
+of the first JSON array in the text as soon as its closing brace is seen.
+Anything before the array (code fences, a "json" tag, a wrapping
+{"images": ...} object) is skipped.
+
+finish() repairs a truncated trailing object by closing open strings and
+brackets, falling back to the last complete member, so output cut off by
+a token limit or a dropped stream is salvaged instead of re-requested.
+"""
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def loads_lenient(text: str):
+    """
+    json.loads that tolerates trailing commas, a common LLM slip.
+    Returns None if the text still does not parse.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+    except json.JSONDecodeError:
+        return None
+
+
+class JsonArrayStream:
+    def __init__(self):
+        self._in_array = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+
+        # Current array element being captured (objects only)
+        self._capture = []
+        self._stack = []          # open brackets inside the element
+        self._checkpoints = []    # (capture length, stack) at each member boundary
+
+    def feed(self, text: str) -> list:
+        """
+        Consumes a text delta.
+        Returns the array's objects that closed within it.
+        """
+        completed = []
+
+        for ch in text:
+            if self._done:
+                break
+
+            if self._in_string:
+                if self._stack:
+                    self._capture.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._stack:
+                    self._capture.append(ch)
+                continue
+
+            if not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+                continue
+
+            if not self._stack:
+                # Between elements of the array
+                if ch == "{":
+                    self._stack.append(ch)
+                    self._capture = [ch]
+                    self._checkpoints = []
+                elif ch == "]":
+                    self._done = True
+                continue
+
+            self._capture.append(ch)
+
+            if ch in _CLOSERS:
+                self._stack.append(ch)
+            elif ch in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    obj = loads_lenient("".join(self._capture))
+                    if isinstance(obj, dict):
+                        completed.append(obj)
+                    self._capture = []
+            elif ch == ",":
+                # Everything before this comma is a complete member
+                self._checkpoints.append((len(self._capture) - 1, list(self._stack)))
+
+        return completed
+
+    def finish(self) -> list:
+        """
+        Call once the stream has ended.
+        Returns the repaired trailing object, if one was cut off.
+        """
+        if not self._stack:
+            return []
+
+        # 1. Close the element exactly where it was cut off
+        text = "".join(self._capture)
+        if self._in_string:
+            text += '"'
+        obj = loads_lenient(text + self._closing(self._stack))
+        if isinstance(obj, dict):
+            return [obj]
+
+        # 2. Fall back to the last complete member
+        for length, stack in reversed(self._checkpoints):
+            text = "".join(self._capture[:length])
+            obj = loads_lenient(text + self._closing(stack))
+            if isinstance(obj, dict):
+                return [obj]
+
+        return []
+
+    @staticmethod
+    def _closing(stack: list) -> str:
+        return "".join(_CLOSERS[b] for b in reversed(stack))
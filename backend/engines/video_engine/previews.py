@@ -0,0 +1,115 @@
+"""
+Poster frames, thumbnails and seek-preview sprites.
+
+Built from the stills assembly has already decoded, so no image or video
+is read back from disk. Everything lands in <reel>/previews/ and is
+described in the reel manifest.
+"""
+import math
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+POSTER_SIZE = (1080, 1920)
+THUMBNAIL_SIZES = [(180, 320), (360, 640)]
+
+SPRITE_INTERVAL_SECONDS = 2
+SPRITE_TILE_SIZE = (90, 160)
+SPRITE_COLUMNS = 10
+
+
+def _cover(image: Image.Image, size: tuple, resample=Image.LANCZOS) -> Image.Image:
+    """
+    Scales to fill size and center-crops the overflow (same framing as
+    the encoded renditions).
+    """
+    width, height = size
+    scale = max(width / image.width, height / image.height)
+    resized = image.resize(
+        (max(width, round(image.width * scale)), max(height, round(image.height * scale))),
+        resample,
+    )
+    left = (resized.width - width) // 2
+    top = (resized.height - height) // 2
+    return resized.crop((left, top, left + width, top + height))
+
+
+def _vtt_time(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def generate_previews(stills: list, durations: list, reel_dir: Path) -> dict:
+    """
+    stills: decoded RGB frames (H x W x 3 uint8), one per image
+    durations: seconds each still is on screen
+
+    Returns the manifest "previews" section, paths relative to reel_dir.
+    """
+    previews_dir = reel_dir / "previews"
+    previews_dir.mkdir(parents=True, exist_ok=True)
+
+    images = [Image.fromarray(np.asarray(still)).convert("RGB") for still in stills]
+
+    # -------------------------------
+    # Poster + thumbnails
+    # -------------------------------
+    poster = _cover(images[0], POSTER_SIZE)
+    poster.save(previews_dir / "poster.jpg", "JPEG", quality=85, optimize=True, progressive=True)
+    poster.save(previews_dir / "poster.webp", "WEBP", quality=80, method=4)
+
+    thumbnails = []
+    for width, height in THUMBNAIL_SIZES:
+        name = f"thumb_{width}x{height}.webp"
+        poster.resize((width, height), Image.LANCZOS).save(
+            previews_dir / name, "WEBP", quality=75, method=4
+        )
+        thumbnails.append({"path": f"previews/{name}", "width": width, "height": height})
+
+    # -------------------------------
+    # Seek-preview sprite sheet + WebVTT index
+    # -------------------------------
+    tile_w, tile_h = SPRITE_TILE_SIZE
+    tiles = [_cover(image, SPRITE_TILE_SIZE, Image.BILINEAR) for image in images]
+
+    total = sum(durations)
+    count = max(1, math.ceil(total / SPRITE_INTERVAL_SECONDS))
+    rows = math.ceil(count / SPRITE_COLUMNS)
+    sheet = Image.new("RGB", (tile_w * min(count, SPRITE_COLUMNS), tile_h * rows))
+
+    vtt = ["WEBVTT", ""]
+    ends = np.cumsum(durations)
+
+    for i in range(count):
+        start = i * SPRITE_INTERVAL_SECONDS
+        end = min(start + SPRITE_INTERVAL_SECONDS, total)
+
+        # Still on screen at the middle of this interval
+        still_index = min(int(np.searchsorted(ends, (start + end) / 2, side="right")), len(tiles) - 1)
+
+        x = (i % SPRITE_COLUMNS) * tile_w
+        y = (i // SPRITE_COLUMNS) * tile_h
+        sheet.paste(tiles[still_index], (x, y))
+
+        vtt.append(f"{_vtt_time(start)} --> {_vtt_time(end)}")
+        vtt.append(f"sprite.jpg#xywh={x},{y},{tile_w},{tile_h}")
+        vtt.append("")
+
+    sheet.save(previews_dir / "sprite.jpg", "JPEG", quality=70, optimize=True)
+    (previews_dir / "sprite.vtt").write_text("\n".join(vtt), encoding="utf-8")
+
+    return {
+        "poster": "previews/poster.jpg",
+        "poster_webp": "previews/poster.webp",
+        "thumbnails": thumbnails,
+        "sprite": {
+            "path": "previews/sprite.jpg",
+            "vtt": "previews/sprite.vtt",
+            "interval_seconds": SPRITE_INTERVAL_SECONDS,
+            "tile_width": tile_w,
+            "tile_height": tile_h,
+            "columns": SPRITE_COLUMNS,
+        },
+    }
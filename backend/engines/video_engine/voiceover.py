@@ -0,0 +1,305 @@
+"""
+Chunked, parallel TTS synthesis.
+
+Narrations are split at sentence boundaries into chunks of at most
+TTS_CHUNK_CHARS, synthesized in parallel as raw PCM and cached per chunk
+by text hash. A failed chunk is retried on its own, and a re-run only
+synthesizes chunks that are not cached yet. The cache is bounded by the
+storage GC (TTS_CACHE_MAX_MB / TTS_CACHE_MAX_AGE_DAYS).
+
+PCM chunks are concatenated sample-for-sample. That gives a gapless
+track with no per-file codec padding. Each chunk is first normalized to
+the same loudness. The chunk boundaries are returned as timings so
+assembly can cut images on sentence boundaries.
+"""
+import hashlib
+import json
+import os
+import re
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from backend.config import TTS_CACHE_DIR
+from backend.engines.circuit import get_breaker, is_provider_fault
+from backend.engines.context import JobContext
+from backend.engines.errors import JobInterrupted, SystemFailure
+from backend.engines.http import AbortableSession
+from backend.tracing import bind_context, span, traced
+
+TTS_MODEL = "gpt-4o-mini-tts"
+TTS_VOICE = "alloy"
+
+# OpenAI "pcm" output: 24 kHz, 16-bit signed little-endian, mono
+SAMPLE_RATE = 24000
+
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "600"))
+TTS_MAX_PARALLEL = int(os.getenv("TTS_MAX_PARALLEL", "4"))
+TTS_CHUNK_ATTEMPTS = 2
+
+# Target loudness per chunk (RMS, dBFS)
+TARGET_RMS_DBFS = -20.0
+
+tts_breaker = get_breaker("openai_tts", slow_call_seconds=60)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+# -------------------------------
+# CHUNKING
+# -------------------------------
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def chunk_narration(text: str, max_chars: int = TTS_CHUNK_CHARS) -> list:
+    """
+    Groups sentences into chunks of at most max_chars.
+    A single longer sentence becomes its own chunk.
+    """
+    chunks = []
+    current = ""
+
+    for sentence in split_sentences(text):
+        candidate = f"{current} {sentence}".strip()
+        if current and len(candidate) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = candidate
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# -------------------------------
+# SYNTHESIS
+# -------------------------------
+def chunk_cache_path(text: str) -> Path:
+    key = hashlib.sha256(f"{TTS_MODEL}|{TTS_VOICE}|{text}".encode("utf-8")).hexdigest()
+    return Path(TTS_CACHE_DIR) / key[:2] / f"{key}.pcm"
+
+
+def _request_speech(text: str, context: JobContext) -> bytes:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        # 🚨 System misconfiguration → refundable
+        raise SystemFailure("OPENAI_API_KEY not set")
+
+    # A cancel/deadline shuts the socket down, even before the headers
+    session = AbortableSession()
+    unregister = context.on_stop(session.abort)
+    try:
+        return _post_speech(session, api_key, text, context)
+    finally:
+        unregister()
+        session.close()
+
+
+def _post_speech(session: AbortableSession, api_key: str, text: str, context: JobContext) -> bytes:
+    # Fails fast with ProviderUnavailable while the circuit is open
+    with tts_breaker.guard(ignore=(JobInterrupted,)) as call:
+        try:
+            response = session.post(
+                "https://api.openai.com/v1/audio/speech",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": TTS_MODEL,
+                    "voice": TTS_VOICE,
+                    "input": text,
+                    "response_format": "pcm"
+                },
+                timeout=context.timeout(120),
+                stream=True
+            )
+        except Exception as e:
+            context.check()
+            # 🚨 Network / request failure → refundable
+            raise SystemFailure(f"TTS request failed: {e}") from e
+
+        if is_provider_fault(response.status_code):
+            call.failure()
+
+    with response:
+        if response.status_code != 200:
+            # 🚨 OpenAI TTS failure → refundable
+            raise SystemFailure(
+                f"TTS failed: {response.status_code} {response.text}"
+            )
+
+        # Streamed so a cancel/deadline can abort the download
+        try:
+            chunks = []
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                context.check()
+                chunks.append(chunk)
+        except JobInterrupted:
+            raise
+        except Exception as e:
+            context.check()
+            # 🚨 Broken download → refundable
+            raise SystemFailure(f"TTS download failed: {e}") from e
+
+    return b"".join(chunks)
+
+
+def synthesize_chunk(text: str, context: JobContext | None = None) -> bytes:
+    """
+    Returns raw PCM for one chunk, from cache when available.
+    """
+    context = context or JobContext()
+
+    cache_path = chunk_cache_path(text)
+    try:
+        pcm = cache_path.read_bytes()
+        os.utime(cache_path)  # recently used: evicted last
+        return pcm
+    except FileNotFoundError:
+        pass  # not cached, or evicted
+
+    with span("provider.openai_tts", **{"tts.chars": len(text)}) as call:
+        error = None
+        for attempt in range(1, TTS_CHUNK_ATTEMPTS + 1):
+            context.check()
+            call.add_event("attempt", attempt=attempt)
+            try:
+                pcm = _request_speech(text, context)
+                break
+            except JobInterrupted:
+                raise
+            except SystemFailure as e:
+                call.add_event("attempt_failed", attempt=attempt, error=str(e))
+                error = e
+        else:
+            raise error
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}")
+    partial_path.write_bytes(pcm)
+    os.replace(partial_path, cache_path)
+    return pcm
+
+
+# -------------------------------
+# STITCHING
+# -------------------------------
+def normalize_loudness(samples: np.ndarray) -> np.ndarray:
+    """
+    Scales a chunk to TARGET_RMS_DBFS, never beyond full scale.
+    """
+    audio = samples.astype(np.float32) / 32768.0
+    rms = float(np.sqrt(np.mean(audio ** 2))) if audio.size else 0.0
+    if rms < 1e-4:
+        return samples
+
+    gain = (10 ** (TARGET_RMS_DBFS / 20)) / rms
+    peak = float(np.max(np.abs(audio)))
+    gain = min(gain, 0.99 / peak)
+
+    return np.clip(audio * gain * 32768.0, -32768, 32767).astype(np.int16)
+
+
+@traced("voiceover.generate")
+def generate_voiceover(text: str, output_path: Path, context: JobContext | None = None) -> list:
+    """
+    Synthesizes a narration into one gapless WAV track.
+
+    Returns per-chunk timings:
+        [{"text": ..., "start": seconds, "end": seconds}, ...]
+    which are also written next to the track as voiceover_timing.json.
+    """
+    chunks = chunk_narration(text)
+    if not chunks:
+        raise SystemFailure("Empty narration")
+
+    with ThreadPoolExecutor(
+        max_workers=min(TTS_MAX_PARALLEL, len(chunks)),
+        thread_name_prefix="tts-chunk",
+    ) as pool:
+        futures = [pool.submit(bind_context(synthesize_chunk), chunk, context) for chunk in chunks]
+        pcm_chunks = [future.result() for future in futures]
+
+    tracks = [
+        normalize_loudness(np.frombuffer(pcm, dtype="<i2"))
+        for pcm in pcm_chunks
+    ]
+
+    timings = []
+    position = 0
+    for chunk_text, track in zip(chunks, tracks):
+        timings.append({
+            "text": chunk_text,
+            "start": position / SAMPLE_RATE,
+            "end": (position + len(track)) / SAMPLE_RATE,
+        })
+        position += len(track)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(output_path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for track in tracks:
+            wav.writeframes(track.astype("<i2").tobytes())
+
+    timing_path(output_path).write_text(
+        json.dumps(timings, indent=2),
+        encoding="utf-8"
+    )
+    return timings
+
+
+def audio_duration(audio_path: Path) -> float:
+    with wave.open(str(audio_path), "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def timing_path(audio_path: Path) -> Path:
+    return audio_path.with_name("voiceover_timing.json")
+
+
+def load_timings(audio_path: Path) -> list | None:
+    path = timing_path(audio_path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# -------------------------------
+# IMAGE TIMING
+# -------------------------------
+def image_durations(timings: list | None, image_count: int, duration: float) -> list:
+    """
+    Splits the track into image_count segments, cutting on the chunk
+    (sentence) boundary nearest each even split. Falls back to an even
+    split when there are fewer chunks than images.
+    """
+    even = [duration / image_count] * image_count
+    if not timings or len(timings) < image_count:
+        return even
+
+    candidates = [t["end"] for t in timings[:-1]]
+    cuts = []
+    previous = 0.0
+
+    for k in range(1, image_count):
+        ideal = duration * k / image_count
+        # Leave enough later boundaries for the remaining cuts
+        remaining = image_count - 1 - k
+        usable = [c for c in candidates if c > previous]
+        usable = usable[: len(usable) - remaining] if remaining else usable
+        if not usable:
+            return even
+
+        cut = min(usable, key=lambda c: abs(c - ideal))
+        cuts.append(cut)
+        previous = cut
+
+    edges = [0.0] + cuts + [duration]
+    return [edges[i + 1] - edges[i] for i in range(image_count)]
@@ -0,0 +1,305 @@
+"""
+Book batches: one PDF fanned out into one job per chapter.
+
+The book is extracted and split once, on the worker. Each chapter's text
+is stored in the blob store and becomes a "text" child job, so children
+never touch the PDF again. All children are created and paid for in one
+transaction with a single ledger debit against the parent job; chapter
+texts are only written once that debit has gone through, so a refused
+batch leaves nothing behind. Refunds stay per child, through the normal
+executor path.
+
+Analysis stays per chapter: the engine's analysis prompt summarizes one
+chapter's text, and the book title is passed to every child as context.
+"""
+import re
+import uuid
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from backend.config import BATCH_MAX_CHAPTERS, BATCH_MIN_CHAPTER_CHARS
+from backend.credits.service import debit_credits, get_or_create_balance, refund_credits
+from backend.engines.registry import get_engine_cost
+from backend.jobs.executor import execute_job
+from backend.jobs.models import Job
+from backend.storage.blobs import blob_digest, blob_path, put_blob_bytes
+from backend.tracing import current_traceparent, span
+
+# Config keys that describe the book, not how to render a chapter
+BOOK_ONLY_KEYS = ("input_type", "upload_id", "pdf_blob", "pdf_path")
+
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?:CHAPTER|Chapter)[ \t]+(?:\d+|[IVXLCDM]+|[A-Za-z]+)\b[^\n]{0,80}$",
+    re.MULTILINE,
+)
+
+
+# -------------------------------
+# SPLITTING
+# -------------------------------
+def _outline_starts(reader) -> list:
+    """
+    (title, first page) for each top-level outline entry, in page order.
+    Nested lists in the outline are sub-sections and are skipped.
+    """
+    starts = []
+    try:
+        outline = reader.outline
+    except Exception:
+        return []
+
+    for item in outline:
+        if isinstance(item, list):
+            continue
+        try:
+            page = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page is not None and page >= 0:
+            starts.append((str(item.title or "").strip(), page))
+
+    starts.sort(key=lambda start: start[1])
+    return starts
+
+
+def _split_by_outline(pages: list, starts: list) -> list:
+    sections = []
+    if starts[0][1] > 0:
+        sections.append({"title": "Front matter", "text": "\n".join(pages[: starts[0][1]])})
+
+    for i, (title, first) in enumerate(starts):
+        last = starts[i + 1][1] if i + 1 < len(starts) else len(pages)
+        # Two entries on one page: the page goes to the later one
+        sections.append({"title": title, "text": "\n".join(pages[first:last])})
+
+    return sections
+
+
+def _split_by_headings(text: str) -> list:
+    matches = list(_HEADING_RE.finditer(text))
+    if not matches:
+        return [{"title": "", "text": text}]
+
+    sections = [{"title": "Front matter", "text": text[: matches[0].start()]}]
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections.append({"title": match.group(0).strip(), "text": text[match.start(): end]})
+    return sections
+
+
+def _merge_short(sections: list, min_chars: int) -> list:
+    """
+    Folds sections shorter than min_chars (front matter, table-of-contents
+    hits, part dividers) into the following section.
+    """
+    merged = []
+    carry = ""
+
+    for section in sections:
+        text = f"{carry}\n{section['text']}".strip() if carry else section["text"].strip()
+        if len(text) < min_chars:
+            carry = text
+            continue
+        merged.append({"title": section["title"], "text": text})
+        carry = ""
+
+    if carry:
+        if merged:
+            merged[-1]["text"] = f"{merged[-1]['text']}\n{carry}"
+        else:
+            merged.append({"title": "", "text": carry})
+
+    return merged
+
+
+def split_book(pdf_path: Path) -> dict:
+    """
+    Extracts a book PDF once and splits it into chapters, using the PDF
+    outline when it has one and chapter headings in the text otherwise.
+
+    Returns {"title": ..., "chapters": [{"title", "text"}, ...]}.
+    Raises ValueError for books with no usable text or too many chapters.
+    """
+    from pypdf import PdfReader  # media dependency; workers only
+
+    reader = PdfReader(pdf_path)
+    pages = [page.extract_text() or "" for page in reader.pages]
+
+    starts = _outline_starts(reader)
+    if len(starts) >= 2:
+        sections = _split_by_outline(pages, starts)
+    else:
+        sections = _split_by_headings("\n".join(pages))
+
+    chapters = [c for c in _merge_short(sections, BATCH_MIN_CHAPTER_CHARS) if c["text"].strip()]
+    if not chapters:
+        raise ValueError("No extractable text in the book")
+    if len(chapters) > BATCH_MAX_CHAPTERS:
+        raise ValueError(
+            f"Book has {len(chapters)} chapters; at most {BATCH_MAX_CHAPTERS} per batch"
+        )
+
+    metadata = reader.metadata
+    title = (metadata.title if metadata and metadata.title else "") or ""
+
+    return {"title": title.strip(), "chapters": chapters}
+
+
+# -------------------------------
+# EXECUTION
+# -------------------------------
+def chapter_config(parent_config: dict, book_title: str, index: int, chapter: dict) -> dict:
+    """
+    The child job's config. Its text_blob is not written yet (see
+    store_chapter_texts).
+    """
+    config = {k: v for k, v in parent_config.items() if k not in BOOK_ONLY_KEYS}
+    config.update({
+        "input_type": "text",
+        "text_blob": blob_digest(chapter["text"].encode("utf-8")),
+        "book_title": book_title,
+        "chapter_title": chapter["title"],
+        "chapter_index": index,
+    })
+    return config
+
+
+def store_chapter_texts(chapters: list):
+    for chapter in chapters:
+        put_blob_bytes(chapter["text"].encode("utf-8"))
+
+
+def _fail(db: Session, parent: Job, error_type: str, message: str, status: str = "failed") -> Job:
+    parent.status = status
+    parent.error_type = error_type
+    parent.error_message = message
+    db.commit()
+    db.refresh(parent)
+    return parent
+
+
+def execute_batch(parent: Job, db: Session) -> Job:
+    """
+    Splits a queued book job into chapter jobs and runs them in order.
+    """
+    if parent.status != "queued":
+        raise ValueError("Only queued jobs can be executed")
+
+    with span(
+        "job.batch",
+        traceparent=parent.trace_parent,
+        **{"job.id": str(parent.id), "job.engine": parent.engine},
+    ) as batch_span:
+        parent = _execute_batch(parent, db)
+        batch_span.set_attribute("job.status", parent.status)
+        return parent
+
+
+def _execute_batch(parent: Job, db: Session) -> Job:
+    db.refresh(parent)
+    if parent.cancel_requested_at is not None:
+        return _fail(db, parent, "user", "Job cancelled", status="cancelled")
+
+    parent.status = "running"
+    db.commit()
+
+    # ---------------------------------
+    # 1. Extract + split (once per book)
+    # ---------------------------------
+    try:
+        with span("batch.split"):
+            book = split_book(blob_path(parent.config["pdf_blob"]))
+    except ValueError as e:
+        return _fail(db, parent, "user", str(e))
+    except Exception as e:
+        return _fail(db, parent, "system", f"Book extraction failed: {e}")
+
+    # Cancelled while splitting → nothing created, nothing debited
+    db.refresh(parent)
+    if parent.cancel_requested_at is not None:
+        return _fail(db, parent, "user", "Job cancelled", status="cancelled")
+
+    # ---------------------------------
+    # 2. Create children + ONE debit, in one transaction
+    # ---------------------------------
+    cost = get_engine_cost(parent.engine)
+    get_or_create_balance(db, parent.user_id)  # commits on first use; do it before adding rows
+
+    children = []
+    for index, chapter in enumerate(book["chapters"]):
+        child = Job(
+            id=uuid.uuid4(),
+            user_id=parent.user_id,
+            parent_id=parent.id,
+            engine=parent.engine,
+            status="queued",
+            input_type="text",
+            config=chapter_config(parent.config, book["title"], index, chapter),
+            output_dir=f"outputs/{uuid.uuid4()}",
+            profile=parent.profile,
+            trace_parent=current_traceparent(),
+        )
+        db.add(child)
+        children.append(child)
+
+    try:
+        debit_credits(
+            db,
+            user_id=parent.user_id,
+            job_id=parent.id,
+            amount=cost * len(children),
+            reason=f"{parent.engine}_batch_execution",
+        )
+    except ValueError as e:
+        db.rollback()
+        return _fail(db, parent, "user", str(e))
+
+    # ---------------------------------
+    # 3. Store chapter texts (paid for → a failure is refunded)
+    # ---------------------------------
+    try:
+        store_chapter_texts(book["chapters"])
+    except Exception as e:
+        for child in children:
+            child.status = "failed"
+            child.error_type = "system"
+            child.error_message = "Chapter text could not be stored"
+        # 🚨 SYSTEM failure → refund the whole batch
+        refund_credits(
+            db,
+            user_id=parent.user_id,
+            job_id=parent.id,
+            amount=cost * len(children),
+            reason="system_failure_refund",
+        )
+        return _fail(db, parent, "system", f"Storing chapter texts failed: {e}")
+
+    # ---------------------------------
+    # 4. Run chapters (already paid for)
+    # ---------------------------------
+    # Cancelling the book flags every child; queued ones are refunded
+    # by the executor without running.
+    for child in children:
+        db.refresh(child)
+        try:
+            execute_job(child, db, prepaid=True)
+        except Exception:
+            # Recorded on the child (and refunded if it was a system failure)
+            continue
+
+    db.refresh(parent)
+    if parent.cancel_requested_at is not None:
+        return _fail(db, parent, "user", "Job cancelled", status="cancelled")
+
+    failed = [child for child in children if child.status != "completed"]
+    if failed:
+        error_type = "system" if any(c.error_type == "system" for c in failed) else "user"
+        return _fail(db, parent, error_type, f"{len(failed)} of {len(children)} chapters failed")
+
+    parent.status = "completed"
+    parent.error_type = None
+    parent.error_message = None
+    db.commit()
+    db.refresh(parent)
+    return parent
@@ -1,32 +1,210 @@
+import inspect
+import logging
+import math
+import threading
+from datetime import datetime, timezone
+
 from sqlalchemy.orm import Session
 
-from backend.jobs.models import Job
-from backend.engines.video_engine.generate import run_job
-from backend.engines.video_engine.generate import SystemFailure, UserContentError
+from backend.database import SessionLocal
+from backend.jobs.models import Job, JobReel
+from backend.engines.errors import JobCancelled, SystemFailure, UserContentError
+from backend.engines.registry import get_engine_cost, get_engine_spec, load_engine
+from backend.engines.circuit import open_circuits
+from backend.engines.context import JobContext, register_context, unregister_context
+from backend.config import (
+    JOB_CANCEL_POLL_SECONDS,
+    JOB_DEADLINE_SECONDS,
+    JOB_MAX_DEADLINE_SECONDS,
+)
 
 from backend.credits.service import debit_credits, refund_credits
-from backend.config import VIDEO_JOB_COST
+from backend.profiling import JobProfiler, publish_profile
+from backend.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def job_deadline_seconds(config: dict) -> float:
+    """
+    The job's deadline budget: its own deadline_seconds if valid,
+    never above JOB_MAX_DEADLINE_SECONDS.
+    """
+    try:
+        requested = float(config.get("deadline_seconds") or JOB_DEADLINE_SECONDS)
+    except (TypeError, ValueError):
+        requested = JOB_DEADLINE_SECONDS
+    return min(max(requested, 1.0), JOB_MAX_DEADLINE_SECONDS)
+
+
+def watch_cancel_flag(context: JobContext, job_id) -> threading.Event:
+    """
+    Polls the job's cancel flag (set by the API on any node) and cancels
+    the context when it appears. Set the returned event to stop polling.
+    """
+    stop = threading.Event()
+
+    def poll():
+        while not stop.wait(JOB_CANCEL_POLL_SECONDS) and not context.stopped:
+            db = SessionLocal()
+            try:
+                requested = (
+                    db.query(Job.cancel_requested_at)
+                    .filter(Job.id == job_id)
+                    .scalar()
+                )
+            except Exception:
+                requested = None
+            finally:
+                db.close()
+
+            if requested is not None:
+                context.cancel()
+
+    threading.Thread(target=poll, name=f"cancel-watch-{job_id}", daemon=True).start()
+    return stop
+
+
+def record_reel(job_id, index: int, reel: dict):
+    """
+    Persists one reel's reported result (see JobContext.report_reel).
+    Uses its own session: reels report from pipeline threads.
+    """
+    db = SessionLocal()
+    try:
+        row = db.query(JobReel).filter_by(job_id=job_id, reel_index=index).first()
+        if row is None:
+            row = JobReel(job_id=job_id, reel_index=index)
+            db.add(row)
+        row.status = reel["status"]
+        row.attempts = reel.get("attempts", 0)
+        row.error_type = reel.get("error_type")
+        row.error_message = reel.get("error_message")
+        row.video = reel.get("video")
+        db.commit()
+    except Exception:
+        # The reel itself is unaffected; settlement uses the context
+        logger.exception("Recording reel %d of job %s failed", index, job_id)
+    finally:
+        db.close()
+
+
+def _refund_unused(db: Session, job: Job, cost: int, context: JobContext, reason: str):
+    """
+    Refunds the share of the cost the engine didn't report as done
+    (context.progress), e.g. reels that failed or were skipped. Partial
+    credits round in the user's favour.
+    """
+    # The epsilon keeps float noise (e.g. 2.9999999) from costing a credit
+    unused = cost - math.floor(cost * context.progress + 1e-9)
+    if unused > 0:
+        refund_credits(
+            db,
+            user_id=job.user_id,
+            job_id=job.id,
+            amount=unused,
+            reason=reason,
+        )
+
+
+def _failed_reels_message(context: JobContext) -> str:
+    failed = context.reels_with_status("failed")
+    total = len(failed) + len(context.reels_with_status("completed"))
+    reels = ", ".join(str(index) for index in sorted(failed))
+    return f"{len(failed)} of {total} reels failed (reel {reels})"
 
 
-def execute_job(job: Job, db: Session) -> Job:
+def _accepts_context(run_job) -> bool:
+    # External engines may predate the context argument
+    try:
+        return "context" in inspect.signature(run_job).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def execute_job(job: Job, db: Session, *, prepaid: bool = False) -> Job:
     """
     Executes a queued job and updates its lifecycle state.
     This function is the ONLY place where engine is invoked.
+
+    prepaid: the job's cost was already debited (e.g. as part of a
+    batch), so skip the debit. Refunds still apply per job.
     """
 
     if job.status != "queued":
         raise ValueError("Only queued jobs can be executed")
 
+    # Joins the trace of the request that submitted the job
+    with span(
+        "job.execute",
+        traceparent=job.trace_parent,
+        **{"job.id": str(job.id), "job.engine": job.engine, "job.prepaid": prepaid},
+    ) as job_span:
+        if job.created_at is not None:
+            queued_for = datetime.now(timezone.utc) - job.created_at
+            job_span.set_attribute("job.queue_wait_ms", round(queued_for.total_seconds() * 1000))
+
+        job = _execute_job(job, db, prepaid)
+        job_span.set_attribute("job.status", job.status)
+        return job
+
+
+def _execute_job(job: Job, db: Session, prepaid: bool) -> Job:
+    cost = get_engine_cost(job.engine)
+
+    # ---------------------------------
+    # Cancelled before it started
+    # (refund only if it was paid for up front)
+    # ---------------------------------
+    db.refresh(job)
+    if job.cancel_requested_at is not None:
+        job.status = "cancelled"
+        job.error_type = "user"
+        job.error_message = "Job cancelled"
+        if prepaid:
+            refund_credits(
+                db,
+                user_id=job.user_id,
+                job_id=job.id,
+                amount=cost,
+                reason="cancellation_refund",
+            )
+        db.commit()
+        db.refresh(job)
+        return job
+
+    # ---------------------------------
+    # Fast-fail while a required provider is down
+    # (nothing debited yet → nothing to refund)
+    # ---------------------------------
+    unavailable = open_circuits(get_engine_spec(job.engine).get("providers", []))
+    if unavailable:
+        job.status = "failed"
+        job.error_type = "system"
+        job.error_message = "Provider unavailable: " + ", ".join(unavailable)
+        if prepaid:
+            refund_credits(
+                db,
+                user_id=job.user_id,
+                job_id=job.id,
+                amount=cost,
+                reason="provider_unavailable_refund",
+            )
+        db.commit()
+        db.refresh(job)
+        return job
+
     # ---------------------------------
     # 0. Debit credits BEFORE execution
     # ---------------------------------
-    debit_credits(
-        db,
-        user_id=job.user_id,
-        job_id=job.id,
-        amount=VIDEO_JOB_COST,
-        reason="video_job_execution",
-    )
+    if not prepaid:
+        debit_credits(
+            db,
+            user_id=job.user_id,
+            job_id=job.id,
+            amount=cost,
+            reason=f"{job.engine}_job_execution",
+        )
 
     # ---------------------------------
     # 1. Mark job as running
@@ -35,24 +213,58 @@ def execute_job(job: Job, db: Session) -> Job:
     db.commit()
     db.refresh(job)
 
+    context = JobContext(str(job.id), deadline_seconds=job_deadline_seconds(job.config))
+    context.on_reel(lambda index, reel: record_reel(job.id, index, reel))
+    register_context(context)
+    stop_watch = watch_cancel_flag(context, job.id)
+
+    profiler = JobProfiler(str(job.id)) if job.profile else None
+    if profiler is not None and not profiler.start():
+        profiler = None
+
     try:
         # ---------------------------------
-        # 2. Execute engine
+        # 2. Execute engine (imported lazily)
         # ---------------------------------
-        run_job(
-            job_id=str(job.id),
-            user_id=job.user_id,
-            config=job.config,
-            output_dir=job.output_dir,
-        )
+        run_job = load_engine(job.engine)
+        kwargs = {"context": context} if _accepts_context(run_job) else {}
+        with span("engine.run_job", **{"job.engine": job.engine}):
+            run_job(
+                job_id=str(job.id),
+                user_id=str(job.user_id),
+                config=job.config,
+                output_dir=job.output_dir,
+                **kwargs,
+            )
 
         # ---------------------------------
         # 3. Mark completed
+        # (partial: failed reels are recorded; system ones and
+        # skipped ones refunded)
         # ---------------------------------
         job.status = "completed"
         job.error_type = None
         job.error_message = None
 
+        failed = context.reels_with_status("failed")
+        system = any(reel["error_type"] == "system" for reel in failed.values())
+        if failed:
+            job.error_type = "system" if system else "user"
+            job.error_message = _failed_reels_message(context)
+        if system or context.reels_with_status("skipped"):
+            # Reels we failed or had nothing to deliver for aren't charged
+            _refund_unused(db, job, cost, context, "partial_failure_refund")
+
+    except JobCancelled as e:
+        # ---------------------------------
+        # 4. Cancelled by the user (refund the unused share)
+        # ---------------------------------
+        job.status = "cancelled"
+        job.error_type = "user"
+        job.error_message = str(e)
+
+        _refund_unused(db, job, cost, context, "cancellation_refund")
+
     except UserContentError as e:
         # ---------------------------------
         # 4a. User failure (NO refund)
@@ -65,6 +277,15 @@ def execute_job(job: Job, db: Session) -> Job:
         # ---------------------------------
         # 4b. System failure (REFUND)
         # ---------------------------------
+        completed = context.reels_with_status("completed")
+        if completed:
+            # Reels already published are kept; only the rest is refunded
+            job.status = "completed"
+            job.error_type = "system"
+            job.error_message = f"{e} ({len(completed)} reels completed)"
+            _refund_unused(db, job, cost, context, "partial_failure_refund")
+            return job
+
         job.status = "failed"
         job.error_type = "system"
         job.error_message = str(e)
@@ -74,7 +295,7 @@ def execute_job(job: Job, db: Session) -> Job:
             db,
             user_id=job.user_id,
             job_id=job.id,
-            amount=VIDEO_JOB_COST,
+            amount=cost,
             reason="system_failure_refund",
         )
 
@@ -92,13 +313,25 @@ def execute_job(job: Job, db: Session) -> Job:
             db,
             user_id=job.user_id,
             job_id=job.id,
-            amount=VIDEO_JOB_COST,
+            amount=cost,
             reason="unhandled_system_failure_refund",
         )
 
         raise
 
     finally:
+        stop_watch.set()
+        context.close()
+        unregister_context(context)
+
+        if profiler is not None:
+            profiler.stop()
+            try:
+                publish_profile(profiler, job.output_dir)
+            except Exception:
+                # Diagnostics only; never fails the job
+                logger.exception("Publishing profile for job %s failed", job.id)
+
         db.commit()
         db.refresh(job)
 
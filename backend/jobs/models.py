@@ -1,28 +1,89 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, JSON
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql import func
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Index, Integer, JSON, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import false, func, text
 
 from backend.database import Base
 
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # GET /jobs: one user's jobs, newest first
+        Index("ix_jobs_user_id_created_at", "user_id", "created_at"),
+        # Worker queue scan (see backend/workers)
+        Index(
+            "ix_jobs_claimable",
+            "created_at",
+            postgresql_where=text("status = 'queued' AND claimed_at IS NULL AND parent_id IS NULL"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(String, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+
+    # Set on chapter jobs fanned out from a book batch
+    parent_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id"), nullable=True, index=True)
 
     engine = Column(String, nullable=False)  # e.g. "video"
-    status = Column(String, nullable=False)  # queued | running | completed | failed
+    status = Column(String, nullable=False, index=True)  # queued | running | completed | failed | cancelled
 
-    input_type = Column(String, nullable=False)  # pdf | text | prompt
-    config = Column(JSON, nullable=False)
+    input_type = Column(String, nullable=False)  # pdf | text | prompt | book
+    # Small by construction: large inputs live in the blob store
+    # (see JOB_CONFIG_MAX_BYTES); JSONB on Postgres
+    config = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
 
     output_dir = Column(String, nullable=False)
 
+    # On a completed job: some reels failed (see job_reels)
     error_type = Column(String, nullable=True)  # system | user | null
     error_message = Column(String, nullable=True)
 
+    # Set by POST /jobs/{id}/cancel; the worker running the job polls it
+    cancel_requested_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Run under the job profiler (admin-only; see backend/profiling.py)
+    profile = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    # Process that took the job off the queue ("<host>:<pid>");
+    # the API's own process for inline dispatch
+    claimed_by = Column(String, nullable=True, index=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # traceparent of the submitting request (see backend/tracing.py)
+    trace_parent = Column(String(55), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+
+class JobReel(Base):
+    """
+    Result of one reel of a job, written as the engine reports it.
+    Completed reels stay published when others fail.
+    """
+    __tablename__ = "job_reels"
+    __table_args__ = (
+        UniqueConstraint("job_id", "reel_index", name="uq_job_reels_job_id_reel_index"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id"), nullable=False)
+    reel_index = Column(Integer, nullable=False)
+
+    status = Column(String, nullable=False)  # running | completed | failed | skipped
+    attempts = Column(Integer, nullable=False, default=0)
+
+    error_type = Column(String, nullable=True)  # system | user | null
+    error_message = Column(String, nullable=True)
+
+    # Primary video, relative to the job's output dir
+    video = Column(String, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
         DateTime(timezone=True),
@@ -1,26 +1,55 @@
 import uuid
-import os
+import json
+from datetime import datetime, timezone
+import mimetypes
+import posixpath
+import re
 from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
-from fastapi import Path
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import Path, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session, defer
 from sqlalchemy import desc
 
-from backend.database import get_db
-from backend.jobs.models import Job
+from backend.database import get_db, get_read_db, mark_write, read_or_primary
+from backend.tracing import current_traceparent
+from backend.jobs.models import Job, JobReel
+from backend.uploads.models import Upload
 from backend.jobs.executor import execute_job
+from backend.jobs.batch import BOOK_ONLY_KEYS, execute_batch
+from backend.engines.registry import DEFAULT_ENGINE, validate_engine_config
+from backend.engines.context import cancel_running_job
+from backend.storage.backends import get_storage, job_key
+from backend.storage.zipstream import BundleTooLarge, ZipBundle
+from backend.storage.blobs import put_blob_bytes
+from backend.profiling import PROFILE_DIR
+from backend.workers.queue import process_id
+from backend.config import JOB_CONFIG_MAX_BYTES, JOB_DISPATCH, JOB_INLINE_TEXT_MAX_BYTES
 
 from backend.auth.dependencies import get_current_user
 from backend.users.models import User
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# .m3u8 and .ts go together: a playlist without its segments can't play
+OUTPUT_EXTENSIONS = (
+    ".mp4", ".png", ".mp3", ".json", ".m3u8", ".ts",
+    ".jpg", ".webp", ".vtt",
+)
+
+# Not in every mime.types (some map .ts to Qt translation files)
+mimetypes.add_type("video/mp2t", ".ts")
+
+# Job outputs never change once published (each job has its own dir),
+# so previews can be cached by the client for a long time.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
 
 @router.post("/")
 def submit_job(
     *,
     background_tasks: BackgroundTasks,
     job_config: dict,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -34,23 +63,55 @@ def submit_job(
             status_code=422,
             detail="input_type is required in job_config",
         )
-    
-    
+
+    profile = _profile_flag(job_config, current_user)
+
+    engine = job_config.get("engine", DEFAULT_ENGINE)
+
+    try:
+        validate_engine_config(engine, job_config)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # Resolve an uploaded input to its blob so any worker can read it
+    upload_id = job_config.get("upload_id")
+    if upload_id:
+        upload = (
+            db.query(Upload)
+            .filter(
+                Upload.id == upload_id,
+                Upload.user_id == current_user.id,
+            )
+            .first()
+        )
+        if not upload:
+            raise HTTPException(status_code=404, detail="Upload not found")
+
+        job_config["pdf_blob"] = upload.sha256
+
+    job_config = _offload_large_inputs(job_config)
+    _check_config_size(job_config)
+
     job = Job(
         id=uuid.uuid4(),
-        user_id=str(current_user.id),
-        engine="video",
+        user_id=current_user.id,
+        engine=engine,
         status="queued",
         input_type=input_type,
         config=job_config,
         output_dir=f"outputs/{uuid.uuid4()}",
+        profile=profile,
+        trace_parent=current_traceparent(),
+        **_inline_claim(),
     )
 
     db.add(job)
     db.commit()
     db.refresh(job)
+    mark_write(response)
 
-    background_tasks.add_task(execute_job, job, db)
+    if JOB_DISPATCH == "inline":
+        background_tasks.add_task(execute_job, job, db)
 
     return {
         "job_id": str(job.id),
@@ -58,22 +119,184 @@ def submit_job(
     }
 
 
+@router.post("/batch")
+def submit_book_batch(
+    *,
+    background_tasks: BackgroundTasks,
+    job_config: dict,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Submit a whole book (an uploaded PDF) as one batch.
 
-@router.get("/")
-def list_jobs(
+    The worker splits it into chapters once and runs one child job per
+    chapter; all chapters are debited in a single ledger entry. Other
+    config keys (e.g. output_profile) apply to every chapter.
+    """
+    upload_id = job_config.get("upload_id")
+    if not upload_id:
+        raise HTTPException(status_code=422, detail="upload_id is required for a book batch")
+
+    profile = _profile_flag(job_config, current_user)
+
+    engine = job_config.get("engine", DEFAULT_ENGINE)
+
+    # Chapters run as text jobs; check the engine takes those
+    chapter_config = {k: v for k, v in job_config.items() if k not in BOOK_ONLY_KEYS}
+    try:
+        validate_engine_config(engine, {**chapter_config, "input_type": "text", "text_blob": "-"})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    upload = (
+        db.query(Upload)
+        .filter(
+            Upload.id == upload_id,
+            Upload.user_id == current_user.id,
+        )
+        .first()
+    )
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    parent_config = {**job_config, "input_type": "book", "engine": engine, "pdf_blob": upload.sha256}
+    _check_config_size(parent_config)
+
+    parent = Job(
+        id=uuid.uuid4(),
+        user_id=current_user.id,
+        engine=engine,
+        status="queued",
+        input_type="book",
+        config=parent_config,
+        output_dir=f"outputs/{uuid.uuid4()}",
+        profile=profile,
+        trace_parent=current_traceparent(),
+        **_inline_claim(),
+    )
+
+    db.add(parent)
+    db.commit()
+    db.refresh(parent)
+    mark_write(response)
+
+    if JOB_DISPATCH == "inline":
+        background_tasks.add_task(execute_batch, parent, db)
+
+    return {
+        "job_id": str(parent.id),
+        "status": parent.status,
+    }
+
+
+def _offload_large_inputs(job_config: dict) -> dict:
+    """
+    Moves a large text input to the blob store; config keeps its digest
+    (which is also its content hash) and size.
+    """
+    text = job_config.get("text")
+    if not isinstance(text, str):
+        return job_config
+
+    data = text.encode("utf-8")
+    if len(data) <= JOB_INLINE_TEXT_MAX_BYTES:
+        return job_config
+
+    config = {k: v for k, v in job_config.items() if k != "text"}
+    config["text_blob"] = put_blob_bytes(data)
+    config["text_bytes"] = len(data)
+    return config
+
+
+def _check_config_size(job_config: dict):
+    size = len(json.dumps(job_config, separators=(",", ":")).encode("utf-8"))
+    if size > JOB_CONFIG_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"job_config too large ({size} bytes, max {JOB_CONFIG_MAX_BYTES})",
+        )
+
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(
+    job_id: str,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    jobs = (
+    """
+    Requests cancellation of a queued or running job (and, for a book,
+    of its unfinished chapters). A running job stops at its next check
+    and is refunded for the work it did not do.
+    """
+    job = (
         db.query(Job)
-        .filter(Job.user_id == str(current_user.id))
-        .order_by(desc(Job.created_at))
-        .all()
+        .filter(
+            Job.id == job_id,
+            Job.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status not in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+
+    jobs = [job]
+    if job.input_type == "book":
+        jobs += (
+            db.query(Job)
+            .filter(
+                Job.parent_id == job.id,
+                Job.status.in_(("queued", "running")),
+            )
+            .all()
+        )
+
+    now = datetime.now(timezone.utc)
+    for target in jobs:
+        if target.cancel_requested_at is None:
+            target.cancel_requested_at = now
+    db.commit()
+    mark_write(response)
+
+    # Same process → stop now; other workers pick up the flag on their next poll
+    for target in jobs:
+        cancel_running_job(str(target.id))
+
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "cancel_requested": True,
+    }
+
+
+@router.get("/")
+def list_jobs(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    jobs = read_or_primary(
+        db,
+        lambda session: (
+            session.query(Job)
+            .options(defer(Job.config))
+            .filter(Job.user_id == current_user.id)
+            .order_by(desc(Job.created_at))
+            .all()
+        ),
+        required=False,
     )
 
     return [
         {
             "job_id": str(job.id),
+            "parent_id": str(job.parent_id) if job.parent_id else None,
             "engine": job.engine,
             "status": job.status,
             "input_type": job.input_type,
@@ -92,22 +315,16 @@ def list_jobs(
 def get_job(
     job_id: str = Path(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    job = (
-        db.query(Job)
-        .filter(
-            Job.id == job_id,
-            Job.user_id == str(current_user.id),
-        )
-        .first()
-    )
+    job = _find_job(db, job_id, current_user)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return {
+    result = {
         "job_id": str(job.id),
+        "parent_id": str(job.parent_id) if job.parent_id else None,
         "engine": job.engine,
         "status": job.status,
         "input_type": job.input_type,
@@ -119,40 +336,108 @@ def get_job(
         "error_message": job.error_message,
     }
 
+    # Per-reel results: a completed job may have failed reels
+    reels = read_or_primary(
+        db,
+        lambda session: (
+            session.query(JobReel)
+            .filter(JobReel.job_id == job.id)
+            .order_by(JobReel.reel_index)
+            .all()
+        ),
+        required=False,
+    )
+    result["reels"] = [
+        {
+            "reel_index": reel.reel_index,
+            "status": reel.status,
+            "attempts": reel.attempts,
+            "error_type": reel.error_type,
+            "error_message": reel.error_message,
+            "video": reel.video,
+        }
+        for reel in reels
+    ]
+
+    if job.input_type == "book":
+        children = read_or_primary(
+            db,
+            lambda session: (
+                session.query(Job)
+                .filter(Job.parent_id == job.id)
+                .all()
+            ),
+            required=False,
+        )
+        result["children"] = [
+            {
+                "job_id": str(child.id),
+                "chapter_index": child.config.get("chapter_index"),
+                "chapter_title": child.config.get("chapter_title"),
+                "status": child.status,
+                "error_type": child.error_type,
+            }
+            for child in sorted(children, key=lambda c: c.config.get("chapter_index", 0))
+        ]
 
+    return result
 
 
-@router.get("/{job_id}/outputs")
-def list_job_outputs(
+
+
+@router.get("/{job_id}/status")
+def get_job_status(
     job_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    job = (
-        db.query(Job)
-        .filter(
-            Job.id == job_id,
-            Job.user_id == str(current_user.id),
-        )
-        .first()
+    """
+    Lightweight status for polling: a few columns, never the config.
+    """
+    row = read_or_primary(
+        db,
+        lambda session: (
+            session.query(
+                Job.status,
+                Job.error_type,
+                Job.error_message,
+                Job.updated_at,
+            )
+            .filter(
+                Job.id == job_id,
+                Job.user_id == current_user.id,
+            )
+            .first()
+        ),
+        required=True,
     )
 
-    if not job:
+    if not row:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    outputs = []
+    return {
+        "job_id": job_id,
+        "status": row.status,
+        "error_type": row.error_type,
+        "error_message": row.error_message,
+        "updated_at": row.updated_at,
+    }
 
-    if os.path.exists(job.output_dir):
-        for root, _, files in os.walk(job.output_dir):
-            for file in files:
-                if file.endswith((".mp4", ".png", ".mp3", ".json")):
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, job.output_dir)
-                    outputs.append(rel_path)
+
+@router.get("/{job_id}/outputs")
+def list_job_outputs(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    job = _find_job(db, job_id, current_user)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
 
     return {
         "job_id": str(job.id),
-        "outputs": outputs,
+        "outputs": _list_outputs(job),
     }
 
 
@@ -164,28 +449,238 @@ def download_job_output(
     job_id: str,
     path: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    job = (
-        db.query(Job)
-        .filter(
-            Job.id == job_id,
-            Job.user_id == str(current_user.id),
-        )
-        .first()
-    )
+    job = _find_job(db, job_id, current_user)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return _serve_job_file(job, path)
+
+
+@router.get("/{job_id}/files/{path:path}")
+def get_job_file(
+    job_id: str,
+    path: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Path-style download. Relative URIs inside outputs (HLS playlists →
+    segments) resolve against this route.
+    """
+    job = _find_job(db, job_id, current_user)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return _serve_job_file(job, path)
+
+
+@router.get("/{job_id}/bundle")
+def download_job_bundle(
+    job_id: str,
+    request: Request,
+    path: list[str] | None = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Streams a ZIP of the job's outputs (all of them, or the given paths)
+    in one response. Entries are stored, so the length is known up front
+    and interrupted downloads can resume with a Range request.
+    """
+    job = _find_job(db, job_id, current_user)
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    full_path = os.path.abspath(os.path.join(job.output_dir, path))
-    base_dir = os.path.abspath(job.output_dir)
+    if path:
+        rel_paths = list(dict.fromkeys(_normalize_path(p) for p in path))
+        if any(_is_private(rel_path) for rel_path in rel_paths):
+            raise HTTPException(status_code=404, detail="File not found")
+    else:
+        rel_paths = sorted(_list_outputs(job))
+
+    if not rel_paths:
+        raise HTTPException(status_code=404, detail="No outputs to bundle")
+
+    storage = get_storage()
+    entries = []
+    for rel_path in rel_paths:
+        key = job_key(job.output_dir, rel_path)
+        if not storage.exists(key):
+            raise HTTPException(status_code=404, detail=f"File not found: {rel_path}")
+        entries.append((rel_path, key, storage.size(key), storage.crc32(key)))
+
+    try:
+        bundle = ZipBundle(storage, entries, modified=job.created_at)
+    except BundleTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": bundle.etag,
+        "Content-Disposition": f'attachment; filename="job_{job.id}.zip"',
+    }
+
+    # A stale If-Range (different selection/sizes) gets the full archive
+    byte_range = None
+    if request.headers.get("if-range", bundle.etag) == bundle.etag:
+        byte_range = _parse_range(request.headers.get("range"), bundle.size)
+
+    if byte_range is None:
+        return StreamingResponse(
+            bundle.iter_bytes(),
+            media_type="application/zip",
+            headers={**headers, "Content-Length": str(bundle.size)},
+        )
+
+    start, end = byte_range
+    return StreamingResponse(
+        bundle.iter_bytes(start, end),
+        status_code=206,
+        media_type="application/zip",
+        headers={
+            **headers,
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{bundle.size}",
+        },
+    )
+
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str | None, size: int) -> tuple | None:
+    """
+    Parses a single-range Range header into inclusive (start, end).
+    Returns None for no/unsupported ranges (→ full response).
+    """
+    if not header:
+        return None
+
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _find_job(db: Session, job_id: str, current_user: User) -> Job | None:
+    """
+    The user's job, from the read session (primary if the replica
+    hasn't caught up with it yet).
+    """
+    return read_or_primary(
+        db,
+        lambda session: (
+            session.query(Job)
+            .filter(
+                Job.id == job_id,
+                Job.user_id == current_user.id,
+            )
+            .first()
+        ),
+        required=True,
+    )
+
+
+def _is_hidden(rel_path: str) -> bool:
+    return any(part.startswith(".") for part in rel_path.split("/"))
+
 
+def _is_private(rel_path: str) -> bool:
+    # In-progress writes, or profiler artifacts (served by /admin only)
+    return _is_hidden(rel_path) or rel_path.split("/", 1)[0] == PROFILE_DIR
+
+
+def _inline_claim() -> dict:
+    """
+    Inline dispatch runs the job in this process: claim it at insert so
+    workers sharing the database never pick it up.
+    """
+    if JOB_DISPATCH != "inline":
+        return {}
+    return {"claimed_by": process_id(), "claimed_at": datetime.now(timezone.utc)}
+
+
+def _profile_flag(job_config: dict, current_user: User) -> bool:
+    """
+    Pops the "profile" flag off a job config; only admins may set it.
+    """
+    profile = bool(job_config.pop("profile", False))
+    if profile and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Profiling is admin-only")
+    return profile
+
+
+def _list_outputs(job: Job) -> list:
+    outputs = []
+
+    for rel_path in get_storage().list(job.output_dir):
+        # Hidden files/dirs are in-progress writes (e.g. encoding)
+        if _is_private(rel_path):
+            continue
+        if rel_path.endswith(OUTPUT_EXTENSIONS):
+            outputs.append(rel_path)
+
+    return outputs
+
+
+def _normalize_path(path: str) -> str:
     # 🔒 Path traversal protection
-    if not full_path.startswith(base_dir):
+    rel_path = posixpath.normpath(path.replace("\\", "/"))
+    if rel_path.startswith(("/", "../")) or rel_path in (".", ".."):
         raise HTTPException(status_code=403, detail="Invalid file path")
+    return rel_path
+
+
+def _serve_job_file(job: Job, path: str):
+    rel_path = _normalize_path(path)
+
+    # Hidden files/dirs are in-progress writes, never served
+    if _is_private(rel_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    storage = get_storage()
+    key = job_key(job.output_dir, rel_path)
 
-    if not os.path.exists(full_path):
+    if not storage.exists(key):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(full_path, filename=os.path.basename(full_path))
+    filename = posixpath.basename(rel_path)
+
+    headers = {}
+    if "/previews/" in f"/{rel_path}":
+        headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        return FileResponse(local_path, filename=filename, headers=headers)
+
+    return StreamingResponse(
+        storage.iter_bytes(key),
+        media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        headers={
+            **headers,
+            "Content-Length": str(storage.size(key)),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
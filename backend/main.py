@@ -1,17 +1,32 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
-from backend.database import engine, Base
-from backend.jobs.models import Job  # noqa: F401 (ensures model is registered)
+from backend.database import DB_AUTO_MIGRATE, engine
+from backend.migrations import check_schema
+from backend.jobs.models import Job, JobReel  # noqa: F401 (ensures model is registered)
 
 from backend.credits.models import CreditBalance, CreditTransaction  # noqa
 from backend.jobs.routes import router as jobs_router
 
 from backend.users.models import User  # noqa
-from backend.auth.models import MagicLinkToken  # noqa
+from backend.auth.models import MagicLinkToken, UsedMagicLinkNonce  # noqa
+from backend.uploads.models import Upload  # noqa
+from backend.payments.models import PaymentEvent  # noqa
 
 from backend.auth.routes import router as auth_router
 
 from backend.payments.routes import router as payments_router
+from backend.payments.webhooks import router as webhooks_router
+
+from backend.uploads.routes import router as uploads_router
+
+from backend.admin.routes import router as admin_router
+
+from backend.storage.gc import start_output_gc
+from backend.payments.events import start_payment_worker
+from backend.auth.magic_links import start_auth_purge
+from backend.tracing import add_event, span, start_span_exporter
+from backend.ratelimit import check_request, start_rate_limit_sync
 
 # -------------------------------------------------
 # FASTAPI APP
@@ -25,6 +40,64 @@ app = FastAPI(
 app.include_router(jobs_router)
 app.include_router(auth_router)
 app.include_router(payments_router)
+app.include_router(webhooks_router)
+app.include_router(uploads_router)
+app.include_router(admin_router)
+
+
+# -------------------------------------------------
+# RATE LIMITING
+# -------------------------------------------------
+
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    """
+    Rejects requests over a rate limit policy (see backend/ratelimit.py)
+    before they reach a route or the database.
+    """
+    denied = check_request(request)
+    if denied is None:
+        return await call_next(request)
+
+    add_event("ratelimit.denied", policy=denied["policy"], retry_after=denied["retry_after"])
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests"},
+        headers={
+            "Retry-After": str(denied["retry_after"]),
+            "RateLimit-Policy": f'{denied["limit"]};w={denied["window"]}',
+        },
+    )
+
+
+# -------------------------------------------------
+# TRACING
+# -------------------------------------------------
+# Registered after rate_limit, so it wraps it: 429s are traced too
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    One span per request, continuing the caller's trace (traceparent
+    header) if any. Streamed bodies finish after the span ends.
+    """
+    with span(
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.target": request.url.path},
+    ) as request_span:
+        response = await call_next(request)
+
+        route = request.scope.get("route")
+        if route is not None:
+            # Group by route template, not by job id
+            request_span.update_name(f"{request.method} {route.path}")
+            request_span.set_attribute("http.route", route.path)
+        request_span.set_attribute("http.status_code", response.status_code)
+
+        if request_span.traceparent:
+            response.headers["traceparent"] = request_span.traceparent
+        return response
 
 
 # -------------------------------------------------
@@ -34,10 +107,24 @@ app.include_router(payments_router)
 @app.on_event("startup")
 def on_startup():
     """
-    Initialize database tables.
-    Temporary v1 approach until Alembic is introduced.
+    Verify the database schema is migrated (see backend/migrations).
     """
-    Base.metadata.create_all(bind=engine)
+    check_schema(engine, auto_migrate=DB_AUTO_MIGRATE)
+
+    # Tracing: export finished spans (no-op unless TRACING_EXPORTER is set)
+    start_span_exporter()
+
+    # Rate limits: share counters across replicas (if RATE_LIMIT_SYNC)
+    start_rate_limit_sync()
+
+    # Retention: expire old job outputs in the background
+    start_output_gc()
+
+    # Payments: apply stored webhook events to balances
+    start_payment_worker()
+
+    # Auth: drop expired magic-link tokens / used nonces
+    start_auth_purge()
 
 
 # -------------------------------------------------
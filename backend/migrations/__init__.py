@@ -0,0 +1,123 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module in backend/migrations/versions named
+NNNN_description.py with an upgrade(conn) function. It runs in its own
+transaction, and its version is recorded in schema_migrations in that
+same transaction. Apply pending migrations (e.g. as a release step) with:
+
+    python -m backend.migrations
+
+API processes never create or alter tables. At startup they only compare
+the recorded version with the latest one shipped in the code, which is a
+single indexed query. Set DB_AUTO_MIGRATE=1 (e.g. for local development)
+to apply pending migrations at startup instead of refusing to start.
+"""
+import importlib
+import logging
+import pkgutil
+import re
+
+from sqlalchemy import text
+
+from backend.migrations import versions
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key: one migrator at a time across replicas
+MIGRATION_LOCK_KEY = 0x70657270  # "perp"
+
+_NAME_RE = re.compile(r"^(\d{4})_\w+$")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def discover() -> list:
+    """
+    [(version, name, module), ...] in version order.
+    """
+    found = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        match = _NAME_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        found.append((int(match.group(1)), info.name, module))
+
+    found.sort(key=lambda item: item[0])
+    numbers = [version for version, _, _ in found]
+    if len(set(numbers)) != len(numbers):
+        raise RuntimeError("Duplicate migration version numbers")
+    return found
+
+
+def latest_version() -> int:
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(conn) -> int:
+    exists = conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar()
+    if exists is None:
+        return 0
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def migrate(engine) -> list:
+    """
+    Applies pending migrations in order. Returns the names applied.
+    """
+    applied = []
+
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                    " version INTEGER PRIMARY KEY,"
+                    " name VARCHAR NOT NULL,"
+                    " applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+                ))
+
+            for version, name, module in discover():
+                with engine.begin() as conn:
+                    if version <= current_version(conn):
+                        continue
+
+                    logger.info("Applying migration %s", name)
+                    module.upgrade(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                        {"version": version, "name": name},
+                    )
+                    applied.append(name)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            lock_conn.commit()
+
+    return applied
+
+
+def check_schema(engine, auto_migrate: bool = False):
+    """
+    Startup check: the database must be at least at the latest version.
+    A newer database is fine (rolling deploy of the next release).
+    """
+    expected = latest_version()
+    with engine.connect() as conn:
+        current = current_version(conn)
+
+    if current >= expected:
+        return
+
+    if auto_migrate:
+        migrate(engine)
+        return
+
+    raise SchemaOutOfDate(
+        f"Database schema is at version {current}, this code needs {expected}. "
+        "Run: python -m backend.migrations"
+    )
@@ -0,0 +1,15 @@
+from backend.database import engine
+from backend.migrations import current_version, migrate
+
+
+def main():
+    applied = migrate(engine)
+    for name in applied:
+        print(f"applied {name}")
+
+    with engine.connect() as conn:
+        print(f"schema version {current_version(conn)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Baseline: the schema as create_all() built it before migrations existed.
+
+Idempotent, so it both creates a fresh database and adopts one that was
+created by create_all() at any earlier point (columns and tables added
+since the first release are created if missing).
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    # Users / auth
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id UUID PRIMARY KEY,
+        email VARCHAR NOT NULL,
+        is_active BOOLEAN,
+        created_at TIMESTAMPTZ DEFAULT now()
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    """
+    CREATE TABLE IF NOT EXISTS magic_link_tokens (
+        id UUID PRIMARY KEY,
+        user_id UUID NOT NULL REFERENCES users (id),
+        used BOOLEAN,
+        expires_at TIMESTAMPTZ NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT now()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_magic_link_tokens_expires_at ON magic_link_tokens (expires_at)",
+    """
+    CREATE TABLE IF NOT EXISTS used_magic_link_nonces (
+        nonce VARCHAR(32) PRIMARY KEY,
+        expires_at TIMESTAMPTZ NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_used_magic_link_nonces_expires_at ON used_magic_link_nonces (expires_at)",
+
+    # Jobs
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id UUID PRIMARY KEY,
+        user_id VARCHAR NOT NULL,
+        engine VARCHAR NOT NULL,
+        status VARCHAR NOT NULL,
+        input_type VARCHAR NOT NULL,
+        config JSONB NOT NULL,
+        output_dir VARCHAR NOT NULL,
+        error_type VARCHAR,
+        error_message VARCHAR,
+        created_at TIMESTAMPTZ DEFAULT now(),
+        updated_at TIMESTAMPTZ DEFAULT now()
+    )
+    """,
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS parent_id UUID",
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS cancel_requested_at TIMESTAMPTZ",
+    "ALTER TABLE jobs ALTER COLUMN config TYPE JSONB USING config::jsonb",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_parent_id ON jobs (parent_id)",
+
+    # Credits
+    """
+    CREATE TABLE IF NOT EXISTS credit_balances (
+        user_id VARCHAR PRIMARY KEY,
+        balance INTEGER NOT NULL,
+        updated_at TIMESTAMPTZ DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS credit_transactions (
+        id UUID PRIMARY KEY,
+        user_id VARCHAR NOT NULL,
+        job_id UUID,
+        amount INTEGER NOT NULL,
+        type VARCHAR NOT NULL,
+        reason VARCHAR NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT now()
+    )
+    """,
+
+    # Uploads
+    """
+    CREATE TABLE IF NOT EXISTS uploads (
+        id UUID PRIMARY KEY,
+        user_id VARCHAR NOT NULL,
+        sha256 VARCHAR(64) NOT NULL,
+        size_bytes BIGINT NOT NULL,
+        content_type VARCHAR NOT NULL,
+        filename VARCHAR,
+        created_at TIMESTAMPTZ DEFAULT now(),
+        CONSTRAINT uq_uploads_user_sha256 UNIQUE (user_id, sha256)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_uploads_sha256 ON uploads (sha256)",
+
+    # Payments
+    """
+    CREATE TABLE IF NOT EXISTS payment_events (
+        id UUID PRIMARY KEY,
+        provider VARCHAR NOT NULL,
+        event_id VARCHAR NOT NULL,
+        event_name VARCHAR NOT NULL,
+        payload JSONB NOT NULL,
+        status VARCHAR NOT NULL,
+        error VARCHAR,
+        received_at TIMESTAMPTZ DEFAULT now(),
+        applied_at TIMESTAMPTZ,
+        CONSTRAINT uq_payment_events_provider_event UNIQUE (provider, event_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_payment_events_status_received ON payment_events (status, received_at)",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
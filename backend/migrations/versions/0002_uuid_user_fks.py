@@ -0,0 +1,76 @@
+"""
+User references become native UUID foreign keys, plus the indexes behind
+the hot queries (job listing per user, the ledger per user and per job,
+the queue scan by status).
+
+Refuses to run, without changing anything, if any stored user_id is not
+a UUID; fix or remove those rows first.
+
+A foreign key is only added where the column has none yet, whatever its
+name, so databases created by create_all (jobs_parent_id_fkey, ...) or
+partly migrated by hand upgrade cleanly.
+"""
+from sqlalchemy import text
+
+UUID_PATTERN = "^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+
+USER_TABLES = ("jobs", "credit_balances", "credit_transactions", "uploads")
+
+
+def _add_foreign_key(table: str, column: str, references: str) -> str:
+    return f"""
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+        WHERE c.contype = 'f'
+          AND c.conrelid = '{table}'::regclass
+          AND a.attname = '{column}'
+    ) THEN
+        ALTER TABLE {table} ADD CONSTRAINT fk_{table}_{column}
+            FOREIGN KEY ({column}) REFERENCES {references} (id);
+    END IF;
+END $$
+"""
+
+
+STATEMENTS = [
+    *[f"ALTER TABLE {table} ALTER COLUMN user_id TYPE UUID USING user_id::uuid" for table in USER_TABLES],
+    *[_add_foreign_key(table, "user_id", "users") for table in USER_TABLES],
+    _add_foreign_key("jobs", "parent_id", "jobs"),
+
+    "CREATE INDEX IF NOT EXISTS ix_jobs_user_id_created_at ON jobs (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status)",
+    "CREATE INDEX IF NOT EXISTS ix_credit_transactions_user_id_created_at "
+    "ON credit_transactions (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_credit_transactions_job_id ON credit_transactions (job_id)",
+]
+
+
+def _check(conn):
+    problems = []
+    for table in USER_TABLES:
+        bad = conn.execute(
+            text(f"SELECT count(*) FROM {table} WHERE user_id::text !~ :pattern"),
+            {"pattern": UUID_PATTERN},
+        ).scalar()
+        if bad:
+            problems.append(f"{table}: {bad} rows with a non-UUID user_id")
+
+        orphans = conn.execute(text(
+            f"SELECT count(*) FROM {table} t "
+            f"WHERE t.user_id::text ~ '{UUID_PATTERN}' "
+            f"AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = t.user_id::uuid)"
+        )).scalar()
+        if orphans:
+            problems.append(f"{table}: {orphans} rows for users that don't exist")
+
+    if problems:
+        raise RuntimeError("Cannot convert user_id columns: " + "; ".join(problems))
+
+
+def upgrade(conn):
+    _check(conn)
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
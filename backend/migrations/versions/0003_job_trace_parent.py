@@ -0,0 +1,9 @@
+"""
+jobs.trace_parent: the W3C traceparent of the request that submitted the
+job, so its execution joins the same trace on any worker.
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS trace_parent VARCHAR(55)"))
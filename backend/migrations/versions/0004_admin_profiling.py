@@ -0,0 +1,12 @@
+"""
+users.is_admin (grants the /admin routes) and jobs.profile (run the job
+under the profiler). Grant admin with:
+
+    UPDATE users SET is_admin = true WHERE email = '...';
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS is_admin BOOLEAN NOT NULL DEFAULT false"))
+    conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS profile BOOLEAN NOT NULL DEFAULT false"))
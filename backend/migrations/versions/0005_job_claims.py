@@ -0,0 +1,16 @@
+"""
+Job claims for worker processes: jobs.claimed_by / claimed_at, and a
+partial index over the claimable queue (top-level queued jobs nobody has
+claimed) so each claim is an index scan however large jobs grows.
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_by VARCHAR"))
+    conn.execute(text("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_jobs_claimable ON jobs (created_at) "
+        "WHERE status = 'queued' AND claimed_at IS NULL AND parent_id IS NULL"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_jobs_claimed_by ON jobs (claimed_by)"))
@@ -0,0 +1,21 @@
+"""
+Shared rate limit counters: requests per (limit key, window), summed
+across API replicas when RATE_LIMIT_SYNC is on (see backend/ratelimit.py).
+Rows are dropped once expires_at (epoch seconds) has passed.
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS rate_limit_counters ("
+        "key VARCHAR(255) NOT NULL, "
+        "window_start BIGINT NOT NULL, "
+        "count INTEGER NOT NULL, "
+        "expires_at BIGINT NOT NULL, "
+        "PRIMARY KEY (key, window_start))"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_rate_limit_counters_expires_at "
+        "ON rate_limit_counters (expires_at)"
+    ))
@@ -0,0 +1,22 @@
+"""
+Per-reel job results (job_reels), so a job can complete with some reels
+failed and refund only those.
+"""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS job_reels ("
+        "id UUID PRIMARY KEY, "
+        "job_id UUID NOT NULL REFERENCES jobs (id), "
+        "reel_index INTEGER NOT NULL, "
+        "status VARCHAR NOT NULL, "
+        "attempts INTEGER NOT NULL DEFAULT 0, "
+        "error_type VARCHAR, "
+        "error_message VARCHAR, "
+        "video VARCHAR, "
+        "created_at TIMESTAMPTZ DEFAULT now(), "
+        "updated_at TIMESTAMPTZ DEFAULT now(), "
+        "CONSTRAINT uq_job_reels_job_id_reel_index UNIQUE (job_id, reel_index))"
+    ))
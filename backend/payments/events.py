@@ -0,0 +1,194 @@
+"""
+Payment event ingestion and credit application.
+
+Webhooks only verify the signature and insert the raw event, keyed by
+(provider, event_id) with ON CONFLICT DO NOTHING, then return. Provider
+retries of an event that is already stored are no-ops.
+
+A background worker claims pending events in batches (FOR UPDATE SKIP
+LOCKED, so replicas split the work). It writes one ledger row per event,
+adds each user's total to their balance with a single atomic upsert, and
+marks the events applied, all in one transaction. An event is therefore
+credited exactly once, and concurrent webhooks never race on a
+read-modify-write of the balance.
+"""
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend.config import (
+    CREDIT_PACKS,
+    PAYMENT_APPLY_BATCH_SIZE,
+    PAYMENT_APPLY_INTERVAL_SECONDS,
+)
+from backend.credits.models import CreditBalance, CreditTransaction
+from backend.database import SessionLocal
+from backend.payments.lemonsqueezy import LemonSqueezyProvider
+from backend.payments.models import PaymentEvent
+from backend.users.models import User
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = {
+    LemonSqueezyProvider.name: LemonSqueezyProvider,
+}
+
+_wakeup = threading.Event()
+
+
+# -------------------------------
+# INGESTION (webhook path)
+# -------------------------------
+def record_event(db: Session, *, provider: str, event: dict) -> bool:
+    """
+    Stores a verified event. Returns False if it was already stored.
+    """
+    stmt = (
+        insert(PaymentEvent)
+        .values(
+            provider=provider,
+            event_id=event["event_id"],
+            event_name=event["event_name"],
+            payload=event["payload"],
+            status="pending",
+        )
+        .on_conflict_do_nothing(constraint="uq_payment_events_provider_event")
+        .returning(PaymentEvent.id)
+    )
+    inserted = db.execute(stmt).first() is not None
+    db.commit()
+
+    if inserted:
+        _wakeup.set()
+    return inserted
+
+
+# -------------------------------
+# APPLICATION (worker)
+# -------------------------------
+def _parse_purchase(provider, payload: dict) -> tuple[uuid.UUID, str] | None:
+    purchase = provider.purchase(payload)
+    if purchase is None:
+        return None
+    try:
+        return uuid.UUID(purchase[0]), purchase[1]
+    except ValueError:
+        return None
+
+
+def apply_pending_events(db: Session, batch_size: int = PAYMENT_APPLY_BATCH_SIZE) -> int:
+    """
+    Applies one batch of pending events in a single transaction.
+    Returns the number of events processed.
+    """
+    events = (
+        db.query(PaymentEvent)
+        .filter(PaymentEvent.status == "pending")
+        .order_by(PaymentEvent.received_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not events:
+        db.rollback()
+        return 0
+
+    now = datetime.now(timezone.utc)
+    totals = defaultdict(int)
+    ledger = []
+
+    purchases = {}
+    for event in events:
+        provider = PROVIDERS.get(event.provider)
+        if provider is not None and event.event_name in provider.CREDIT_EVENTS:
+            purchases[event.id] = _parse_purchase(provider, event.payload)
+
+    # One unknown user would fail the whole batch on the foreign key
+    candidates = {p[0] for p in purchases.values() if p is not None}
+    known = {
+        row.id for row in db.query(User.id).filter(User.id.in_(candidates))
+    } if candidates else set()
+
+    for event in events:
+        event.applied_at = now
+
+        if event.id not in purchases:
+            event.status = "ignored"
+            continue
+
+        purchase = purchases[event.id]
+        if purchase is None or purchase[1] not in CREDIT_PACKS:
+            event.status = "failed"
+            event.error = "Missing user or unknown credit pack"
+            continue
+
+        if purchase[0] not in known:
+            event.status = "failed"
+            event.error = "Unknown user"
+            continue
+
+        user_id, pack_id = purchase
+        credits = CREDIT_PACKS[pack_id]["credits"]
+        totals[user_id] += credits
+        ledger.append({
+            "user_id": user_id,
+            "job_id": None,
+            "amount": credits,
+            "type": "purchase",
+            "reason": f"{event.provider}_{pack_id}",
+        })
+        event.status = "applied"
+
+    if ledger:
+        db.bulk_insert_mappings(CreditTransaction, ledger)
+
+        # balance = balance + n, created if missing; no read-modify-write
+        stmt = insert(CreditBalance).values([
+            {"user_id": user_id, "balance": amount}
+            for user_id, amount in sorted(totals.items())  # stable lock order
+        ])
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CreditBalance.user_id],
+                set_={"balance": CreditBalance.balance + stmt.excluded.balance},
+            )
+        )
+
+    db.commit()
+    return len(events)
+
+
+def run_apply_pass():
+    db = SessionLocal()
+    try:
+        while apply_pending_events(db) == PAYMENT_APPLY_BATCH_SIZE:
+            pass
+    finally:
+        db.close()
+
+
+def start_payment_worker() -> threading.Thread:
+    """
+    Starts the credit application loop as a daemon thread. It runs every
+    PAYMENT_APPLY_INTERVAL_SECONDS, or sooner when a webhook arrives.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            _wakeup.wait(PAYMENT_APPLY_INTERVAL_SECONDS)
+            _wakeup.clear()
+            try:
+                run_apply_pass()
+            except Exception:
+                logger.exception("Payment event pass failed")
+
+    thread = threading.Thread(target=loop, name="payment-events", daemon=True)
+    thread.stop = stop
+    thread.start()
+    return thread
@@ -1,4 +1,17 @@
-class LemonSqueezyProvider:
+import hashlib
+import hmac
+import json
+
+from backend.config import LEMONSQUEEZY_WEBHOOK_SECRET
+from backend.payments.service import PaymentProvider
+
+
+class LemonSqueezyProvider(PaymentProvider):
+    name = "lemonsqueezy"
+
+    def __init__(self, webhook_secret: str = LEMONSQUEEZY_WEBHOOK_SECRET):
+        self.webhook_secret = webhook_secret
+
     def create_checkout(self, *, user_id: str, pack_id: str) -> dict:
         # v1: return hosted checkout URL created on LemonSqueezy dashboard
         return {
@@ -6,5 +19,53 @@ class LemonSqueezyProvider:
         }
 
     def verify_webhook(self, payload: bytes, headers: dict) -> dict:
-        # v1: validate signature (we’ll wire real validation next)
-        return {"status": "paid"}
+        """
+        Checks the X-Signature HMAC (SHA-256 of the raw body) and returns
+        {"event_id", "event_name", "payload"}. Raises ValueError when the
+        signature or body is invalid.
+        """
+        if not self.webhook_secret:
+            raise ValueError("Webhook secret not configured")
+
+        expected = hmac.new(self.webhook_secret.encode("utf-8"), payload, hashlib.sha256).hexdigest()
+        signature = headers.get("x-signature", "")
+        if not hmac.compare_digest(expected, signature):
+            raise ValueError("Invalid webhook signature")
+
+        try:
+            body = json.loads(payload)
+        except ValueError as e:
+            raise ValueError("Invalid webhook body") from e
+
+        meta = body.get("meta") or {}
+        event_name = meta.get("event_name") or headers.get("x-event-name") or "unknown"
+
+        # Retries resend the same body; the object id + event name
+        # identifies the event (body hash as a last resort)
+        object_id = (body.get("data") or {}).get("id")
+        if object_id:
+            event_id = f"{event_name}:{object_id}"
+        else:
+            event_id = hashlib.sha256(payload).hexdigest()
+
+        return {
+            "event_id": event_id,
+            "event_name": event_name,
+            "payload": body,
+        }
+
+    # Events that add credits; everything else is stored and ignored
+    CREDIT_EVENTS = ("order_created",)
+
+    @staticmethod
+    def purchase(payload: dict) -> tuple[str, str] | None:
+        """
+        (user_id, pack_id) from an order event, or None if missing.
+        """
+        meta = payload.get("meta") or {}
+        custom = meta.get("custom_data") or {}
+        user_id = meta.get("user_id") or custom.get("user_id")
+        pack_id = meta.get("pack_id") or custom.get("pack_id")
+        if not user_id or not pack_id:
+            return None
+        return str(user_id), str(pack_id)
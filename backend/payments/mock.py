@@ -1,3 +1,5 @@
+import uuid
+
 from sqlalchemy.orm import Session
 
 from backend.credits.service import get_or_create_balance
@@ -8,7 +10,7 @@ from backend.config import CREDIT_PACKS
 def mock_purchase_credits(
     *,
     db: Session,
-    user_id: str,
+    user_id: uuid.UUID,
     pack_id: str,
 ):
     if pack_id not in CREDIT_PACKS:
@@ -0,0 +1,32 @@
+import uuid
+from sqlalchemy import Column, String, DateTime, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.sql import func
+
+from backend.database import Base
+
+
+class PaymentEvent(Base):
+    """
+    Raw provider webhook, stored once per provider event id.
+    Credits are applied from here by the payment event worker.
+    """
+    __tablename__ = "payment_events"
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_payment_events_provider_event"),
+        Index("ix_payment_events_status_received", "status", "received_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    provider = Column(String, nullable=False)  # e.g. "lemonsqueezy"
+    event_id = Column(String, nullable=False)
+    event_name = Column(String, nullable=False)
+
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+
+    status = Column(String, nullable=False, default="pending")  # pending | applied | ignored | failed
+    error = Column(String, nullable=True)
+
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    applied_at = Column(DateTime(timezone=True), nullable=True)
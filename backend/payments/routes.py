@@ -21,6 +21,6 @@ def mock_checkout(
 
     return mock_purchase_credits(
         db=db,
-        user_id=str(current_user.id),
+        user_id=current_user.id,
         pack_id=pack_id,
     )
@@ -1,35 +1,37 @@
-from fastapi import APIRouter, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 
-from backend.database import get_db
-from backend.credits.service import get_or_create_balance
-from backend.credits.models import CreditTransaction
-from backend.config import CREDIT_PACKS
+from backend.database import SessionLocal
+from backend.payments.events import record_event
+from backend.payments.lemonsqueezy import LemonSqueezyProvider
 
 router = APIRouter(prefix="/webhooks", tags=["payments"])
 
+lemonsqueezy = LemonSqueezyProvider()
 
-@router.post("/lemonsqueezy")
-async def lemonsqueezy_webhook(request: Request, db: Session = Depends(get_db)):
-    payload = await request.json()
-
-    user_id = payload["meta"]["user_id"]
-    pack_id = payload["meta"]["pack_id"]
-
-    credits = CREDIT_PACKS[pack_id]["credits"]
 
-    balance = get_or_create_balance(db, user_id)
-    balance.balance += credits
+def _store(provider: str, event: dict) -> bool:
+    db = SessionLocal()
+    try:
+        return record_event(db, provider=provider, event=event)
+    finally:
+        db.close()
 
-    txn = CreditTransaction(
-        user_id=user_id,
-        job_id=None,
-        amount=credits,
-        type="purchase",
-        reason=f"lemonsqueezy_{pack_id}",
-    )
 
-    db.add(txn)
-    db.commit()
-
-    return {"status": "ok"}
+@router.post("/lemonsqueezy")
+async def lemonsqueezy_webhook(request: Request):
+    """
+    Verifies and stores the event, then acks. Credits are applied by the
+    payment event worker; redeliveries of a stored event are no-ops.
+    """
+    payload = await request.body()
+
+    try:
+        event = lemonsqueezy.verify_webhook(payload, dict(request.headers))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Sync DB session → off the event loop
+    inserted = await run_in_threadpool(_store, lemonsqueezy.name, event)
+
+    return {"status": "ok", "duplicate": not inserted}
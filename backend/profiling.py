@@ -0,0 +1,334 @@
+"""
+On-demand job profiling.
+
+A job with Job.profile set (an admin submitted it with "profile": true,
+or flagged it while queued) runs under a JobProfiler:
+
+- a sampling profiler: a daemon thread snapshots the stacks of the job's
+  threads every PROFILE_SAMPLE_INTERVAL_SECONDS (wall clock, so waits
+  show up too). Threads count as the job's if they are the executor
+  thread or are running engine code (backend.engines.*).
+- tracemalloc: peak traced memory for each stage() block (sampled on
+  the same tick), plus the top allocation sites at the end of the run. Only allocations made through
+  Python's allocator are seen (numpy arrays are; Pillow's and ffmpeg's
+  buffers aren't).
+
+Artifacts are published under the job's output dir in PROFILE_DIR, which
+the user-facing job routes never list or serve:
+
+    profile.collapsed   folded stacks ("a;b;c <count>"), for flamegraph.pl,
+                        speedscope, inferno, ...
+    profile.svg         flame graph rendered from the same samples
+    memory.json         per-stage peaks and top allocation sites
+
+tracemalloc is process-wide and slows every thread while it runs, so
+only one job per process is profiled at a time; a second profiled job
+runs normally and logs a warning.
+"""
+import functools
+import hashlib
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from backend.config import (
+    PROFILE_MAX_STACK_DEPTH,
+    PROFILE_SAMPLE_INTERVAL_SECONDS,
+    PROFILE_TOP_ALLOCATIONS,
+)
+from backend.storage.backends import get_storage, job_key
+
+logger = logging.getLogger(__name__)
+
+# Subdirectory of a job's output dir holding profile artifacts (admin-only)
+PROFILE_DIR = "_profile"
+
+ENGINE_MODULE_PREFIX = "backend.engines"
+
+_active = None
+_active_lock = threading.Lock()
+
+
+# -------------------------------
+# PROFILER
+# -------------------------------
+class JobProfiler:
+    def __init__(self, job_id: str, interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.job_id = job_id
+        self.interval = interval
+        self.samples = Counter()  # folded stack -> sample count
+        self.sample_count = 0
+        self.stages = {}  # name -> {"calls", "seconds", "start_bytes", "peak_bytes", "end_bytes"}
+        self.peak_bytes = 0
+        self.top_allocations = []
+
+        self._open_stages = {}  # id -> (name, started, start_bytes, peak_bytes)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._owner = None
+        self._started_tracemalloc = False
+        self._started = None
+        self._seconds = 0.0
+
+    def start(self) -> bool:
+        """
+        Starts profiling from the calling (executor) thread.
+        Returns False if another job in this process is being profiled.
+        """
+        global _active
+
+        with _active_lock:
+            if _active is not None:
+                logger.warning("Job %s not profiled: job %s already is", self.job_id, _active.job_id)
+                return False
+            _active = self
+
+        self._owner = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()  # one frame per trace: enough for per-line totals
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.job_id}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        global _active
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._seconds = time.monotonic() - self._started
+
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        self.top_allocations = self._top_allocations()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        with _active_lock:
+            if _active is self:
+                _active = None
+
+    # -------------------------------
+    # SAMPLING
+    # -------------------------------
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self._fold(frame)
+                if ident == self._owner or any(module.startswith(ENGINE_MODULE_PREFIX) for module, _ in stack):
+                    thread = names.get(ident, str(ident)).rsplit("_", 1)[0]  # pool threads share a row
+                    folded = ";".join([thread] + [f"{module}:{name}" for module, name in reversed(stack)])
+                    self.samples[folded] += 1
+            self.sample_count += 1
+
+            current = tracemalloc.get_traced_memory()[0]
+            with self._lock:
+                for key, (name, started, start_bytes, peak) in self._open_stages.items():
+                    if current > peak:
+                        self._open_stages[key] = (name, started, start_bytes, current)
+
+    @staticmethod
+    def _fold(frame) -> list:
+        """
+        [(module, function), ...] from the innermost frame outwards.
+        """
+        stack = []
+        while frame is not None and len(stack) < PROFILE_MAX_STACK_DEPTH:
+            stack.append((frame.f_globals.get("__name__", "?"), frame.f_code.co_name))
+            frame = frame.f_back
+        return stack
+
+    # -------------------------------
+    # MEMORY
+    # -------------------------------
+    @contextmanager
+    def stage(self, name: str):
+        key = object()
+        current = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self._open_stages[key] = (name, time.monotonic(), current, current)
+        try:
+            yield
+        finally:
+            end_bytes = tracemalloc.get_traced_memory()[0]
+            with self._lock:
+                _, started, start_bytes, peak = self._open_stages.pop(key)
+                totals = self.stages.setdefault(
+                    name,
+                    {"calls": 0, "seconds": 0.0, "start_bytes": start_bytes, "peak_bytes": 0, "end_bytes": 0},
+                )
+                totals["calls"] += 1
+                totals["seconds"] += time.monotonic() - started
+                totals["peak_bytes"] = max(totals["peak_bytes"], peak, end_bytes)
+                totals["end_bytes"] = end_bytes
+
+    def _top_allocations(self) -> list:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),  # the profiler's own samples
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        return [
+            {
+                "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size,
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+        ]
+
+    # -------------------------------
+    # ARTIFACTS
+    # -------------------------------
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def memory_report(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "seconds": round(self._seconds, 3),
+            "sample_interval_seconds": self.interval,
+            "samples": self.sample_count,
+            "peak_bytes": self.peak_bytes,
+            "stages": [{"stage": name, **totals} for name, totals in self.stages.items()],
+            "top_allocations": self.top_allocations,
+        }
+
+    def write(self, directory: Path) -> list:
+        directory.mkdir(parents=True, exist_ok=True)
+        files = {
+            "profile.collapsed": self.collapsed(),
+            "profile.svg": render_flamegraph(self.samples, title=f"Job {self.job_id}"),
+            "memory.json": json.dumps(self.memory_report(), indent=2),
+        }
+        paths = []
+        for name, content in files.items():
+            path = directory / name
+            path.write_text(content, encoding="utf-8")
+            paths.append(path)
+        return paths
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Records tracemalloc peak memory for the block under the active job
+    profiler. A no-op when no job is being profiled.
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def profiled_stage(name: str):
+    """
+    Decorator form of stage().
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def publish_profile(profiler: JobProfiler, output_dir: str | Path) -> list:
+    """
+    Writes the profiler's artifacts to output storage under
+    <output_dir>/PROFILE_DIR. Returns their relative paths.
+    """
+    storage = get_storage()
+    published = []
+    with tempfile.TemporaryDirectory(prefix="profile-") as tmp:
+        for path in profiler.write(Path(tmp)):
+            rel_path = f"{PROFILE_DIR}/{path.name}"
+            storage.put_file(job_key(output_dir, rel_path), path)
+            published.append(rel_path)
+    return published
+
+
+# -------------------------------
+# FLAME GRAPH
+# -------------------------------
+FRAME_HEIGHT = 16
+GRAPH_WIDTH = 1200
+MIN_LABEL_WIDTH = 30
+
+
+def _frame_color(name: str) -> str:
+    digest = hashlib.md5(name.encode("utf-8")).digest()
+    return f"rgb({205 + digest[0] % 50},{digest[1] % 230},{digest[2] % 55})"
+
+
+def render_flamegraph(samples: Counter, title: str = "Flame graph") -> str:
+    """
+    A static SVG flame graph (root at the bottom, width = share of
+    samples) from folded stacks. Hover a frame for its sample count.
+    """
+    root = {"children": {}, "value": 0}
+    for folded, count in samples.items():
+        node = root
+        node["value"] += count
+        for name in folded.split(";"):
+            node = node["children"].setdefault(name, {"children": {}, "value": 0})
+            node["value"] += count
+
+    total = root["value"] or 1
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    levels = depth(root) - 1
+    height = (levels + 3) * FRAME_HEIGHT
+    rects = []
+
+    def layout(node, x: float, level: int):
+        for name, child in sorted(node["children"].items()):
+            width = child["value"] / total * GRAPH_WIDTH
+            y = height - (level + 2) * FRAME_HEIGHT
+            label = escape(name)
+            tooltip = f"{label} ({child['value']} samples, {child['value'] / total:.1%})"
+            text = ""
+            if width >= MIN_LABEL_WIDTH:
+                chars = int(width / 7)
+                shown = name if len(name) <= chars else name[: max(chars - 2, 1)] + ".."
+                text = f'<text x="{x + 3:.1f}" y="{y + 11.5:.1f}">{escape(shown)}</text>'
+            rects.append(
+                f'<g><title>{tooltip}</title>'
+                f'<rect x="{x:.1f}" y="{y:.1f}" width="{max(width - 0.5, 0.1):.1f}" '
+                f'height="{FRAME_HEIGHT - 1}" fill="{_frame_color(name)}"/>{text}</g>'
+            )
+            layout(child, x, level + 1)
+            x += width
+
+    layout(root, 0.0, 0)
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{GRAPH_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<rect width="100%" height="100%" fill="#fafafa"/>'
+        f'<text x="{GRAPH_WIDTH / 2}" y="14" text-anchor="middle" font-size="13">'
+        f'{escape(title)} ({total} samples)</text>'
+        + "".join(rects)
+        + "</svg>\n"
+    )
@@ -0,0 +1,426 @@
+"""
+API rate limiting.
+
+Every request is checked against each matching policy (below) before it
+reaches a route. A policy allows <limit> requests per <window> seconds
+for one client, keyed by:
+
+    ip      the client address
+    user    the bearer token's user, or the address without a valid token
+    email   the address a login link is requested for
+
+Counts are sliding windows approximated from two fixed buckets (the
+previous window's count weighted by how much of it still overlaps, plus
+the current one), so a check is a dict lookup and a little arithmetic
+under a lock: no database round trip. A request over any limit gets
+429 with Retry-After and is not counted.
+
+Counters live in each API process. With RATE_LIMIT_SYNC=1, a background
+thread pushes new hits to rate_limit_counters every
+RATE_LIMIT_SYNC_INTERVAL_SECONDS and reads back the totals of every key
+this process checked since the last sync (hit or not), adding what other
+replicas counted to the local view.
+
+A replica's view of the others is one sync behind, and a key it hasn't
+checked for a while is only refreshed on the sync after its next check.
+So a client that spreads a burst over N replicas can get up to N times a
+limit through within one sync interval; past that, each replica sees the
+others' counts and the shared limit holds.
+"""
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+
+import jwt
+from sqlalchemy import text
+
+from backend.auth.jwt import ALGORITHM
+from backend.database import engine
+from backend.config import (
+    RATE_LIMIT_AUTH_CALLBACK,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_JOB_FILES,
+    RATE_LIMIT_JOB_READ,
+    RATE_LIMIT_JOB_SUBMIT,
+    RATE_LIMIT_LOGIN,
+    RATE_LIMIT_LOGIN_EMAIL,
+    RATE_LIMIT_SYNC,
+    RATE_LIMIT_SYNC_INTERVAL_SECONDS,
+    RATE_LIMIT_TRUST_FORWARDED_FOR,
+    RATE_LIMIT_UPLOAD,
+    SECRET_KEY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Health checks and signed provider webhooks are never limited
+EXEMPT_PATH_PREFIXES = ("/health", "/webhooks/")
+
+# Output downloads (HLS segments, bundles) get their own, higher limit
+JOB_FILE_PATH = r"^/jobs/[^/]+/(files/|download$|bundle$)"
+
+# Past this many tracked keys, stale ones are dropped on the next hit
+MAX_TRACKED_KEYS = 100_000
+SYNC_BATCH_SIZE = 1000
+
+
+def parse_limit(spec: str) -> tuple:
+    """
+    "10/60" -> (10, 60): 10 requests per 60 seconds.
+    """
+    try:
+        limit, window = (int(part) for part in spec.split("/", 1))
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {spec!r}: expected <requests>/<seconds>")
+    if limit <= 0 or window <= 0:
+        raise ValueError(f"Invalid rate limit {spec!r}: both parts must be positive")
+    return limit, window
+
+
+# -------------------------------
+# POLICIES
+# -------------------------------
+class Policy:
+    def __init__(
+        self,
+        name: str,
+        spec: str,
+        *,
+        key: str,
+        methods: tuple = (),
+        path: str | None = None,
+        exclude: str | None = None,
+    ):
+        self.name = name
+        self.limit, self.window = parse_limit(spec)
+        self.key = key
+        self.methods = methods
+        self.path = re.compile(path) if path else None
+        self.exclude = re.compile(exclude) if exclude else None
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        if self.exclude is not None and self.exclude.match(path):
+            return False
+        return self.path is None or self.path.match(path) is not None
+
+
+POLICIES = [
+    Policy("login", RATE_LIMIT_LOGIN, key="ip", methods=("POST",), path=r"^/auth/login$"),
+    Policy("login_email", RATE_LIMIT_LOGIN_EMAIL, key="email", methods=("POST",), path=r"^/auth/login$"),
+    Policy("auth_callback", RATE_LIMIT_AUTH_CALLBACK, key="ip", methods=("GET",), path=r"^/auth/callback$"),
+    Policy("job_submit", RATE_LIMIT_JOB_SUBMIT, key="user", methods=("POST",), path=r"^/jobs/(batch)?$"),
+    Policy("upload", RATE_LIMIT_UPLOAD, key="user", methods=("POST",), path=r"^/uploads/?$"),
+    Policy("job_read", RATE_LIMIT_JOB_READ, key="user", methods=("GET", "HEAD"), path=r"^/jobs/",
+           exclude=JOB_FILE_PATH),
+    Policy("job_files", RATE_LIMIT_JOB_FILES, key="user", methods=("GET", "HEAD"), path=JOB_FILE_PATH),
+    Policy("default", RATE_LIMIT_DEFAULT, key="user", exclude=JOB_FILE_PATH),
+]
+
+
+def client_ip(request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            # The proxy appends the address it saw; earlier entries are client-supplied
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def token_user(request) -> str | None:
+    """
+    The user id of a valid bearer token (signature checked, no DB lookup).
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    if payload.get("typ") == "magic_link":
+        return None
+    return payload.get("sub")
+
+
+def _client_key(policy: Policy, request) -> str | None:
+    if policy.key == "email":
+        email = request.query_params.get("email", "").strip().lower()
+        if not email:
+            return None
+        # Shared counters shouldn't hold addresses in clear
+        return "email:" + hashlib.sha256(email.encode("utf-8")).hexdigest()[:32]
+
+    if policy.key == "user":
+        user_id = token_user(request)
+        if user_id:
+            return f"user:{user_id}"
+
+    return f"ip:{client_ip(request)}"
+
+
+# -------------------------------
+# COUNTERS
+# -------------------------------
+class _Window:
+    __slots__ = ("window", "bucket", "prev", "cur", "remote_prev", "remote_cur")
+
+    def __init__(self, window: int, bucket: int):
+        self.window = window
+        self.bucket = bucket
+        self.prev = self.cur = 0
+        self.remote_prev = self.remote_cur = 0  # other replicas' counts (synced)
+
+    def roll(self, bucket: int):
+        if bucket == self.bucket:
+            return
+        if bucket == self.bucket + 1:
+            self.prev, self.remote_prev = self.cur, self.remote_cur
+        else:
+            self.prev = self.remote_prev = 0
+        self.cur = self.remote_cur = 0
+        self.bucket = bucket
+
+    def retry_after(self, limit: int, now: float) -> float:
+        """
+        0 if one more request fits, else seconds until it does.
+        """
+        elapsed = now / self.window - self.bucket  # fraction of the current bucket
+        prev = self.prev + self.remote_prev
+        cur = self.cur + self.remote_cur
+
+        if prev * (1 - elapsed) + cur + 1 <= limit:
+            return 0.0
+        if cur + 1 <= limit:
+            # Wait for the previous bucket's weight to decay enough
+            needed = 1 - (limit - cur - 1) / prev
+            return (needed - elapsed) * self.window
+        # Into the next bucket, until this one's weight has decayed enough
+        needed = 1 - (limit - 1) / cur
+        return (1 - elapsed + needed) * self.window
+
+
+class RateLimiter:
+    def __init__(self):
+        self._windows = {}  # key -> _Window
+        self._pending = {}  # (key, window_start) -> hits not yet synced
+        self._checked = set()  # (key, window_start) to refresh on the next sync
+        self._lock = threading.Lock()
+        self._prune_at = MAX_TRACKED_KEYS
+
+    def hit(self, checks: list, now: float | None = None) -> tuple | None:
+        """
+        checks: [(key, limit, window), ...], all counted or none.
+        Returns None if allowed, else (retry_after, index of the check
+        with the longest wait).
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            windows = []
+            denied = None
+            for index, (key, limit, window) in enumerate(checks):
+                bucket = int(now // window)
+                entry = self._windows.get(key)
+                if entry is None:
+                    entry = self._windows[key] = _Window(window, bucket)
+                entry.roll(bucket)
+                windows.append(entry)
+                if RATE_LIMIT_SYNC:
+                    self._checked.add((key, bucket * window))
+                    self._checked.add((key, (bucket - 1) * window))
+
+                wait = entry.retry_after(limit, now)
+                if wait > 0 and (denied is None or wait > denied[0]):
+                    denied = (wait, index)
+
+            if denied is not None:
+                return denied
+
+            for (key, _, window), entry in zip(checks, windows):
+                entry.cur += 1
+                if RATE_LIMIT_SYNC:
+                    pending_key = (key, entry.bucket * window)
+                    self._pending[pending_key] = self._pending.get(pending_key, 0) + 1
+
+            if len(self._windows) > self._prune_at:
+                self._prune(now)
+        return None
+
+    def _prune(self, now: float):
+        stale = [
+            key for key, entry in self._windows.items()
+            if entry.bucket < int(now // entry.window) - 1
+        ]
+        for key in stale:
+            del self._windows[key]
+        # Everything live: don't rescan on every hit
+        self._prune_at = max(MAX_TRACKED_KEYS, 2 * len(self._windows))
+
+    # -------------------------------
+    # SYNC (across replicas)
+    # -------------------------------
+    def take_pending(self) -> tuple:
+        """
+        Returns (hits not yet synced, other checked buckets whose totals
+        should be refreshed) and starts a new sync interval.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            checked, self._checked = self._checked, set()
+        return pending, checked - pending.keys()
+
+    def apply_totals(self, totals: dict):
+        """
+        totals: (key, window_start) -> count over all replicas. Whatever
+        this process didn't count itself was counted elsewhere.
+        """
+        with self._lock:
+            for (key, window_start), total in totals.items():
+                entry = self._windows.get(key)
+                if entry is None:
+                    continue
+                bucket = window_start // entry.window
+                if bucket == entry.bucket:
+                    entry.remote_cur = max(total - entry.cur, 0)
+                elif bucket == entry.bucket - 1:
+                    entry.remote_prev = max(total - entry.prev, 0)
+
+
+limiter = RateLimiter()
+
+
+def check_request(request) -> dict | None:
+    """
+    Counts the request against its policies. Returns None if it may
+    proceed, else {"policy", "limit", "window", "retry_after"} for the
+    429 response.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+
+    path = request.url.path
+    if path.startswith(EXEMPT_PATH_PREFIXES):
+        return None
+
+    method = request.method
+    checks = []
+    policies = []
+    for policy in POLICIES:
+        if not policy.matches(method, path):
+            continue
+        client = _client_key(policy, request)
+        if client is None:
+            continue
+        checks.append((f"{policy.name}:{client}", policy.limit, policy.window))
+        policies.append(policy)
+
+    denied = limiter.hit(checks)
+    if denied is None:
+        return None
+
+    wait, index = denied
+    policy = policies[index]
+    return {
+        "policy": policy.name,
+        "limit": policy.limit,
+        "window": policy.window,
+        "retry_after": max(math.ceil(wait), 1),
+    }
+
+
+# -------------------------------
+# POSTGRES SYNC
+# -------------------------------
+_UPSERT_SQL = text(
+    "INSERT INTO rate_limit_counters (key, window_start, count, expires_at) "
+    "SELECT * FROM unnest("
+    "CAST(:keys AS VARCHAR[]), CAST(:starts AS BIGINT[]), "
+    "CAST(:counts AS INTEGER[]), CAST(:expires AS BIGINT[])) "
+    "ON CONFLICT (key, window_start) "
+    "DO UPDATE SET count = rate_limit_counters.count + EXCLUDED.count "
+    "RETURNING key, window_start, count"
+)
+
+_TOTALS_SQL = text(
+    "SELECT c.key, c.window_start, c.count FROM rate_limit_counters c "
+    "JOIN unnest(CAST(:keys AS VARCHAR[]), CAST(:starts AS BIGINT[])) AS k (key, window_start) "
+    "ON c.key = k.key AND c.window_start = k.window_start"
+)
+
+_PURGE_SQL = text("DELETE FROM rate_limit_counters WHERE expires_at < :now")
+
+_WINDOWS = {policy.name: policy.window for policy in POLICIES}
+
+
+def sync_counters(rate_limiter: RateLimiter = limiter):
+    """
+    One sync pass: adds this process's new hits to the shared counters
+    and takes back the totals, for those and for the other buckets this
+    process checked.
+    """
+    pending, checked = rate_limiter.take_pending()
+    if not pending and not checked:
+        return
+
+    items = list(pending.items())
+    # No row yet means no replica has counted the bucket
+    totals = dict.fromkeys(checked, 0)
+    with engine.begin() as conn:
+        for offset in range(0, len(items), SYNC_BATCH_SIZE):
+            batch = items[offset:offset + SYNC_BATCH_SIZE]
+            # A row is needed until its bucket stops being the previous one
+            expires = [
+                start + 2 * _WINDOWS[key.split(":", 1)[0]]
+                for (key, start), _ in batch
+            ]
+            rows = conn.execute(_UPSERT_SQL, {
+                "keys": [key for (key, _), _ in batch],
+                "starts": [start for (_, start), _ in batch],
+                "counts": [count for _, count in batch],
+                "expires": expires,
+            })
+            for key, window_start, count in rows:
+                totals[(key, window_start)] = count
+
+        checked = list(checked)
+        for offset in range(0, len(checked), SYNC_BATCH_SIZE):
+            batch = checked[offset:offset + SYNC_BATCH_SIZE]
+            rows = conn.execute(_TOTALS_SQL, {
+                "keys": [key for key, _ in batch],
+                "starts": [start for _, start in batch],
+            })
+            for key, window_start, count in rows:
+                totals[(key, window_start)] = count
+
+        conn.execute(_PURGE_SQL, {"now": int(time.time())})
+
+    rate_limiter.apply_totals(totals)
+
+
+def start_rate_limit_sync() -> threading.Thread | None:
+    """
+    Starts the counter sync loop as a daemon thread (if RATE_LIMIT_SYNC).
+    """
+    if not (RATE_LIMIT_ENABLED and RATE_LIMIT_SYNC):
+        return None
+
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(RATE_LIMIT_SYNC_INTERVAL_SECONDS):
+            try:
+                sync_counters()
+            except Exception:
+                # Hits in this pass stay local; limits still hold per replica
+                logger.warning("Rate limit sync failed", exc_info=True)
+
+    thread = threading.Thread(target=loop, name="rate-limit-sync", daemon=True)
+    thread.stop = stop
+    thread.start()
+    return thread
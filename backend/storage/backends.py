@@ -0,0 +1,318 @@
+"""
+Output storage backends.
+
+Engines produce files in a local scratch directory (the job's output_dir)
+and publish final artifacts to the configured backend. The API lists and
+serves outputs through the same backend, so any node can serve any job.
+
+Keys are POSIX paths such as "outputs/<uuid>/reel_01/final_video.mp4".
+
+put_file records each object's CRC32 alongside it, so ZIP bundles can
+write their central directory without re-reading every entry.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from backend.config import (
+    OUTPUT_STORAGE_BACKEND,
+    OUTPUT_STORAGE_ROOT,
+    S3_BUCKET,
+    S3_ENDPOINT_URL,
+    S3_MULTIPART_CHUNK_BYTES,
+    S3_REGION,
+)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_crc32(path: Path) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def put_file(self, key: str, local_path: Path):
+        """Uploads a local file, streaming it in chunks, and records its CRC32."""
+
+    @abstractmethod
+    def list(self, prefix: str) -> list[str]:
+        """Returns keys under prefix, relative to prefix."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        pass
+
+    def crc32(self, key: str) -> int | None:
+        """
+        The CRC32 recorded when the object was put, or None if there is
+        none (or it no longer matches the object).
+        """
+        return None
+
+    @abstractmethod
+    def iter_bytes(self, key: str, start: int = 0, chunk_size: int = CHUNK_SIZE):
+        """Yields the object's content from byte offset start."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        pass
+
+    def local_path(self, key: str) -> Path | None:
+        """
+        Returns a local filesystem path for the key, if there is one.
+        Lets the API hand files straight to FileResponse (sendfile).
+        """
+        return None
+
+
+# -------------------------------
+# LOCAL FILESYSTEM
+# -------------------------------
+CRC_SUFFIX = ".crc32"
+
+
+class LocalStorage(StorageBackend):
+    """
+    Each object's CRC32 lives in a hidden sidecar (".<name>.crc32") with
+    the size and mtime it was computed for, so a file rewritten in place
+    is never bundled with a stale checksum.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _crc_path(self, key: str) -> Path:
+        path = self._path(key)
+        return path.with_name(f".{path.name}{CRC_SUFFIX}")
+
+    def put_file(self, key: str, local_path: Path):
+        target = self._path(key)
+        if target.resolve() == Path(local_path).resolve():
+            # Scratch dir is the storage dir → already in place, just checksum it
+            self._write_crc(key, file_crc32(target))
+            return
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".put-")
+        crc = 0
+        with os.fdopen(fd, "wb") as dst, open(local_path, "rb") as src:
+            while chunk := src.read(CHUNK_SIZE):
+                crc = zlib.crc32(chunk, crc)
+                dst.write(chunk)
+        os.replace(tmp_name, target)
+        self._write_crc(key, crc)
+
+    def _write_crc(self, key: str, crc: int):
+        stat = self._path(key).stat()
+        crc_path = self._crc_path(key)
+        tmp_path = crc_path.with_name(crc_path.name + ".tmp")
+        tmp_path.write_text(f"{stat.st_size} {stat.st_mtime_ns} {crc:08x}", encoding="ascii")
+        os.replace(tmp_path, crc_path)
+
+    def crc32(self, key: str) -> int | None:
+        try:
+            size, mtime_ns, crc = self._crc_path(key).read_text(encoding="ascii").split()
+            stat = self._path(key).stat()
+        except (OSError, ValueError):
+            return None
+        if (int(size), int(mtime_ns)) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return int(crc, 16)
+
+    def list(self, prefix: str) -> list[str]:
+        base = self._path(prefix)
+        if not base.exists():
+            return []
+
+        keys = []
+        for root, _, files in os.walk(base):
+            for file in files:
+                if file.startswith(".") and file.endswith(CRC_SUFFIX):
+                    continue
+                full_path = os.path.join(root, file)
+                keys.append(Path(os.path.relpath(full_path, base)).as_posix())
+        return keys
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def iter_bytes(self, key: str, start: int = 0, chunk_size: int = CHUNK_SIZE):
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def delete_prefix(self, prefix: str):
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+    def local_path(self, key: str) -> Path | None:
+        return self._path(key)
+
+
+# -------------------------------
+# S3-COMPATIBLE (AWS S3, MinIO, ...)
+# -------------------------------
+class S3Storage(StorageBackend):
+    def __init__(
+        self,
+        bucket: str,
+        *,
+        endpoint_url: str | None = None,
+        region: str | None = None,
+        multipart_chunk_bytes: int = S3_MULTIPART_CHUNK_BYTES,
+    ):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:
+            raise RuntimeError("boto3 is required for OUTPUT_STORAGE_BACKEND=s3") from e
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_chunk_bytes,
+            multipart_chunksize=multipart_chunk_bytes,
+        )
+
+    def put_file(self, key: str, local_path: Path):
+        # Metadata is part of the object, so it can't go stale on overwrite
+        crc = file_crc32(local_path)
+        # upload_file streams from disk using multipart uploads above the threshold
+        self.client.upload_file(
+            str(local_path),
+            self.bucket,
+            key,
+            ExtraArgs={"Metadata": {"crc32": f"{crc:08x}"}},
+            Config=self.transfer_config,
+        )
+
+    def list(self, prefix: str) -> list[str]:
+        prefix = prefix.rstrip("/") + "/"
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        keys = []
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                keys.append(obj["Key"][len(prefix):])
+        return keys
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+
+    def size(self, key: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+
+    def crc32(self, key: str) -> int | None:
+        metadata = self.client.head_object(Bucket=self.bucket, Key=key).get("Metadata", {})
+        crc = metadata.get("crc32")
+        return int(crc, 16) if crc else None
+
+    def iter_bytes(self, key: str, start: int = 0, chunk_size: int = CHUNK_SIZE):
+        params = {"Bucket": self.bucket, "Key": key}
+        if start:
+            params["Range"] = f"bytes={start}-"
+
+        body = self.client.get_object(**params)["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete_prefix(self, prefix: str):
+        prefix = prefix.rstrip("/") + "/"
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if objects:
+                # list pages are ≤1000 keys, the delete_objects batch limit
+                self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": objects, "Quiet": True},
+                )
+
+
+# -------------------------------
+# BACKEND SELECTION
+# -------------------------------
+_storage = None
+_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    """
+    Returns the process-wide output storage backend.
+    """
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                if OUTPUT_STORAGE_BACKEND == "s3":
+                    _storage = S3Storage(
+                        S3_BUCKET,
+                        endpoint_url=S3_ENDPOINT_URL,
+                        region=S3_REGION,
+                    )
+                elif OUTPUT_STORAGE_BACKEND == "local":
+                    _storage = LocalStorage(OUTPUT_STORAGE_ROOT)
+                else:
+                    raise RuntimeError(
+                        f"Unknown OUTPUT_STORAGE_BACKEND: {OUTPUT_STORAGE_BACKEND}"
+                    )
+    return _storage
+
+
+def job_key(output_dir: str | Path, rel_path: str | Path = "") -> str:
+    """
+    Builds a storage key from a job's output_dir and a relative path.
+    """
+    key = Path(output_dir).as_posix().strip("/")
+    rel = Path(rel_path).as_posix().strip("/") if rel_path else ""
+    if rel and rel != ".":
+        key = f"{key}/{rel}"
+    return key
+
+
+def publish_job_file(output_dir: str | Path, path: Path):
+    """
+    Publishes a file from the job's scratch dir to output storage.
+    """
+    rel_path = Path(path).relative_to(Path(output_dir))
+    get_storage().put_file(job_key(output_dir, rel_path), Path(path))
+
+
+def is_scratch_storage(output_dir: str | Path) -> bool:
+    """
+    True when the job's scratch dir IS its storage location
+    (local backend rooted at the working directory).
+    """
+    storage = get_storage()
+    local = storage.local_path(job_key(output_dir))
+    return local is not None and local.resolve() == Path(output_dir).resolve()
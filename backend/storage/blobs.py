@@ -0,0 +1,112 @@
+"""
+Content-addressed blob store.
+
+Blobs are immutable files named by their SHA-256 digest under
+BLOB_STORE_DIR. Identical content is stored once. Writes go to a temp
+file in the same filesystem and are renamed into place, so readers on any
+node never see a partial blob.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from backend.config import BLOB_STORE_DIR
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobTooLarge(ValueError):
+    """Raised when a streamed blob exceeds its size limit."""
+
+
+def is_valid_digest(digest: str) -> bool:
+    return bool(digest) and bool(_DIGEST_RE.match(digest))
+
+
+def blob_digest(data: bytes) -> str:
+    """
+    The digest put_blob_bytes will store data under.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_path(digest: str) -> Path:
+    """
+    Returns the on-disk path for a blob digest.
+    Fan-out by prefix keeps directories small.
+    """
+    if not is_valid_digest(digest):
+        raise ValueError("Invalid blob digest")
+    return Path(BLOB_STORE_DIR) / "sha256" / digest[:2] / digest[2:4] / digest
+
+
+def blob_exists(digest: str) -> bool:
+    return blob_path(digest).exists()
+
+
+class BlobWriter:
+    """
+    Incremental blob writer.
+
+    Hashes and writes each chunk as it arrives, so callers can stream
+    arbitrarily large content in constant memory. Call commit() to move
+    the blob into place (or drop it if the content already exists), or
+    abort() to discard it.
+    """
+
+    def __init__(self, max_bytes: int | None = None):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+        tmp_dir = Path(BLOB_STORE_DIR) / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_name = tempfile.mkstemp(dir=tmp_dir, prefix="upload-")
+        self._tmp_path = Path(tmp_name)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise BlobTooLarge(f"Blob exceeds {self.max_bytes} bytes")
+
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> tuple[str, bool]:
+        """
+        Finalizes the blob.
+        Returns (digest, deduplicated).
+        """
+        self._file.close()
+        digest = self._hash.hexdigest()
+        target = blob_path(digest)
+
+        if target.exists():
+            self._tmp_path.unlink(missing_ok=True)
+            return digest, True
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._tmp_path, target)
+        return digest, False
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def put_blob_bytes(data: bytes) -> str:
+    """
+    Stores in-memory content and returns its digest.
+    """
+    writer = BlobWriter()
+    try:
+        writer.write(data)
+    except BaseException:
+        writer.abort()
+        raise
+    digest, _ = writer.commit()
+    return digest
@@ -0,0 +1,132 @@
+"""
+Output garbage collector.
+
+Expires finished jobs' outputs after OUTPUT_RETENTION_DAYS. Expired jobs
+keep their row (for history and the credit ledger) but move to status
+"expired" and have their storage prefix deleted.
+
+Also bounds this host's TTS chunk cache (prune_cache_dir), on the API's
+GC loop and on the worker supervisor's.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.jobs.models import Job
+from backend.storage.backends import get_storage
+from backend.config import (
+    OUTPUT_RETENTION_DAYS,
+    STORAGE_GC_INTERVAL_SECONDS,
+    TTS_CACHE_DIR,
+    TTS_CACHE_MAX_AGE_DAYS,
+    TTS_CACHE_MAX_MB,
+)
+
+logger = logging.getLogger(__name__)
+
+GC_BATCH_SIZE = 100
+
+
+def collect_expired_outputs(db: Session, batch_size: int = GC_BATCH_SIZE) -> int:
+    """
+    Deletes outputs of one batch of expired jobs.
+    Returns the number of jobs expired.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=OUTPUT_RETENTION_DAYS)
+
+    jobs = (
+        db.query(Job)
+        .filter(
+            Job.status.in_(("completed", "failed", "cancelled")),
+            Job.updated_at < cutoff,
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)  # replicas split the work
+        .all()
+    )
+
+    storage = get_storage()
+    for job in jobs:
+        storage.delete_prefix(job.output_dir)
+        job.status = "expired"
+
+    db.commit()
+    return len(jobs)
+
+
+def run_gc_pass():
+    db = SessionLocal()
+    try:
+        while collect_expired_outputs(db) == GC_BATCH_SIZE:
+            pass
+    finally:
+        db.close()
+
+
+def prune_cache_dir(root: Path, max_bytes: int, max_age_seconds: float) -> int:
+    """
+    Deletes cache files unused (mtime) for max_age_seconds, then the
+    least recently used until the rest fits in max_bytes.
+    Returns the number of files deleted.
+    """
+    files = []
+    for path in root.rglob("*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if path.is_file():
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    files.sort()  # least recently used first
+    total = sum(size for _, size, _ in files)
+    cutoff = time.time() - max_age_seconds
+
+    deleted = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def run_cache_gc():
+    root = Path(TTS_CACHE_DIR)
+    if root.is_dir():
+        deleted = prune_cache_dir(
+            root,
+            max_bytes=TTS_CACHE_MAX_MB * 1024 * 1024,
+            max_age_seconds=TTS_CACHE_MAX_AGE_DAYS * 86400,
+        )
+        if deleted:
+            logger.info("Evicted %d TTS cache files", deleted)
+
+
+def start_output_gc() -> threading.Thread:
+    """
+    Starts the background GC loop as a daemon thread.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(STORAGE_GC_INTERVAL_SECONDS):
+            try:
+                run_gc_pass()
+            except Exception:
+                logger.exception("Output GC pass failed")
+            try:
+                run_cache_gc()
+            except Exception:
+                logger.exception("TTS cache GC pass failed")
+
+    thread = threading.Thread(target=loop, name="output-gc", daemon=True)
+    thread.stop = stop
+    thread.start()
+    return thread
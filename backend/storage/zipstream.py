@@ -0,0 +1,210 @@
+"""
+Streaming ZIP archives over output storage.
+
+Entries are stored, not deflated. Job outputs are mostly MP4/MP3/PNG/JPG,
+which are already compressed. Storing also makes the archive's exact
+length and byte layout known before any data is read, so the response has
+a Content-Length and a byte range can be served from any offset.
+
+The archive is generated on the fly from storage.iter_bytes, so memory
+stays constant and nothing is staged on disk. CRCs come from storage
+(recorded when each output was published), so a Range request seeks
+straight to its start offset. An entry without a recorded CRC is
+checksummed while it streams, and read just for its CRC if the range
+skips it but still needs the central directory.
+"""
+import hashlib
+import struct
+import zlib
+from datetime import datetime
+
+from backend.storage.backends import StorageBackend
+
+ZIP32_LIMIT = 0xFFFFFFFF
+
+# Bit 3: CRC follows the data (data descriptor); bit 11: UTF-8 names
+_FLAGS = 0x0008 | 0x0800
+_VERSION = 20
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DATA_DESCRIPTOR = struct.Struct("<IIII")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIR = struct.Struct("<IHHHHIIH")
+
+
+class BundleTooLarge(ValueError):
+    pass
+
+
+def _dos_datetime(when: datetime | None) -> tuple:
+    if when is None or when.year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    dos_time = (when.hour << 11) | (when.minute << 5) | (when.second // 2)
+    dos_date = ((when.year - 1980) << 9) | (when.month << 5) | when.day
+    return dos_time, dos_date
+
+
+class ZipBundle:
+    """
+    A stored ZIP of storage objects with a precomputed layout.
+
+    entries: [(archive_name, storage_key, size, crc32 | None), ...]
+    modified: timestamp written for every entry (keeps the bytes stable
+              across requests, which Range resume relies on)
+    """
+
+    def __init__(self, storage: StorageBackend, entries: list, modified: datetime | None = None):
+        self.storage = storage
+        self.dos_time, self.dos_date = _dos_datetime(modified)
+        self.entries = []
+
+        offset = 0
+        central_size = 0
+        for name, key, size, crc in entries:
+            encoded = name.encode("utf-8")
+            self.entries.append({
+                "name": encoded,
+                "key": key,
+                "size": size,
+                "crc": crc,
+                "offset": offset,
+            })
+            offset += _LOCAL_HEADER.size + len(encoded) + size + _DATA_DESCRIPTOR.size
+            central_size += _CENTRAL_HEADER.size + len(encoded)
+
+        self.central_offset = offset
+        self.central_size = central_size
+        self.size = offset + central_size + _END_OF_CENTRAL_DIR.size
+
+        if (
+            self.central_offset > ZIP32_LIMIT
+            or len(self.entries) > 0xFFFF
+            or any(entry["size"] > ZIP32_LIMIT for entry in self.entries)
+        ):
+            raise BundleTooLarge("Bundle exceeds ZIP32 limits")
+
+    @property
+    def etag(self) -> str:
+        """
+        Identifies this exact byte layout (names, sizes, CRCs, timestamp).
+        """
+        digest = hashlib.sha256()
+        digest.update(struct.pack("<HH", self.dos_time, self.dos_date))
+        for entry in self.entries:
+            digest.update(entry["name"] + b"\0" + str(entry["size"]).encode() + b"\0")
+            digest.update(str(entry["crc"]).encode() + b"\0")
+        return f'"{digest.hexdigest()[:32]}"'
+
+    # -------------------------------
+    # RECORDS
+    # -------------------------------
+    def _local_header(self, entry) -> bytes:
+        return _LOCAL_HEADER.pack(
+            0x04034B50, _VERSION, _FLAGS, 0,
+            self.dos_time, self.dos_date,
+            0, entry["size"], entry["size"],
+            len(entry["name"]), 0,
+        ) + entry["name"]
+
+    def _data_descriptor(self, entry, crc: int) -> bytes:
+        return _DATA_DESCRIPTOR.pack(0x08074B50, crc, entry["size"], entry["size"])
+
+    def _central_header(self, entry, crc: int) -> bytes:
+        return _CENTRAL_HEADER.pack(
+            0x02014B50, _VERSION, _VERSION, _FLAGS, 0,
+            self.dos_time, self.dos_date,
+            crc, entry["size"], entry["size"],
+            len(entry["name"]), 0, 0, 0, 0, 0,
+            entry["offset"],
+        ) + entry["name"]
+
+    def _end_of_central_dir(self) -> bytes:
+        count = len(self.entries)
+        return _END_OF_CENTRAL_DIR.pack(
+            0x06054B50, 0, 0, count, count,
+            self.central_size, self.central_offset, 0,
+        )
+
+    def _data_start(self, entry) -> int:
+        return entry["offset"] + _LOCAL_HEADER.size + len(entry["name"])
+
+    # -------------------------------
+    # STREAMING
+    # -------------------------------
+    def _read_crc(self, entry) -> int:
+        crc = 0
+        length = 0
+        for data in self.storage.iter_bytes(entry["key"]):
+            crc = zlib.crc32(data, crc)
+            length += len(data)
+        if length != entry["size"]:
+            raise RuntimeError(f"{entry['key']} changed size while bundling")
+        return crc
+
+    def iter_bytes(self, start: int = 0, end: int | None = None):
+        """
+        Yields archive bytes [start, end] (inclusive, like a Range header).
+        """
+        end = self.size - 1 if end is None else min(end, self.size - 1)
+        crcs = [entry["crc"] for entry in self.entries]
+
+        def clip(data: bytes, offset: int) -> bytes:
+            # The part of data (at archive offset) inside [start, end]
+            if offset > end or offset + len(data) <= start:
+                return b""
+            return data[max(start - offset, 0): end + 1 - offset]
+
+        for index, entry in enumerate(self.entries):
+            if entry["offset"] > end:
+                break
+            data_start = self._data_start(entry)
+            data_end = data_start + entry["size"]
+
+            if data_end + _DATA_DESCRIPTOR.size <= start:
+                # Skipped; only the central directory may still need its CRC
+                if crcs[index] is None and end >= self.central_offset:
+                    crcs[index] = self._read_crc(entry)
+                continue
+
+            if chunk := clip(self._local_header(entry), entry["offset"]):
+                yield chunk
+
+            # Without a recorded CRC, the descriptor (if in range) needs a full read
+            checksum = crcs[index] is None and end >= data_end
+            position = data_start if checksum else max(start, data_start)
+            crc = 0
+            chunks = ()
+            if end >= data_start and position < data_end:
+                chunks = self.storage.iter_bytes(entry["key"], start=position - data_start)
+            for data in chunks:
+                if position > end and not checksum:
+                    break
+                if position + len(data) > data_end:
+                    raise RuntimeError(f"{entry['key']} changed size while bundling")
+                if checksum:
+                    crc = zlib.crc32(data, crc)
+                if chunk := clip(data, position):
+                    yield chunk
+                position += len(data)
+
+            if position < min(end + 1, data_end):
+                raise RuntimeError(f"{entry['key']} changed size while bundling")
+            if checksum:
+                crcs[index] = crc
+
+            if end >= data_end:
+                if chunk := clip(self._data_descriptor(entry, crcs[index]), data_end):
+                    yield chunk
+
+        if end < self.central_offset:
+            return
+
+        offset = self.central_offset
+        for entry, crc in zip(self.entries, crcs):
+            header = self._central_header(entry, crc)
+            if chunk := clip(header, offset):
+                yield chunk
+            offset += len(header)
+
+        if chunk := clip(self._end_of_central_dir(), offset):
+            yield chunk
@@ -0,0 +1,466 @@
+"""
+Distributed tracing for requests, jobs, engine stages, provider calls
+and database transactions.
+
+Spans follow the OpenTelemetry model: a trace id shared by every span of
+one operation, a span id, a parent, attributes, timestamped events and
+an error status. The current span lives in a context variable, so
+nested span() blocks become children automatically. Threads don't
+inherit context variables; run work on helper threads through
+bind_context() to keep it in the trace.
+
+Traces cross process boundaries as W3C traceparent strings: incoming
+HTTP headers, and Job.trace_parent, which links a job's execution (on
+whichever worker picks it up) to the request that submitted it.
+
+Finished spans are queued and exported in batches by a daemon thread:
+- "file": one JSON object per span per line (TRACING_FILE_PATH)
+- "otlp": an OpenTelemetry collector over OTLP/HTTP JSON
+  (TRACING_OTLP_ENDPOINT)
+
+With TRACING_EXPORTER unset, every call here is a cheap no-op.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import requests
+from sqlalchemy import event
+
+from backend.config import (
+    TRACING_EXPORT_INTERVAL_SECONDS,
+    TRACING_EXPORTER,
+    TRACING_FILE_PATH,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_QUEUE_SIZE,
+    TRACING_SERVICE_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+ENABLED = TRACING_EXPORTER in ("file", "otlp")
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+# -------------------------------
+# SPANS
+# -------------------------------
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: str | None = None, attributes: dict | None = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def update_name(self, name: str):
+        self.name = name
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+        self.add_event("exception", type=type(error).__name__, message=str(error))
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _enqueue(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "attributes": self.attributes,
+            "events": self.events,
+            "error": self.error,
+            "service": TRACING_SERVICE_NAME,
+            "pid": os.getpid(),
+        }
+
+
+class _NoopSpan:
+    traceparent = None
+
+    def update_name(self, name):
+        pass
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str] | None:
+    """
+    (trace_id, parent span id) from a W3C traceparent, or None.
+    """
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+def start_span(name: str, *, traceparent: str | None = None, **attributes):
+    """
+    Starts a span without making it current; call .end() when done.
+    For generators and other work that outlives one context.
+
+    The parent is the span named by traceparent if given, otherwise the
+    current span; with neither, this starts a new trace.
+    """
+    if not ENABLED:
+        return NOOP_SPAN
+
+    remote = parse_traceparent(traceparent)
+    if remote:
+        trace_id, parent_id = remote
+    else:
+        parent = _current.get()
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+
+    return Span(name, trace_id, parent_id, attributes)
+
+
+@contextmanager
+def span(name: str, *, traceparent: str | None = None, **attributes):
+    """
+    Runs the block as the current span. Exceptions are recorded on the
+    span and re-raised.
+    """
+    if not ENABLED:
+        yield NOOP_SPAN
+        return
+
+    current = start_span(name, traceparent=traceparent, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def traced(name: str):
+    """
+    Decorator: runs every call of the function in its own span.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def iter_in_span(name: str, iterable, **attributes):
+    """
+    Yields from iterable inside its own span, which stays open until the
+    iterable is exhausted, fails or is closed. The span is current only
+    while the iterable runs, so spans it starts become children; the
+    generator can be resumed on any thread.
+    """
+    if not ENABLED:
+        yield from iterable
+        return
+
+    current = start_span(name, **attributes)
+    iterator = iter(iterable)
+    try:
+        while True:
+            token = _current.set(current)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield item
+    except Exception as e:
+        current.record_exception(e)
+        raise
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            token = _current.set(current)
+            try:
+                close()
+            finally:
+                _current.reset(token)
+        current.end()
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def add_event(name: str, **attributes):
+    current_span().add_event(name, **attributes)
+
+
+def current_traceparent() -> str | None:
+    return current_span().traceparent
+
+
+def bind_context(fn):
+    """
+    fn bound to a copy of the caller's context (current span included),
+    for running on another thread. Bind once per call: one copy can't
+    be entered by two threads at the same time.
+    """
+    if not ENABLED:
+        return fn
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+# -------------------------------
+# DATABASE TRANSACTIONS
+# -------------------------------
+def instrument_engine(engine, name: str = "primary"):
+    """
+    One span per transaction on the engine (BEGIN → COMMIT/ROLLBACK),
+    counting its statements.
+    """
+    if not ENABLED:
+        return
+
+    def begin(conn):
+        conn.info["trace_span"] = start_span("db.transaction", **{"db.name": name, "db.statements": 0})
+
+    def finish(outcome):
+        def handler(conn):
+            current = conn.info.pop("trace_span", None)
+            if current is not None:
+                current.set_attribute("db.outcome", outcome)
+                current.end()
+        return handler
+
+    def statement(conn, cursor, statement, parameters, context, executemany):
+        current = conn.info.get("trace_span")
+        if current is not None:
+            current.attributes["db.statements"] += 1
+
+    event.listen(engine, "begin", begin)
+    event.listen(engine, "commit", finish("commit"))
+    event.listen(engine, "rollback", finish("rollback"))
+    event.listen(engine, "after_cursor_execute", statement)
+
+
+# -------------------------------
+# EXPORT
+# -------------------------------
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, spans: list):
+        """
+        Sends finished spans (Span objects). May raise; the batch is then dropped.
+        """
+
+
+class JsonFileExporter(SpanExporter):
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list):
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpHttpExporter(SpanExporter):
+    """
+    OTLP/HTTP with the JSON encoding, as accepted by the OpenTelemetry
+    collector's otlp receiver (and Jaeger, Tempo, ...).
+    """
+
+    def __init__(self, endpoint: str, service_name: str):
+        self.endpoint = endpoint
+        self.resource = {
+            "attributes": _otlp_attributes({"service.name": service_name, "process.pid": os.getpid()}),
+        }
+
+    def _span(self, s: Span) -> dict:
+        otlp = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,  # internal
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": _otlp_attributes(s.attributes),
+            "events": [
+                {
+                    "timeUnixNano": str(e["time_ns"]),
+                    "name": e["name"],
+                    "attributes": _otlp_attributes(e["attributes"]),
+                }
+                for e in s.events
+            ],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            otlp["parentSpanId"] = s.parent_id
+        return otlp
+
+    def export(self, spans: list):
+        body = {
+            "resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{
+                    "scope": {"name": "backend.tracing"},
+                    "spans": [self._span(s) for s in spans],
+                }],
+            }],
+        }
+        response = requests.post(self.endpoint, json=body, timeout=10)
+        response.raise_for_status()
+
+
+def build_exporter() -> SpanExporter | None:
+    if TRACING_EXPORTER == "file":
+        return JsonFileExporter(TRACING_FILE_PATH)
+    if TRACING_EXPORTER == "otlp":
+        return OtlpHttpExporter(TRACING_OTLP_ENDPOINT, TRACING_SERVICE_NAME)
+    return None
+
+
+_pending = queue.Queue(maxsize=TRACING_QUEUE_SIZE)
+_exporter_thread = None
+_exporter_lock = threading.Lock()
+
+EXPORT_BATCH_SIZE = 512
+
+
+def _enqueue(finished: Span):
+    if _exporter_thread is None:
+        start_span_exporter()
+    try:
+        _pending.put_nowait(finished)
+    except queue.Full:
+        pass  # dropped; tracing never slows down the traced code
+
+
+def flush(exporter: SpanExporter):
+    while True:
+        batch = []
+        while len(batch) < EXPORT_BATCH_SIZE:
+            try:
+                batch.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+        try:
+            exporter.export(batch)
+        except Exception:
+            logger.warning("Dropped %d spans: export failed", len(batch), exc_info=True)
+
+
+def start_span_exporter() -> threading.Thread | None:
+    """
+    Starts the export loop as a daemon thread (once per process).
+    """
+    global _exporter_thread
+
+    with _exporter_lock:
+        if _exporter_thread is not None:
+            return _exporter_thread
+
+        exporter = build_exporter()
+        if exporter is None:
+            return None
+
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(TRACING_EXPORT_INTERVAL_SECONDS):
+                flush(exporter)
+            flush(exporter)
+
+        thread = threading.Thread(target=loop, name="trace-export", daemon=True)
+        thread.stop = stop
+        thread.start()
+        _exporter_thread = thread
+        return thread
+
+
+def stop_span_exporter(timeout: float = 10):
+    """
+    Exports what is still queued and stops the loop (before a process exits).
+    """
+    thread = _exporter_thread
+    if thread is not None:
+        thread.stop.set()
+        thread.join(timeout)
+
+
+def _reset_after_fork():
+    # The exporter thread doesn't exist in a forked child; start afresh
+    global _pending, _exporter_thread, _exporter_lock
+    _pending = queue.Queue(maxsize=TRACING_QUEUE_SIZE)
+    _exporter_thread = None
+    _exporter_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,124 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from backend.database import get_db
+from backend.auth.dependencies import get_current_user
+from backend.users.models import User
+from backend.uploads.models import Upload
+from backend.storage.blobs import BlobTooLarge, BlobWriter
+from backend.config import UPLOAD_ALLOWED_TYPES, UPLOAD_MAX_BYTES
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+def _record_upload(
+    db: Session,
+    *,
+    user_id: uuid.UUID,
+    digest: str,
+    size: int,
+    content_type: str,
+    filename: str | None,
+) -> Upload:
+    """
+    Returns the user's upload row for this content, creating it if new.
+    Two concurrent uploads of the same file both get the one row.
+    """
+    upload = db.query(Upload).filter_by(user_id=user_id, sha256=digest).first()
+    if upload:
+        return upload
+
+    # The other upload may insert first: keep its row
+    db.execute(
+        insert(Upload)
+        .values(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            sha256=digest,
+            size_bytes=size,
+            content_type=content_type,
+            filename=filename,
+        )
+        .on_conflict_do_nothing(index_elements=[Upload.user_id, Upload.sha256])
+    )
+    db.commit()
+    return db.query(Upload).filter_by(user_id=user_id, sha256=digest).one()
+
+
+@router.post("/")
+async def upload_file(
+    request: Request,
+    filename: str | None = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Streamed upload of a job input file.
+
+    The request body is the raw file (e.g. Content-Type: application/pdf).
+    It is hashed and written to the blob store chunk by chunk, so the API
+    never holds the whole file in memory and no copy step is needed.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    magic = UPLOAD_ALLOWED_TYPES.get(content_type)
+    if magic is None:
+        raise HTTPException(status_code=415, detail="Unsupported file type")
+
+    # Reject oversized uploads before reading the body when we can
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    writer = await run_in_threadpool(BlobWriter, UPLOAD_MAX_BYTES)
+    head = b""
+
+    try:
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+
+            # Sniff the leading bytes before accepting any content
+            if len(head) < len(magic):
+                head += chunk[: len(magic) - len(head)]
+                if not magic.startswith(head[: len(magic)]):
+                    raise HTTPException(
+                        status_code=415,
+                        detail="File content does not match its type",
+                    )
+
+            await run_in_threadpool(writer.write, chunk)
+
+        if len(head) < len(magic):
+            raise HTTPException(status_code=422, detail="Empty or truncated file")
+
+        digest, deduplicated = await run_in_threadpool(writer.commit)
+
+    except BlobTooLarge:
+        await run_in_threadpool(writer.abort)
+        raise HTTPException(status_code=413, detail="File too large")
+
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
+
+    upload = await run_in_threadpool(
+        _record_upload,
+        db,
+        user_id=current_user.id,
+        digest=digest,
+        size=writer.size,
+        content_type=content_type,
+        filename=filename,
+    )
+
+    return {
+        "upload_id": str(upload.id),
+        "sha256": upload.sha256,
+        "size_bytes": upload.size_bytes,
+        "content_type": upload.content_type,
+        "deduplicated": deduplicated,
+    }
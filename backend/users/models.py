@@ -1,7 +1,7 @@
 import uuid
 from sqlalchemy import Column, String, Boolean, DateTime
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
 
 from backend.database import Base
 
@@ -14,6 +14,9 @@ class User(Base):
 
     is_active = Column(Boolean, default=True)
 
+    # Grants the /admin routes (e.g. job profiling); set directly in the database
+    is_admin = Column(Boolean, nullable=False, default=False, server_default=false())
+
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now()
@@ -0,0 +1,31 @@
+"""
+Pre-forked job workers.
+
+With JOB_DISPATCH=workers the API only inserts queued jobs. Workers run
+them, under a supervisor started with:
+
+    python -m backend.workers [--processes N] [--max-jobs N] [--max-rss-mb N]
+
+The supervisor imports every engine and runs its warmup (clients,
+ffmpeg discovery, media libraries) once, then forks the workers, which
+start warm and share those pages copy-on-write. Each worker claims one
+top-level job at a time (FOR UPDATE SKIP LOCKED, so any number of
+workers and hosts can share the queue) and exits after WORKER_MAX_JOBS
+jobs or once its RSS passes WORKER_MAX_RSS_MB. The supervisor forks a
+fresh one in its place, so leaks never outlive a few jobs.
+
+Signals (supervisor):
+- SIGHUP: rolling restart. Workers are replaced one at a time, with the
+  new one started before the old one is asked to stop, so capacity
+  never drops.
+- SIGTERM / SIGINT: graceful stop. Workers finish their current job
+  (up to WORKER_SHUTDOWN_TIMEOUT_SECONDS) and exit.
+
+To deploy new code, start the new supervisor, then SIGTERM the old one.
+Both share the queue safely while the old one drains.
+
+A worker that dies mid-job (OOM kill, segfault) has its jobs recovered
+from its claims. Jobs it never started go back on the queue. Started
+jobs fail as system failures, and whatever the ledger still holds for
+them is refunded.
+"""
@@ -0,0 +1,35 @@
+import argparse
+import logging
+
+from backend.config import (
+    WORKER_MAX_JOBS,
+    WORKER_MAX_RSS_MB,
+    WORKER_PROCESSES,
+    WORKER_SHUTDOWN_TIMEOUT_SECONDS,
+)
+from backend.workers.supervisor import Supervisor
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.workers")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--max-jobs", type=int, default=WORKER_MAX_JOBS)
+    parser.add_argument("--max-rss-mb", type=int, default=WORKER_MAX_RSS_MB)
+    parser.add_argument("--shutdown-timeout", type=float, default=WORKER_SHUTDOWN_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s",
+    )
+
+    Supervisor(
+        processes=args.processes,
+        max_jobs=args.max_jobs,
+        max_rss_mb=args.max_rss_mb,
+        shutdown_timeout=args.shutdown_timeout,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+The job queue as seen by workers: claims and lost-job recovery.
+"""
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from backend.credits.models import CreditTransaction
+from backend.credits.service import refund_credits
+from backend.engines.registry import get_engine_cost
+from backend.jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED = ("queued", "running")
+
+
+def process_id(pid: int | None = None) -> str:
+    """
+    Claim owner for a process on this host (default: this one): "<host>:<pid>".
+    """
+    return f"{socket.gethostname()}:{pid if pid is not None else os.getpid()}"
+
+
+def claim_next_job(db: Session, worker_id: str) -> Job | None:
+    """
+    Takes the oldest unclaimed top-level job off the queue. Chapter jobs
+    run inside their book's batch and are never claimed on their own.
+    """
+    job = (
+        db.query(Job)
+        .filter(
+            Job.status == "queued",
+            Job.claimed_at.is_(None),
+            Job.parent_id.is_(None),
+        )
+        .order_by(Job.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return None
+
+    job.claimed_by = worker_id
+    job.claimed_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+# -------------------------------
+# RECOVERY
+# -------------------------------
+def _outstanding_credits(db: Session, job_id) -> int:
+    """
+    Debited minus refunded for the job, from the ledger.
+    """
+    net = (
+        db.query(
+            func.coalesce(
+                func.sum(
+                    case(
+                        (CreditTransaction.type == "debit", CreditTransaction.amount),
+                        (CreditTransaction.type == "refund", -CreditTransaction.amount),
+                        else_=0,
+                    )
+                ),
+                0,
+            )
+        )
+        .filter(CreditTransaction.job_id == job_id)
+        .scalar()
+    )
+    return int(net)
+
+
+def _fail_lost(db: Session, job: Job, refund: int):
+    job.status = "failed"
+    job.error_type = "system"
+    job.error_message = "Worker lost while running the job"
+    db.commit()
+
+    # 🚨 Lost worker → refundable
+    if refund > 0:
+        refund_credits(
+            db,
+            user_id=job.user_id,
+            job_id=job.id,
+            amount=refund,
+            reason="worker_lost_refund",
+        )
+
+
+def recover_lost_jobs(db: Session, worker_id: str) -> int:
+    """
+    Settles the unfinished jobs of a worker that is known to be dead.
+    Returns how many jobs were recovered.
+    """
+    jobs = (
+        db.query(Job)
+        .filter(Job.claimed_by == worker_id, Job.status.in_(UNFINISHED))
+        .with_for_update()
+        .all()
+    )
+
+    for job in jobs:
+        if job.input_type == "book":
+            # The batch debit covers every chapter; refunds go per chapter
+            children = (
+                db.query(Job)
+                .filter(Job.parent_id == job.id, Job.status.in_(UNFINISHED))
+                .all()
+            )
+            cost = get_engine_cost(job.engine)
+            for child in children:
+                _fail_lost(db, child, cost)
+
+            if job.status == "queued":
+                job.claimed_by = None
+                job.claimed_at = None
+                db.commit()
+            else:
+                _fail_lost(db, job, 0)
+            continue
+
+        outstanding = _outstanding_credits(db, job.id)
+        if job.status == "queued":
+            # Never started → back on the queue (settling a debit that
+            # landed just before the crash, so the retry isn't charged twice)
+            job.claimed_by = None
+            job.claimed_at = None
+            db.commit()
+            if outstanding > 0:
+                refund_credits(
+                    db,
+                    user_id=job.user_id,
+                    job_id=job.id,
+                    amount=outstanding,
+                    reason="worker_lost_refund",
+                )
+        else:
+            _fail_lost(db, job, outstanding)
+
+    db.commit()
+    if jobs:
+        logger.warning("Recovered %d job(s) from lost worker %s", len(jobs), worker_id)
+    return len(jobs)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_orphaned_jobs(db: Session) -> int:
+    """
+    Recovers jobs claimed by processes on this host that no longer exist
+    (e.g. left behind by a supervisor that was killed).
+    """
+    prefix = f"{socket.gethostname()}:"
+    owners = [
+        owner
+        for (owner,) in (
+            db.query(Job.claimed_by)
+            .filter(Job.claimed_by.startswith(prefix), Job.status.in_(UNFINISHED))
+            .distinct()
+        )
+    ]
+    db.rollback()
+
+    recovered = 0
+    for owner in owners:
+        pid = owner.rsplit(":", 1)[1]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            recovered += recover_lost_jobs(db, owner)
+    return recovered
@@ -0,0 +1,197 @@
+"""
+Worker supervisor: warms up once, forks the workers, replaces them as
+they recycle or die, and rolls or stops them on signals (see
+backend/workers/__init__.py).
+"""
+import logging
+import os
+import signal
+import time
+
+from backend.config import STORAGE_GC_INTERVAL_SECONDS
+from backend.database import SessionLocal, dispose_engines
+from backend.engines.registry import warm_engines
+from backend.storage.gc import run_cache_gc
+from backend.workers.queue import process_id, recover_lost_jobs, recover_orphaned_jobs
+from backend.workers.worker import EXIT_RECYCLE, EXIT_STOPPED, run_worker
+
+logger = logging.getLogger(__name__)
+
+TICK_SECONDS = 0.5
+# A worker dying sooner than this after starting counts as a crash loop
+MIN_HEALTHY_SECONDS = 10
+MAX_BACKOFF_SECONDS = 30
+
+
+class Supervisor:
+    def __init__(self, processes: int, max_jobs: int, max_rss_mb: int, shutdown_timeout: float):
+        self.processes = processes
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.shutdown_timeout = shutdown_timeout
+
+        self.workers = {}  # pid -> {"generation", "started"}
+        self.generation = 0
+        self.retiring = None  # pid being replaced by a rolling restart
+
+        self.stopping = False
+        self.roll_requested = False
+        self.backoff = 0.0
+        self.next_spawn_at = 0.0
+
+    # -------------------------------
+    # SIGNALS
+    # -------------------------------
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_roll(self, signum, frame):
+        self.roll_requested = True
+
+    # -------------------------------
+    # WORKERS
+    # -------------------------------
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            # Child: never returns into the supervisor's code
+            code = 1
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                code = run_worker(self.max_jobs, self.max_rss_bytes)
+            except BaseException:
+                logger.exception("Worker crashed")
+            finally:
+                logging.shutdown()
+                os._exit(code)
+
+        self.workers[pid] = {"generation": self.generation, "started": time.monotonic()}
+        logger.info("Started worker %d (generation %d)", pid, self.generation)
+        return pid
+
+    def _recover(self, pid: int):
+        db = SessionLocal()
+        try:
+            recover_lost_jobs(db, process_id(pid))
+        except Exception:
+            logger.exception("Recovering jobs of worker %d failed", pid)
+        finally:
+            db.close()
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            info = self.workers.pop(pid, None)
+            if info is None:
+                continue
+            if pid == self.retiring:
+                self.retiring = None
+
+            code = os.waitstatus_to_exitcode(status)
+            if code in (EXIT_STOPPED, EXIT_RECYCLE):
+                logger.info("Worker %d exited (%s)", pid, "recycle" if code == EXIT_RECYCLE else "stopped")
+                self.backoff = 0.0
+                continue
+
+            logger.error("Worker %d died (exit %d)", pid, code)
+            self._recover(pid)
+
+            if time.monotonic() - info["started"] < MIN_HEALTHY_SECONDS:
+                self.backoff = min(max(self.backoff * 2, 1.0), MAX_BACKOFF_SECONDS)
+                self.next_spawn_at = time.monotonic() + self.backoff
+                logger.warning("Crash loop: next worker in %.0fs", self.backoff)
+
+    def fill(self):
+        # A worker being rolled out doesn't count: its replacement is already up
+        serving = len(self.workers) - (1 if self.retiring else 0)
+        while serving < self.processes and time.monotonic() >= self.next_spawn_at:
+            self.spawn()
+            serving += 1
+
+    def roll(self):
+        """
+        One rolling-restart step: while old-generation workers remain,
+        start a replacement, then ask one old worker to stop.
+        """
+        if self.roll_requested:
+            self.roll_requested = False
+            self.generation += 1
+            logger.info("Rolling restart to generation %d", self.generation)
+
+        if self.retiring is not None:
+            return
+
+        old = [pid for pid, info in self.workers.items() if info["generation"] < self.generation]
+        if not old:
+            return
+
+        self.spawn()
+        self.retiring = old[0]
+        os.kill(self.retiring, signal.SIGTERM)
+
+    def shutdown(self):
+        logger.info("Stopping %d worker(s)", len(self.workers))
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(TICK_SECONDS)
+
+        for pid in list(self.workers):
+            logger.error("Worker %d still running after %.0fs; killing it", pid, self.shutdown_timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.workers.pop(pid, None)
+            self._recover(pid)
+
+    # -------------------------------
+    # MAIN LOOP
+    # -------------------------------
+    def run(self):
+        # Before forking: no connections or threads must be inherited
+        db = SessionLocal()
+        try:
+            recover_orphaned_jobs(db)
+        finally:
+            db.close()
+
+        warmed = warm_engines()
+        logger.info("Warmed engines: %s", ", ".join(warmed))
+        dispose_engines()
+
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_roll)
+
+        next_gc_at = time.monotonic()
+        while not self.stopping:
+            self.reap()
+            self.roll()
+            self.fill()
+
+            # Workers on this host share its TTS cache
+            if time.monotonic() >= next_gc_at:
+                next_gc_at = time.monotonic() + STORAGE_GC_INTERVAL_SECONDS
+                try:
+                    run_cache_gc()
+                except Exception:
+                    logger.exception("TTS cache GC pass failed")
+
+            time.sleep(TICK_SECONDS)
+
+        self.shutdown()
+        logger.info("Supervisor stopped")
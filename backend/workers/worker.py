@@ -0,0 +1,88 @@
+"""
+One worker process: claims and runs jobs until it is told to stop or
+has earned a recycle.
+"""
+import logging
+import os
+import resource
+import signal
+import threading
+
+from backend.config import WORKER_POLL_SECONDS
+from backend.database import SessionLocal, dispose_engines
+from backend.jobs.batch import execute_batch
+from backend.jobs.executor import execute_job
+from backend.tracing import stop_span_exporter
+from backend.workers.queue import claim_next_job, process_id
+
+logger = logging.getLogger(__name__)
+
+# Exit codes the supervisor understands; anything else is a crash
+EXIT_STOPPED = 0
+EXIT_RECYCLE = 3
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Not Linux: peak RSS (KiB on Linux, bytes on macOS) is the best we have
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_job_row(job, db):
+    if job.input_type == "book":
+        execute_batch(job, db)
+    else:
+        execute_job(job, db)
+
+
+def run_worker(max_jobs: int, max_rss_bytes: int) -> int:
+    """
+    The worker loop (in a freshly forked child). Returns the exit code.
+    """
+    stop = threading.Event()
+
+    # SIGTERM: finish the current job, then exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    # Ctrl-C reaches the whole process group; the supervisor decides
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    dispose_engines(close=False)
+    worker_id = process_id()
+    jobs_done = 0
+
+    try:
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                job = claim_next_job(db, worker_id)
+                if job is None:
+                    db.close()
+                    stop.wait(WORKER_POLL_SECONDS)
+                    continue
+
+                logger.info("Worker %s running job %s", worker_id, job.id)
+                try:
+                    run_job_row(job, db)
+                except Exception:
+                    # Already recorded on the job (and refunded if it was ours to refund)
+                    logger.exception("Job %s failed", job.id)
+            finally:
+                db.close()
+
+            jobs_done += 1
+            if jobs_done >= max_jobs:
+                logger.info("Worker %s recycling after %d jobs", worker_id, jobs_done)
+                return EXIT_RECYCLE
+
+            rss = current_rss_bytes()
+            if rss > max_rss_bytes:
+                logger.info("Worker %s recycling at %d MiB RSS", worker_id, rss // (1024 * 1024))
+                return EXIT_RECYCLE
+
+        return EXIT_STOPPED
+    finally:
+        stop_span_exporter()
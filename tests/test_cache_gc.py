@@ -0,0 +1,28 @@
+import os
+import time
+
+from backend.storage.gc import prune_cache_dir
+
+
+def write(path, size: int, age_seconds: float):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    stamp = time.time() - age_seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_evicts_stale_files(tmp_path):
+    write(tmp_path / "ab" / "old.pcm", 10, age_seconds=3600)
+    write(tmp_path / "cd" / "new.pcm", 10, age_seconds=10)
+
+    assert prune_cache_dir(tmp_path, max_bytes=1000, max_age_seconds=600) == 1
+    assert not (tmp_path / "ab" / "old.pcm").exists()
+    assert (tmp_path / "cd" / "new.pcm").exists()
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    for name, age in (("a", 30), ("b", 20), ("c", 10)):
+        write(tmp_path / f"{name}.pcm", 100, age_seconds=age)
+
+    assert prune_cache_dir(tmp_path, max_bytes=150, max_age_seconds=3600) == 2
+    assert [p.name for p in tmp_path.iterdir()] == ["c.pcm"]
@@ -0,0 +1,140 @@
+import pytest
+
+from backend.engines import circuit
+from backend.engines.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from backend.engines.errors import ProviderUnavailable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit, "time", fake)
+    return fake
+
+
+def make_breaker(**settings) -> CircuitBreaker:
+    defaults = dict(window_seconds=60, min_calls=4, error_rate=0.5, slow_call_seconds=10, open_seconds=30)
+    return CircuitBreaker("test", **{**defaults, **settings})
+
+
+def fail(breaker: CircuitBreaker):
+    with pytest.raises(RuntimeError):
+        with breaker.guard():
+            raise RuntimeError("boom")
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        fail(breaker)
+    assert breaker.state == CLOSED
+
+
+def test_opens_on_error_rate_and_fails_fast(clock):
+    breaker = make_breaker()
+    for _ in range(2):
+        with breaker.guard():
+            pass
+    fail(breaker)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+
+    with pytest.raises(ProviderUnavailable):
+        breaker.before_call()
+
+
+def test_flagged_response_counts_as_failure(clock):
+    breaker = make_breaker(min_calls=2)
+    for _ in range(2):
+        with breaker.guard() as call:
+            call.failure()
+    assert breaker.state == OPEN
+
+
+def test_opens_on_slow_call_rate(clock):
+    breaker = make_breaker(min_calls=2, slow_call_rate=0.8)
+    for _ in range(2):
+        with breaker.guard():
+            clock.now += 11
+    assert breaker.state == OPEN
+
+
+def test_old_calls_leave_the_window(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        fail(breaker)
+    clock.now += 61
+    for _ in range(3):
+        with breaker.guard():
+            pass
+    fail(breaker)
+    # 1 failure in 4 calls within the window
+    assert breaker.state == CLOSED
+
+
+def test_half_open_admits_one_probe(clock):
+    breaker = make_breaker(min_calls=1)
+    fail(breaker)
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(ProviderUnavailable):
+        breaker.before_call()
+
+
+def test_successful_probe_closes(clock):
+    breaker = make_breaker(min_calls=1)
+    fail(breaker)
+    clock.now += 30
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+
+
+def test_failed_or_slow_probe_reopens(clock):
+    breaker = make_breaker(min_calls=1)
+    fail(breaker)
+    clock.now += 30
+    fail(breaker)
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    with breaker.guard():
+        clock.now += 11
+    assert breaker.state == OPEN
+
+
+def test_ignored_exception_releases_the_probe(clock):
+    breaker = make_breaker(min_calls=1)
+    fail(breaker)
+    clock.now += 30
+
+    with pytest.raises(KeyError):
+        with breaker.guard(ignore=(KeyError,)):
+            raise KeyError()
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()  # the next probe is admitted
+
+
+def test_open_circuits_groups(clock):
+    for name in ("oc_a", "oc_b", "oc_c"):
+        circuit._breakers.pop(name, None)
+    a = circuit.get_breaker("oc_a", min_calls=1)
+    circuit.get_breaker("oc_b", min_calls=1)
+    fail(a)
+
+    assert circuit.open_circuits(["oc_a", "oc_c"]) == ["oc_a"]
+    assert circuit.open_circuits([["oc_a", "oc_b"]]) == []
+    fail(circuit.get_breaker("oc_b"))
+    assert circuit.open_circuits([["oc_a", "oc_b"]]) == ["oc_a|oc_b"]
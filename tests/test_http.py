@@ -0,0 +1,72 @@
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from backend.engines.http import AbortableSession
+from backend.engines.video_engine.image_backends import (
+    CancelEvent,
+    HFInferenceBackend,
+    RequestCancelled,
+)
+
+
+@pytest.fixture
+def silent_server():
+    """
+    Accepts connections and never answers: a request waits for
+    response headers until its timeout.
+    """
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    accepted = []
+
+    def accept():
+        while True:
+            try:
+                accepted.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}/"
+    server.close()
+    for conn in accepted:
+        conn.close()
+
+
+def test_abort_tears_down_a_request_waiting_for_headers(silent_server):
+    session = AbortableSession()
+    threading.Timer(0.2, session.abort).start()
+
+    started = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        session.post(silent_server, json={}, timeout=30)
+
+    assert time.monotonic() - started < 5
+    assert session.aborted
+
+
+def test_request_after_abort_fails(silent_server):
+    session = AbortableSession()
+    session.abort()
+
+    with pytest.raises(requests.ConnectionError):
+        session.get(silent_server, timeout=30)
+
+
+def test_cancel_aborts_an_image_request_in_flight(silent_server, monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_TOKEN", "test")
+    backend = HFInferenceBackend("test-silent", "model")
+    backend.url = silent_server
+    cancel = CancelEvent()
+    threading.Timer(0.2, cancel.set).start()
+
+    started = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        backend.generate("prompt", seed=1, cancel=cancel, timeout=30)
+
+    assert time.monotonic() - started < 5
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from backend.engines.context import JobContext
+from backend.engines.errors import DeadlineExceeded, JobCancelled
+from backend.engines.video_engine import image_backends
+from backend.engines.video_engine.image_backends import ImageBackend, RequestCancelled
+
+
+class FakeBackend(ImageBackend):
+    def __init__(self, name: str, delay: float, result: bytes = b"png"):
+        super().__init__(f"test-{name}")
+        self.delay = delay
+        self.result = result
+        self.calls = 0
+        # Enough history for a short hedge delay
+        for _ in range(10):
+            self.latency.record(0.01)
+
+    def generate(self, prompt, seed, cancel, timeout=120):
+        self.calls += 1
+        if cancel.wait(self.delay):
+            raise RequestCancelled()
+        return self.result
+
+
+@pytest.fixture
+def fast_hedges(monkeypatch):
+    monkeypatch.setattr(image_backends, "IMAGE_HEDGE_MIN_DELAY_SECONDS", 0.01)
+
+
+def test_single_backend_never_hedges(monkeypatch, fast_hedges):
+    backend = FakeBackend("single", delay=0.2)
+    monkeypatch.setattr(image_backends, "get_backends", lambda: [backend])
+
+    assert image_backends.generate_image_bytes("prompt") == b"png"
+    assert backend.calls == 1
+
+
+def test_slow_primary_is_hedged(monkeypatch, fast_hedges):
+    slow = FakeBackend("slow", delay=5, result=b"slow")
+    fast = FakeBackend("fast", delay=0, result=b"fast")
+    monkeypatch.setattr(image_backends, "get_backends", lambda: [slow, fast])
+
+    assert image_backends.generate_image_bytes("prompt") == b"fast"
+    assert (slow.calls, fast.calls) == (1, 1)
+
+
+def test_hedges_are_bounded(monkeypatch, fast_hedges):
+    slow = FakeBackend("bounded-slow", delay=0.2, result=b"slow")
+    fast = FakeBackend("bounded-fast", delay=0, result=b"fast")
+    monkeypatch.setattr(image_backends, "get_backends", lambda: [slow, fast])
+    monkeypatch.setattr(image_backends, "_hedge_slots", threading.BoundedSemaphore(1))
+
+    image_backends._hedge_slots.acquire()  # another job's hedge
+    assert image_backends.generate_image_bytes("prompt") == b"slow"
+    assert fast.calls == 0
+
+    image_backends._hedge_slots.release()
+    assert image_backends.generate_image_bytes("prompt") == b"fast"
+
+
+def test_cancel_aborts_the_only_request(monkeypatch):
+    backend = FakeBackend("stuck", delay=30)
+    monkeypatch.setattr(image_backends, "get_backends", lambda: [backend])
+    monkeypatch.setattr(image_backends, "WAIT_SLICE_SECONDS", 0.01)
+    context = JobContext()
+    threading.Timer(0.1, context.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        image_backends.generate_image_bytes("prompt", context)
+
+    assert time.monotonic() - started < 5
+
+
+def test_deadline_is_noticed_while_waiting(monkeypatch):
+    backend = FakeBackend("slow-deadline", delay=30)
+    monkeypatch.setattr(image_backends, "get_backends", lambda: [backend])
+    monkeypatch.setattr(image_backends, "WAIT_SLICE_SECONDS", 0.01)
+    context = JobContext()
+    # No timer: only the sliced wait can see the deadline pass
+    context.deadline = time.monotonic() + 0.1
+    context.deadline_seconds = 0.1
+
+    with pytest.raises(DeadlineExceeded):
+        image_backends.generate_image_bytes("prompt", context)
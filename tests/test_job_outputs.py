@@ -0,0 +1,33 @@
+import mimetypes
+from types import SimpleNamespace
+
+from backend.jobs import routes
+from backend.storage.backends import LocalStorage
+
+
+def test_hls_segments_ship_with_their_playlists(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path)
+    monkeypatch.setattr(routes, "get_storage", lambda: storage)
+    names = [
+        "reel_01/final_video.mp4",
+        "reel_01/hls/master.m3u8",
+        "reel_01/hls/720p.m3u8",
+        "reel_01/hls/720p_000.ts",
+        "reel_01/.encoding/720p_001.ts",
+        "source_text.txt",
+    ]
+    for name in names:
+        source = tmp_path / "scratch" / name
+        source.parent.mkdir(parents=True, exist_ok=True)
+        source.write_bytes(b"x")
+        storage.put_file(f"outputs/job/{name}", source)
+
+    outputs = routes._list_outputs(SimpleNamespace(output_dir="outputs/job"))
+
+    assert sorted(outputs) == [
+        "reel_01/final_video.mp4",
+        "reel_01/hls/720p.m3u8",
+        "reel_01/hls/720p_000.ts",
+        "reel_01/hls/master.m3u8",
+    ]
+    assert mimetypes.guess_type("720p_000.ts")[0] == "video/mp2t"
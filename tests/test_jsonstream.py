@@ -0,0 +1,65 @@
+from backend.engines.video_engine.jsonstream import JsonArrayStream, loads_lenient
+
+
+def feed_all(stream: JsonArrayStream, text: str, chunk: int = 3) -> list:
+    objects = []
+    for start in range(0, len(text), chunk):
+        objects += stream.feed(text[start:start + chunk])
+    return objects
+
+
+def test_objects_returned_as_they_close():
+    stream = JsonArrayStream()
+    assert stream.feed('[{"a": 1}, {"b": ') == [{"a": 1}]
+    assert stream.feed('"x,]}"}') == [{"b": "x,]}"}]
+    assert stream.feed("]") == []
+    assert stream.finish() == []
+
+
+def test_preamble_and_wrapping_object_are_skipped():
+    text = '```json\n{"images": [{"id": 1, "tags": ["a", "b"]}, {"id": 2}]}\n```'
+    stream = JsonArrayStream()
+    assert feed_all(stream, text) == [{"id": 1, "tags": ["a", "b"]}, {"id": 2}]
+
+
+def test_only_the_first_array_is_read():
+    stream = JsonArrayStream()
+    assert feed_all(stream, '[{"a": 1}] [{"b": 2}]') == [{"a": 1}]
+
+
+def test_escaped_quotes_inside_strings():
+    stream = JsonArrayStream()
+    assert feed_all(stream, r'[{"q": "say \"hi\" {"}]', chunk=1) == [{"q": 'say "hi" {'}]
+
+
+def test_trailing_commas_tolerated():
+    stream = JsonArrayStream()
+    assert feed_all(stream, '[{"a": [1, 2,], "b": 3,},]') == [{"a": [1, 2], "b": 3}]
+    assert loads_lenient("{") is None
+
+
+def test_finish_closes_a_cut_off_string():
+    stream = JsonArrayStream()
+    assert feed_all(stream, '[{"a": 1}, {"b": "trunc') == [{"a": 1}]
+    assert stream.finish() == [{"b": "trunc"}]
+
+
+def test_finish_closes_open_brackets():
+    stream = JsonArrayStream()
+    feed_all(stream, '[{"a": {"b": [1, 2')
+    assert stream.finish() == [{"a": {"b": [1, 2]}}]
+
+
+def test_finish_falls_back_to_last_complete_member():
+    stream = JsonArrayStream()
+    # Cut off after a key: closing brackets alone can't repair it
+    feed_all(stream, '[{"a": 1, "b": {"c": 2}, "d":')
+    assert stream.finish() == [{"a": 1, "b": {"c": 2}}]
+
+
+def test_finish_without_anything_salvageable():
+    stream = JsonArrayStream()
+    feed_all(stream, '[{"a"')
+    assert stream.finish() == []
+
+    assert JsonArrayStream().finish() == []
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.auth.magic_links import upsert_user
+from backend.database import Base
+from backend.users.models import User
+
+
+@pytest.fixture
+def statements():
+    return []
+
+
+@pytest.fixture
+def db(statements):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__])
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_existing_user_is_never_rewritten(db, statements):
+    created = upsert_user(db, "reader@example.com")
+    assert statements == ["INSERT"]
+
+    statements.clear()
+    assert upsert_user(db, "reader@example.com") == created
+    # The conflicting insert writes nothing; the id comes from a SELECT
+    assert statements == ["INSERT", "SELECT"]
+
+    assert db.query(User).count() == 1
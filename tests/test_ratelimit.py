@@ -0,0 +1,195 @@
+from contextlib import contextmanager
+
+import pytest
+
+from backend import ratelimit
+from backend.ratelimit import POLICIES, RateLimiter, _Window
+
+WINDOW = 60
+
+
+def window(now: float, prev: int = 0, cur: int = 0) -> _Window:
+    entry = _Window(WINDOW, int(now // WINDOW))
+    entry.prev, entry.cur = prev, cur
+    return entry
+
+
+def admitted_at(entry: _Window, limit: int, now: float) -> bool:
+    entry.roll(int(now // WINDOW))
+    return entry.retry_after(limit, now) == 0
+
+
+# -------------------------------
+# _Window.retry_after
+# -------------------------------
+def test_allows_while_weighted_count_fits():
+    assert window(30, prev=0, cur=9).retry_after(10, 30) == 0
+    # Half the previous bucket still overlaps: 10 * 0.5 + 4 + 1 = 10
+    assert window(90, prev=10, cur=4).retry_after(10, 90) == 0
+
+
+def test_waits_for_previous_bucket_to_decay():
+    now = 75  # a quarter into bucket 1
+    entry = window(now, prev=10, cur=5)
+
+    wait = entry.retry_after(10, now)
+
+    assert wait == pytest.approx(21)  # until 10 * 0.4 + 5 + 1 = 10
+    assert not admitted_at(window(now, prev=10, cur=5), 10, now + wait - 0.1)
+    assert admitted_at(window(now, prev=10, cur=5), 10, now + wait + 1e-6)
+
+
+def test_waits_into_next_bucket_when_current_is_full():
+    now = 30
+    entry = window(now, cur=10)
+
+    wait = entry.retry_after(10, now)
+
+    # Next bucket, once this one's weight is down to 9/10
+    assert wait == pytest.approx(36)
+    assert not admitted_at(window(now, cur=10), 10, now + wait - 0.1)
+    assert admitted_at(window(now, cur=10), 10, now + wait + 1e-6)
+
+
+def test_remote_counts_are_included():
+    entry = window(30, cur=4)
+    entry.remote_cur = 6
+
+    assert entry.retry_after(10, 30) > 0
+
+
+def test_roll_keeps_only_the_adjacent_bucket():
+    entry = window(30, cur=7)
+    entry.remote_cur = 2
+
+    entry.roll(1)
+    assert (entry.prev, entry.remote_prev, entry.cur) == (7, 2, 0)
+
+    entry.roll(3)
+    assert (entry.prev, entry.remote_prev, entry.cur) == (0, 0, 0)
+
+
+# -------------------------------
+# RateLimiter.hit
+# -------------------------------
+def test_hit_admits_up_to_the_limit():
+    limiter = RateLimiter()
+    checks = [("job_submit:user:1", 3, WINDOW)]
+
+    assert [limiter.hit(checks, now=10) for _ in range(3)] == [None, None, None]
+
+    wait, index = limiter.hit(checks, now=10)
+    assert index == 0 and wait > 0
+
+
+def test_hit_counts_all_checks_or_none():
+    limiter = RateLimiter()
+    tight = ("job_submit:user:1", 1, WINDOW)
+    loose = ("default:user:1", 100, WINDOW)
+
+    assert limiter.hit([loose, tight], now=10) is None
+    wait, index = limiter.hit([loose, tight], now=10)
+
+    assert index == 1 and wait > 0
+    # The denied request wasn't counted against the policy that allowed it
+    assert limiter._windows[loose[0]].cur == 1
+
+
+def test_hit_reports_the_longest_wait():
+    limiter = RateLimiter()
+    short = ("a", 1, 10)
+    long = ("b", 1, 600)
+    assert limiter.hit([short, long], now=1) is None
+
+    wait, index = limiter.hit([short, long], now=1)
+
+    assert index == 1
+    assert wait == pytest.approx(limiter._windows["b"].retry_after(1, 1))
+
+
+def test_clients_are_counted_separately():
+    limiter = RateLimiter()
+    assert limiter.hit([("login:ip:a", 1, WINDOW)], now=1) is None
+    assert limiter.hit([("login:ip:b", 1, WINDOW)], now=1) is None
+    assert limiter.hit([("login:ip:a", 1, WINDOW)], now=1) is not None
+
+
+# -------------------------------
+# POLICIES
+# -------------------------------
+def matching(method: str, path: str) -> list:
+    return [policy.name for policy in POLICIES if policy.matches(method, path)]
+
+
+def test_job_files_have_their_own_policy():
+    job = "3f1c9a52-7d1e-4b8e-9a57-1c2d3e4f5a6b"
+    for path in (f"/jobs/{job}/files/hls/720p_004.ts", f"/jobs/{job}/bundle", f"/jobs/{job}/download"):
+        assert matching("GET", path) == ["job_files"]
+
+    assert matching("GET", f"/jobs/{job}/status") == ["job_read", "default"]
+    assert matching("GET", "/jobs/") == ["job_read", "default"]
+    assert matching("POST", "/jobs/") == ["job_submit", "default"]
+
+
+# -------------------------------
+# SYNC
+# -------------------------------
+class FakeConnection:
+    def __init__(self, shared: dict):
+        self.shared = shared
+        self.selected = []
+
+    def execute(self, statement, params=None):
+        if statement is ratelimit._UPSERT_SQL:
+            rows = []
+            for key, start, count in zip(params["keys"], params["starts"], params["counts"]):
+                self.shared[(key, start)] = self.shared.get((key, start), 0) + count
+                rows.append((key, start, self.shared[(key, start)]))
+            return rows
+        if statement is ratelimit._TOTALS_SQL:
+            wanted = list(zip(params["keys"], params["starts"]))
+            self.selected += wanted
+            return [
+                (key, start, self.shared[(key, start)])
+                for key, start in wanted
+                if (key, start) in self.shared
+            ]
+        return []
+
+
+class FakeEngine:
+    def __init__(self):
+        self.shared = {}
+        self.conn = FakeConnection(self.shared)
+
+    @contextmanager
+    def begin(self):
+        yield self.conn
+
+
+def test_sync_refreshes_checked_keys_without_new_hits(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_SYNC", True)
+    fake = FakeEngine()
+    monkeypatch.setattr(ratelimit, "engine", fake)
+
+    key = "job_read:user:1"
+    limiter = RateLimiter()
+    for _ in range(4):
+        assert limiter.hit([(key, 10, WINDOW)], now=5) is None
+    ratelimit.sync_counters(limiter)
+    assert fake.shared[(key, 0)] == 4
+
+    # Another replica counts 5 more. Here the key is only checked: a
+    # tighter policy denies the request, so nothing is counted
+    fake.shared[(key, 0)] += 5
+    tight = ("job_submit:user:1", 1, WINDOW)
+    assert limiter.hit([tight], now=6) is None
+    assert limiter.hit([(key, 10, WINDOW), tight], now=6) is not None
+
+    ratelimit.sync_counters(limiter)
+
+    assert (key, 0) in fake.conn.selected
+    assert limiter._windows[key].remote_cur == 5
+    # 4 local + 5 remote: one more fits, the next doesn't
+    assert limiter.hit([(key, 10, WINDOW)], now=7) is None
+    assert limiter.hit([(key, 10, WINDOW)], now=7) is not None
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend import database
+from backend.database import WRITE_MARKER_COOKIE, WRITE_MARKER_HEADER, mark_write
+
+
+@pytest.fixture(autouse=True)
+def with_replica(monkeypatch):
+    monkeypatch.setattr(database, "replicas", [object()])
+
+
+def request(headers: dict) -> Request:
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def marker() -> str:
+    response = Response()
+    mark_write(response)
+    assert WRITE_MARKER_COOKIE in response.headers["set-cookie"]
+    return response.headers[WRITE_MARKER_HEADER]
+
+
+def test_marker_pins_reads_from_header_or_cookie():
+    value = marker()
+
+    assert database._wrote_recently(request({WRITE_MARKER_HEADER: value}))
+    assert database._wrote_recently(request({"Cookie": f"{WRITE_MARKER_COOKIE}={value}"}))
+    assert not database._wrote_recently(request({}))
+
+
+def test_marker_expires_after_lag_window(monkeypatch):
+    value = marker()
+    later = time.time() + database.REPLICA_MAX_LAG_SECONDS + 1
+    monkeypatch.setattr(database.time, "time", lambda: later)
+
+    assert not database._wrote_recently(request({WRITE_MARKER_HEADER: value}))
+
+
+def test_forged_marker_is_ignored():
+    stamp = f"{time.time() + 3600:.3f}"
+    _, _, signature = marker().rpartition(".")
+
+    assert not database._wrote_recently(request({WRITE_MARKER_HEADER: f"{stamp}.{signature}"}))
+    assert not database._wrote_recently(request({WRITE_MARKER_HEADER: "garbage"}))
+
+
+def test_no_marker_without_replicas(monkeypatch):
+    monkeypatch.setattr(database, "replicas", [])
+    response = Response()
+    mark_write(response)
+
+    assert WRITE_MARKER_HEADER not in response.headers
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.info = {"replica": True}
+        self.queries = 0
+
+    def expunge_all(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run_query(session):
+    session.queries += 1
+    return session.rows
+
+
+def test_empty_collection_stays_on_the_replica(monkeypatch):
+    replica, primary = FakeSession([]), FakeSession(["job"])
+    monkeypatch.setattr(database, "SessionLocal", lambda: primary)
+
+    assert database.read_or_primary(replica, run_query, required=False) == []
+    assert primary.queries == 0
+
+    # A row that must exist is re-read from the primary
+    assert database.read_or_primary(replica, run_query, required=True) == ["job"]
+    assert primary.queries == 1
+
+
+def test_recent_write_reads_the_primary(monkeypatch):
+    replica, primary = FakeSession(["stale"]), FakeSession(["fresh"])
+    replica.info["recent_write"] = True
+    monkeypatch.setattr(database, "SessionLocal", lambda: primary)
+
+    assert database.read_or_primary(replica, run_query, required=False) == ["fresh"]
+    assert replica.queries == 0
@@ -0,0 +1,162 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.credits.models import CreditBalance, CreditTransaction
+from backend.database import Base
+from backend.engines.errors import SystemFailure, UserContentError
+from backend.engines.video_engine import generate
+from backend.jobs import executor
+from backend.jobs.models import Job, JobReel
+from backend.users.models import User
+
+COST = 10
+START_BALANCE = 100
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    tables = [model.__table__ for model in (User, Job, JobReel, CreditBalance, CreditTransaction)]
+    Base.metadata.create_all(engine, tables=tables)
+    session_factory = sessionmaker(
+        bind=engine, autocommit=False, autoflush=False, expire_on_commit=False
+    )
+
+    # Reel records and the cancel watcher open their own sessions
+    monkeypatch.setattr(executor, "SessionLocal", session_factory)
+    monkeypatch.setattr(executor, "get_engine_cost", lambda name: COST)
+    monkeypatch.setattr(executor, "open_circuits", lambda names: [])
+    monkeypatch.setattr(generate, "REEL_RETRY_DELAY_SECONDS", 0)
+
+    session = session_factory()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def fake_engine(monkeypatch, outcomes: list):
+    """
+    Runs the real video pipeline over fake reels. Each reel's assets
+    come out as its outcome says: "ok", "skip" (nothing to deliver),
+    "system" or "user" (failure).
+    """
+    def analyze(input_type, config, output_dir, context=None):
+        context.report_progress(generate.ANALYSIS_PROGRESS)
+        return {"reels": [{"outcome": outcome} for outcome in outcomes]}
+
+    def assets(idx, reel, output_dir, context, frame_size):
+        if reel["outcome"] == "system":
+            raise SystemFailure(f"image provider down (reel {idx})")
+        if reel["outcome"] == "user":
+            raise UserContentError(f"narration rejected (reel {idx})")
+        if reel["outcome"] == "skip":
+            return None
+        return {"reel_index": idx, "output_dir": output_dir, "reel_dir": output_dir / f"reel_{idx:02d}"}
+
+    def assemble(asset, profile, context=None):
+        asset["reel_dir"].mkdir(parents=True, exist_ok=True)
+        video = asset["reel_dir"] / "final_video.mp4"
+        video.write_bytes(b"mp4")
+        return video
+
+    monkeypatch.setattr(generate, "stage_analyze_input", analyze)
+    monkeypatch.setattr(generate, "generate_reel_assets", assets)
+    monkeypatch.setattr(generate, "assemble_reel", assemble)
+
+
+def submit(db, tmp_path) -> Job:
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4()}@example.com")
+    db.add(user)
+    db.add(CreditBalance(user_id=user.id, balance=START_BALANCE))
+    job = Job(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        engine="video",
+        status="queued",
+        input_type="text",
+        config={"input_type": "text", "text": "x"},
+        output_dir=str(tmp_path / "outputs" / "job"),
+        # SQLite hands back naive datetimes; keep the aware one in memory
+        created_at=datetime.now(timezone.utc),
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def balance(db, job: Job) -> int:
+    db.expire_all()
+    return db.query(CreditBalance).filter_by(user_id=job.user_id).one().balance
+
+
+def reel_statuses(db, job: Job) -> list:
+    rows = db.query(JobReel).filter_by(job_id=job.id).order_by(JobReel.reel_index).all()
+    return [row.status for row in rows]
+
+
+@pytest.mark.parametrize(
+    "outcomes, error_type, charged",
+    [
+        (["ok", "ok", "ok"], None, COST),
+        # 0.1 analysis + 0.9 * 3/4 reels = 7.75 credits of work → 7
+        (["ok", "ok", "ok", "system"], "system", 7),
+        (["ok", "ok", "ok", "skip"], None, 7),
+        # The user's own content failing is charged
+        (["ok", "ok", "ok", "user"], "user", COST),
+    ],
+)
+def test_completed_job_pays_for_delivered_reels(db, tmp_path, monkeypatch, outcomes, error_type, charged):
+    fake_engine(monkeypatch, outcomes)
+    job = submit(db, tmp_path)
+
+    job = executor.execute_job(job, db)
+
+    assert job.status == "completed"
+    assert job.error_type == error_type
+    assert balance(db, job) == START_BALANCE - charged
+
+    expected = {"ok": "completed", "skip": "skipped", "system": "failed", "user": "failed"}
+    assert reel_statuses(db, job) == [expected[outcome] for outcome in outcomes]
+
+
+def test_every_reel_failing_on_user_content_fails_the_job(db, tmp_path, monkeypatch):
+    fake_engine(monkeypatch, ["user", "user"])
+    job = submit(db, tmp_path)
+
+    job = executor.execute_job(job, db)
+
+    assert job.status == "failed"
+    assert job.error_type == "user"
+    assert "All reels failed" in job.error_message
+    assert balance(db, job) == START_BALANCE - COST
+
+
+def test_every_reel_failing_on_our_side_is_refunded(db, tmp_path, monkeypatch):
+    fake_engine(monkeypatch, ["system", "system"])
+    job = submit(db, tmp_path)
+
+    with pytest.raises(SystemFailure):
+        executor.execute_job(job, db)
+
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.error_type == "system"
+    assert balance(db, job) == START_BALANCE
+
+
+def test_only_skipped_reels_are_not_charged(db, tmp_path, monkeypatch):
+    fake_engine(monkeypatch, ["skip", "skip"])
+    job = submit(db, tmp_path)
+
+    job = executor.execute_job(job, db)
+
+    assert job.status == "completed"
+    # Only the analysis share (0.1 of the cost) is paid
+    assert balance(db, job) == START_BALANCE - 1
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from backend import tracing
+from backend.tracing import current_span, iter_in_span, span, start_span
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    spans = []
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    monkeypatch.setattr(tracing, "_enqueue", spans.append)
+    return spans
+
+
+def llm_stream(count: int):
+    # Like stream_chat_completion: the call's span starts on first next()
+    call = start_span("provider.openai_chat")
+    try:
+        for index in range(count):
+            yield index
+    finally:
+        call.end()
+
+
+def test_lazy_stream_is_traced_when_consumed(finished):
+    with span("stage_analyze_input"):
+        reels = iter_in_span("stage_stream_reel_scripts", llm_stream(3))
+    assert [s.name for s in finished] == ["stage_analyze_input"]
+
+    with span("stage_pipeline_reels") as pipeline:
+        for _ in reels:
+            # The stream's span is only current while it runs
+            assert current_span() is pipeline
+
+    by_name = {s.name: s for s in finished}
+    stream = by_name["stage_stream_reel_scripts"]
+    assert stream.parent_id == pipeline.span_id
+    assert by_name["provider.openai_chat"].parent_id == stream.span_id
+    assert stream.end_ns >= by_name["provider.openai_chat"].end_ns
+
+
+def test_stream_resumed_on_another_thread(finished):
+    with span("stage_pipeline_reels"):
+        reels = iter_in_span("stage_stream_reel_scripts", llm_stream(2))
+        assert next(reels) == 0
+
+    thread = threading.Thread(target=lambda: list(reels))
+    thread.start()
+    thread.join()
+
+    assert {s.name for s in finished} >= {"stage_stream_reel_scripts", "provider.openai_chat"}
+
+
+def test_failure_is_recorded_and_closing_ends_the_span(finished):
+    def failing():
+        yield 1
+        raise RuntimeError("stream broke")
+
+    with pytest.raises(RuntimeError):
+        list(iter_in_span("failing", failing()))
+    assert finished[-1].error == "RuntimeError: stream broke"
+
+    reels = iter_in_span("closed", llm_stream(5))
+    next(reels)
+    reels.close()
+    assert [s.name for s in finished[-2:]] == ["provider.openai_chat", "closed"]
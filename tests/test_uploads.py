@@ -0,0 +1,69 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Query, sessionmaker
+
+from backend.database import Base
+from backend.uploads.models import Upload
+from backend.uploads.routes import _record_upload
+from backend.users.models import User
+
+DIGEST = "ab" * 32
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'uploads.db'}")
+    Base.metadata.create_all(engine, tables=[User.__table__, Upload.__table__])
+    factory = sessionmaker(bind=engine)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def user_id(sessions):
+    user_id = uuid.uuid4()
+    db = sessions()
+    db.add(User(id=user_id, email="reader@example.com"))
+    db.commit()
+    db.close()
+    return user_id
+
+
+def record(db, user_id, filename="book.pdf"):
+    return _record_upload(
+        db,
+        user_id=user_id,
+        digest=DIGEST,
+        size=123,
+        content_type="application/pdf",
+        filename=filename,
+    )
+
+
+def test_same_content_reuses_the_upload(sessions, user_id):
+    first = record(sessions(), user_id)
+    again = record(sessions(), user_id, filename="renamed.pdf")
+
+    assert again.id == first.id
+    assert again.filename == "book.pdf"
+
+
+def test_concurrent_duplicate_gets_the_winners_row(sessions, user_id, monkeypatch):
+    # The other upload commits between this one's lookup and its insert
+    winner = record(sessions(), user_id)
+    first = Query.first
+    lookups = []
+
+    def stale_first(query):
+        lookups.append(query)
+        return None if len(lookups) == 1 else first(query)
+
+    monkeypatch.setattr(Query, "first", stale_first)
+
+    loser = record(sessions(), user_id, filename="other.pdf")
+
+    assert loser.id == winner.id
+    db = sessions()
+    assert db.query(Upload).count() == 1
@@ -0,0 +1,137 @@
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from backend.storage.backends import LocalStorage
+from backend.storage.zipstream import ZipBundle
+
+FILES = {
+    "reel_01/final_video.mp4": os.urandom(300_000),
+    "reel_01/manifest.json": b'{"renditions": []}',
+    "empty.txt": b"",
+    "reel_02/vidéo.mp4": os.urandom(70_000),
+}
+
+MODIFIED = datetime(2026, 3, 14, 15, 9, 26)
+
+
+class RecordingStorage(LocalStorage):
+    def __init__(self, root):
+        super().__init__(root)
+        self.reads = []
+
+    def iter_bytes(self, key, start=0, chunk_size=4096):
+        self.reads.append((key, start))
+        yield from super().iter_bytes(key, start, chunk_size)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = RecordingStorage(tmp_path)
+    for name, data in FILES.items():
+        source = tmp_path / "scratch" / name
+        source.parent.mkdir(parents=True, exist_ok=True)
+        source.write_bytes(data)
+        storage.put_file(f"outputs/job/{name}", source)
+    return storage
+
+
+def make_bundle(storage, recorded: bool = True) -> ZipBundle:
+    entries = []
+    for name in FILES:
+        key = f"outputs/job/{name}"
+        crc = storage.crc32(key) if recorded else None
+        entries.append((name, key, storage.size(key), crc))
+    return ZipBundle(storage, entries, modified=MODIFIED)
+
+
+def read_all(bundle, start=0, end=None) -> bytes:
+    return b"".join(bundle.iter_bytes(start, end))
+
+
+@pytest.mark.parametrize("recorded", [True, False])
+def test_archive_matches_zipfile(storage, recorded):
+    bundle = make_bundle(storage, recorded)
+    data = read_all(bundle)
+
+    assert len(data) == bundle.size
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None  # every CRC checks out
+        assert archive.namelist() == list(FILES)
+        for info in archive.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED
+            assert info.date_time == (2026, 3, 14, 15, 9, 26)
+            assert archive.read(info) == FILES[info.filename]
+
+
+def test_crc_comes_from_storage(storage):
+    for name, data in FILES.items():
+        assert storage.crc32(f"outputs/job/{name}") == zipfile.crc32(data)
+    # Sidecars are never listed as outputs
+    assert sorted(storage.list("outputs/job")) == sorted(FILES)
+
+
+@pytest.mark.parametrize("recorded", [True, False])
+def test_ranges_slice_the_full_archive(storage, recorded):
+    bundle = make_bundle(storage, recorded)
+    full = read_all(bundle)
+    second = bundle.entries[1]
+    last = bundle.entries[-1]
+
+    ranges = [
+        (0, 10),                                           # first local header
+        (100, 200_000),                                    # inside the first entry's data
+        (second["offset"] - 20, second["offset"] + 40),    # descriptor → next header
+        (last["offset"] + 5, bundle.central_offset + 50),  # last entry into the directory
+        (bundle.central_offset + 3, None),                 # directory only
+        (bundle.size - 22, None),                          # end of central directory
+        (bundle.size - 1, bundle.size + 100),              # last byte, end clamped
+    ]
+    for start, end in ranges:
+        stop = bundle.size if end is None else end + 1
+        assert read_all(bundle, start, end) == full[start:stop], (start, end)
+
+
+def test_resume_seeks_past_earlier_entries(storage):
+    bundle = make_bundle(storage)
+    last = bundle.entries[-1]
+    start = last["offset"] + 1000
+
+    storage.reads.clear()
+    read_all(bundle, start)
+
+    assert storage.reads == [(last["key"], start - bundle._data_start(last))]
+
+    storage.reads.clear()
+    read_all(bundle, bundle.central_offset)
+    assert storage.reads == []
+
+
+def test_unrecorded_crc_is_read_for_the_directory(storage):
+    bundle = make_bundle(storage, recorded=False)
+    storage.reads.clear()
+
+    tail = read_all(bundle, bundle.central_offset)
+
+    assert [key for key, _ in storage.reads] == [entry["key"] for entry in bundle.entries]
+    assert tail == read_all(make_bundle(storage), bundle.central_offset)
+
+
+def test_rewritten_file_has_no_stale_crc(storage):
+    key = "outputs/job/reel_01/manifest.json"
+    path = storage.local_path(key)
+    path.write_bytes(b'{"renditions": [1]}')
+    os.utime(path, ns=(0, 0))
+
+    assert storage.crc32(key) is None
+
+
+def test_changed_size_is_detected(storage):
+    bundle = make_bundle(storage)
+    storage.local_path("outputs/job/reel_02/vidéo.mp4").write_bytes(b"short")
+
+    with pytest.raises(RuntimeError, match="changed size"):
+        read_all(bundle)